@@ -1,13 +1,30 @@
-from flask import Flask, render_template, request, jsonify
+from flask import Flask, render_template, request, jsonify, Response, stream_with_context
+import json
 import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from werkzeug.utils import secure_filename
 
 
 from core.FAQ_answer_manager import FAQAnswerManager
+from core.batch_answerer import BatchAnswerer, iter_question_records
+from core.collection_registry import CollectionRegistry
 from services.IO_manager import IOManager
+from services.pdf_extractor import PdfExtractor
 from services.faiss_manager import FaissVectorDatabase
-from services.llm_api_manager import GeminiLLMAPIManager
-from utils.utils import chunk_text, filter_json
+from services.text_embedder import build_text_embedder
+from services.llm_api_manager import GeminiLLMAPIManager, GroqLLMAPIManager, OpenAICompatibleLLMAPIManager
+from services.llm_router import LLMProvider, LLMRouter
+from services.resilient_llm import ResilientLLMAPIManager
+from services.answer_cache import SemanticAnswerCache
+from services.chunker import StructuredChunker
+from services.context_builder import ContextBuilder
+from services.fast_path import RetrievalFastPath
+from services.query_batcher import QueryBatcher
+from services.reranker import CrossEncoderReranker
+from services.ingestion_jobs import IngestionJobManager
+from services.metrics import REGISTRY, record_timings, span, timings_ms
+from utils.utils import chunk_text
 
 from config import GeneralCfg, LLMPrompts
 from logging import Logger
@@ -19,28 +36,209 @@ app = Flask(__name__)
 
 # Then initialize other components
 logger = Logger(__name__)
-io_manager = IOManager()
+REGISTRY.enabled = GeneralCfg.metrics_enabled
+io_manager = IOManager(
+    pdf_extractor=PdfExtractor(
+        max_workers=GeneralCfg.pdf_workers,
+        pages_per_task=GeneralCfg.pdf_pages_per_task
+    )
+)
 
-faiss_vector_database = FaissVectorDatabase(
-    model_name=GeneralCfg.text_embedding_model_name,
-    logger=logger
+# One embedder for every collection, so the model is loaded once
+text_embedder = build_text_embedder(
+    GeneralCfg.text_embedding_backend,
+    GeneralCfg.text_embedding_model_name,
+    dim=GeneralCfg.text_embedding_dim,
+    batch_size=GeneralCfg.text_embedding_batch_size,
+    onnx_model_dir=GeneralCfg.onnx_model_dir,
+    onnx_threads=GeneralCfg.onnx_threads
 )
 
+def build_vector_database():
+    return FaissVectorDatabase(
+        embedder=text_embedder,
+        logger=logger,
+        index_type=GeneralCfg.index_type,
+        nlist=GeneralCfg.ivf_nlist,
+        pq_m=GeneralCfg.pq_m,
+        pq_nbits=GeneralCfg.pq_nbits,
+        hnsw_m=GeneralCfg.hnsw_m,
+        hnsw_ef_construction=GeneralCfg.hnsw_ef_construction,
+        nprobe=GeneralCfg.nprobe,
+        ef_search=GeneralCfg.ef_search,
+        min_train_vectors=GeneralCfg.min_train_vectors,
+        embedding_cache_dir=GeneralCfg.embedding_cache_dir,
+        deduplicate=GeneralCfg.deduplicate_chunks,
+        delta_max_vectors=GeneralCfg.index_delta_max_vectors,
+        delta_growth=GeneralCfg.index_delta_growth,
+        hybrid=GeneralCfg.hybrid_search_enabled,
+        bm25_k1=GeneralCfg.bm25_k1,
+        bm25_b=GeneralCfg.bm25_b,
+        rrf_k=GeneralCfg.rrf_k,
+        hybrid_candidate_factor=GeneralCfg.hybrid_candidate_factor,
+        rerank_factor=GeneralCfg.rerank_factor
+    )
+
+def build_answer_cache():
+    return SemanticAnswerCache(
+        similarity_threshold=GeneralCfg.answer_cache_similarity_threshold,
+        ttl_seconds=GeneralCfg.answer_cache_ttl_seconds,
+        max_size=GeneralCfg.answer_cache_max_size
+    ) if GeneralCfg.answer_cache_enabled else None
+
+faiss_vector_database = build_vector_database()
+
 load_dotenv(dotenv_path="keys.env")
-gemini_api_key = os.getenv("GEMINI_API_KEY")
 
-gemini_llm_api_manager = GeminiLLMAPIManager(
-    api_key=gemini_api_key,
-    model_name=GeneralCfg.llm_api_model_name
+def build_llm_provider(name):
+    if name == "gemini":
+        manager = GeminiLLMAPIManager(
+            api_key=os.getenv("GEMINI_API_KEY"),
+            model_name=GeneralCfg.llm_api_model_name,
+            timeout_s=GeneralCfg.llm_timeout_s,
+            api_endpoint=GeneralCfg.llm_api_endpoint
+        )
+    elif name == "groq":
+        manager = GroqLLMAPIManager(
+            api_key=os.getenv("GROQ_API_KEY"),
+            model_name=GeneralCfg.groq_model_name,
+            timeout_s=GeneralCfg.llm_timeout_s
+        )
+    elif name == "openai_compatible":
+        manager = OpenAICompatibleLLMAPIManager(
+            base_url=GeneralCfg.openai_compatible_base_url,
+            model_name=GeneralCfg.openai_compatible_model_name,
+            api_key=os.getenv("OPENAI_API_KEY"),
+            timeout_s=GeneralCfg.llm_timeout_s
+        )
+    else:
+        raise ValueError(f"Unknown LLM provider {name!r}")
+    return LLMProvider(name=name, manager=manager, cost_per_1m_tokens=GeneralCfg.llm_provider_costs.get(name, 0.0))
+
+llm_router = LLMRouter(
+    [build_llm_provider(name) for name in GeneralCfg.llm_providers],
+    logger=logger,
+    cost_weight=GeneralCfg.llm_router_cost_weight,
+    explore_rate=GeneralCfg.llm_router_explore_rate
+)
+llm_api_manager = ResilientLLMAPIManager(
+    llm_router,
+    logger=logger,
+    timeout_s=GeneralCfg.llm_timeout_s,
+    max_retries=GeneralCfg.llm_max_retries,
+    backoff_base_s=GeneralCfg.llm_backoff_base_s,
+    backoff_max_s=GeneralCfg.llm_backoff_max_s,
+    rate_limit_per_s=GeneralCfg.llm_rate_limit_per_s,
+    rate_limit_burst=GeneralCfg.llm_rate_limit_burst,
+    hedge=GeneralCfg.llm_hedging_enabled,
+    hedge_quantile=GeneralCfg.llm_hedge_quantile,
+    breaker_failure_threshold=GeneralCfg.llm_breaker_failure_threshold,
+    breaker_reset_s=GeneralCfg.llm_breaker_reset_s
+)
+
+answer_cache = build_answer_cache()
+chunker = StructuredChunker(
+    max_tokens=GeneralCfg.chunk_max_tokens,
+    overlap_tokens=GeneralCfg.chunk_overlap_tokens,
+    count_tokens=faiss_vector_database.count_tokens
+) if GeneralCfg.chunking_strategy == "structured" else None
+context_builder = ContextBuilder(
+    max_tokens=GeneralCfg.context_max_tokens,
+    min_similarity=GeneralCfg.context_min_similarity,
+    count_tokens=faiss_vector_database.count_tokens
 )
+fast_path = RetrievalFastPath(
+    embed_texts=faiss_vector_database.embed_texts,
+    similarity_threshold=GeneralCfg.fast_path_similarity_threshold,
+    chunker=chunker
+) if GeneralCfg.fast_path_enabled else None
+# One reranker (model and score cache) for every collection
+reranker = CrossEncoderReranker(
+    model_name=GeneralCfg.reranker_model_name,
+    confidence_target=GeneralCfg.reranker_confidence_target,
+    min_score=GeneralCfg.reranker_min_score,
+    max_passages=GeneralCfg.reranker_max_passages,
+    batch_size=GeneralCfg.reranker_batch_size,
+    cache_size=GeneralCfg.reranker_cache_size
+) if GeneralCfg.reranker_enabled else None
+embedding_executor = ThreadPoolExecutor(max_workers=GeneralCfg.embedding_workers, thread_name_prefix="faq-embed")
+
+ingestion_job_manager = IngestionJobManager(logger=logger)
+
+query_batcher = QueryBatcher(
+    vector_database=faiss_vector_database,
+    logger=logger,
+    max_batch_size=GeneralCfg.query_batch_max_size,
+    max_wait_ms=GeneralCfg.query_batch_max_wait_ms
+) if GeneralCfg.query_batching_enabled else None
 
 faq_answer_manager = FAQAnswerManager(
     Faiss_vecotr_database=faiss_vector_database,
-    llm_api_manager=gemini_llm_api_manager,
+    llm_api_manager=llm_api_manager,
     io_manager=io_manager,
-    logger=logger
+    logger=logger,
+    answer_cache=answer_cache,
+    executor=embedding_executor,
+    query_batcher=query_batcher,
+    chunker=chunker,
+    context_builder=context_builder,
+    fast_path=fast_path,
+    reranker=reranker
+)
+
+def build_collection_manager(name):
+    # Tenant collections share the model, LLM client and executor, but not the batcher thread
+    return FAQAnswerManager(
+        Faiss_vecotr_database=build_vector_database(),
+        llm_api_manager=llm_api_manager,
+        io_manager=io_manager,
+        logger=logger,
+        answer_cache=build_answer_cache(),
+        executor=embedding_executor,
+        chunker=chunker,
+        context_builder=context_builder,
+        fast_path=fast_path,
+        reranker=reranker
+    )
+
+collection_registry = CollectionRegistry(
+    root_dir=GeneralCfg.collections_dir,
+    factory=build_collection_manager,
+    logger=logger,
+    max_memory_bytes=GeneralCfg.collections_max_memory_mb * 1024 * 1024,
+    max_loaded=GeneralCfg.collections_max_loaded,
+    pinned={GeneralCfg.default_collection: faq_answer_manager}
+)
+
+batch_answerer = BatchAnswerer(
+    logger=logger,
+    batch_size=GeneralCfg.batch_qa_batch_size,
+    max_concurrency=GeneralCfg.batch_qa_max_concurrency,
+    max_retries=GeneralCfg.batch_qa_max_retries,
+    retry_backoff_s=GeneralCfg.batch_qa_retry_backoff_s
 )
 
+def timings_requested(data):
+    """
+    Whether the caller asked for the per-request timing breakdown (`"timings": true`).
+    """
+    return GeneralCfg.request_timings_enabled and bool((data or {}).get('timings'))
+
+def requested_collection(data=None):
+    return (data or {}).get('collection') or request.args.get('collection') or GeneralCfg.default_collection
+
+def collection_error(name):
+    try:
+        if not collection_registry.exists(name):
+            return jsonify({'message': f'Unknown collection {name}'}), 404
+    except ValueError as e:
+        return jsonify({'message': str(e)}), 400
+    return None
+
+if GeneralCfg.warm_up_on_start:
+    # Load models in the background so startup (and health checks) are not blocked
+    threading.Thread(target=faq_answer_manager.warm_up, name="warm-up", daemon=True).start()
+
 
 
 
@@ -58,14 +256,20 @@ def ask():
         question = request.json.get('message')
         if not question:
             return jsonify({'response': 'No question provided'}), 400
+        collection = requested_collection(request.json)
+        error = collection_error(collection)
+        if error:
+            return error
             
-        # Get answers using the FAQ manager
-        answers = faq_answer_manager.get_answers(
-            question=question,
-            FAQ_answer_prompt=LLMPrompts.FAQ_answer_prompt,
-            top_k=GeneralCfg.top_k,
-            n_answers=GeneralCfg.n_answers
-        )
+        # Get answers using the collection's FAQ manager
+        with record_timings() as timings, span('http.ask'):
+            with collection_registry.checkout(collection) as manager:
+                answers = manager.get_answers(
+                    question=question,
+                    FAQ_answer_prompt=LLMPrompts.FAQ_answer_prompt,
+                    top_k=GeneralCfg.top_k,
+                    n_answers=GeneralCfg.n_answers
+                )
 
         
         # Format the response
@@ -74,34 +278,193 @@ def ask():
         else:
             response = answers
             
+        if timings_requested(request.json):
+            return jsonify({'response': response, 'timings_ms': timings_ms(timings)})
         return jsonify({'response': response})
     
     except Exception as e:
         print(f"Error processing question: {str(e)}")
         return jsonify({'response': f'Sorry, there was an error processing your question. Error:\n\n{str(e)}'}), 500
 
+@app.route('/ask_stream', methods=['POST'])
+def ask_stream():
+    question = request.json.get('message')
+    if not question:
+        return jsonify({'response': 'No question provided'}), 400
+    collection = requested_collection(request.json)
+    error = collection_error(collection)
+    if error:
+        return error
+
+    def sse(event, data):
+        return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+    def generate():
+        try:
+            with collection_registry.checkout(collection) as manager:
+                for event, payload in manager.stream_answers(
+                    question=question,
+                    FAQ_answer_prompt=LLMPrompts.FAQ_answer_prompt,
+                    top_k=GeneralCfg.top_k,
+                    n_answers=GeneralCfg.n_answers
+                ):
+                    yield sse(event, payload)
+            yield sse('done', None)
+        except Exception as e:
+            logger.error(f"Error streaming answers: {str(e)}", exc_info=True)
+            yield sse('error', f'Sorry, there was an error processing your question. Error:\n\n{str(e)}')
+
+    return Response(
+        stream_with_context(generate()),
+        mimetype='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    )
+
+def batch_answer_lines(collection, lines):
+    with collection_registry.checkout(collection) as manager:
+        for record in batch_answerer.iter_answers(
+            manager,
+            iter_question_records(lines),
+            FAQ_answer_prompt=LLMPrompts.FAQ_answer_prompt,
+            top_k=GeneralCfg.top_k,
+            n_answers=GeneralCfg.n_answers
+        ):
+            yield json.dumps(record, ensure_ascii=False) + "\n"
+
+@app.route('/ask_batch', methods=['POST'])
+def ask_batch():
+    file = request.files.get('file')
+    collection = requested_collection(request.form)
+    error = collection_error(collection)
+    if error:
+        return error
+    lines = file.read().splitlines() if file else request.get_data().splitlines()
+    if not any(line.strip() for line in lines):
+        return jsonify({'message': 'No questions provided'}), 400
+
+    return Response(
+        stream_with_context(batch_answer_lines(collection, lines)),
+        mimetype='application/x-ndjson',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    )
+
+@app.route('/collections', methods=['GET'])
+def list_collections():
+    return jsonify({'collections': collection_registry.list()})
+
+@app.route('/collections', methods=['POST'])
+def create_collection():
+    try:
+        name = (request.get_json() or {}).get('name')
+        if not name:
+            return jsonify({'message': 'No collection name provided'}), 400
+        collection_registry.create(name)
+        return jsonify({'message': f'Collection {name} created.'}), 201
+    except ValueError as e:
+        return jsonify({'message': str(e)}), 400
+
+@app.route('/collections/<name>', methods=['DELETE'])
+def delete_collection(name):
+    try:
+        collection_registry.delete(name)
+        return jsonify({'message': f'Collection {name} deleted.'})
+    except KeyError:
+        return jsonify({'message': f'Unknown collection {name}'}), 404
+    except ValueError as e:
+        return jsonify({'message': str(e)}), 400
+
+@app.route('/query_batcher_stats', methods=['GET'])
+def query_batcher_stats():
+    if query_batcher is None:
+        return jsonify({'message': 'Query batching is disabled.'}), 404
+    return jsonify(query_batcher.stats())
+
+@app.route('/llm_stats', methods=['GET'])
+def llm_stats():
+    return jsonify(llm_api_manager.stats())
+
+@app.route('/metrics', methods=['GET'])
+def metrics():
+    if request.args.get('format') == 'json':
+        return jsonify(REGISTRY.summary())
+    return Response(REGISTRY.render_prometheus(), mimetype='text/plain; version=0.0.4')
+
+@app.route('/fast_path_stats', methods=['GET'])
+def fast_path_stats():
+    if fast_path is None:
+        return jsonify({'message': 'The retrieval-only fast path is disabled.'}), 404
+    return jsonify(fast_path.stats())
+
+@app.route('/reranker_stats', methods=['GET'])
+def reranker_stats():
+    if reranker is None:
+        return jsonify({'message': 'The cross-encoder reranker is disabled.'}), 404
+    return jsonify(reranker.stats())
+
+def upload_path(collection, filename):
+    directory = 'uploads' if collection == GeneralCfg.default_collection else os.path.join('uploads', collection)
+    os.makedirs(directory, exist_ok=True)
+    return os.path.join(directory, secure_filename(filename))
+
 @app.route('/load_faiss', methods=['POST'])
 def load_faiss():
     file = request.files.get('file')
     if not file:
         return jsonify({'message': 'No file uploaded'}), 400
-    filename = secure_filename(file.filename)
-    filepath = os.path.join('uploads', filename)
-    os.makedirs('uploads', exist_ok=True)
+    collection = requested_collection(request.form)
+    error = collection_error(collection)
+    if error:
+        return error
+    filepath = upload_path(collection, file.filename)
     file.save(filepath)
-    try:
-        # Use default values for n_characters and overlap
-        faq_answer_manager.load_text_into_faiss(filepath, n_char=GeneralCfg.n_char, overlap=GeneralCfg.overlap)
-        return jsonify({'message': 'File loaded successfully'})
-    except Exception as e:
-        return jsonify({'message': f'Error: {str(e)}'}), 500
+    if request.args.get('wait'):
+        try:
+            # Use default values for n_characters and overlap
+            ingest_file(collection, filepath)
+            return jsonify({'message': 'File loaded successfully'})
+        except Exception as e:
+            return jsonify({'message': f'Error: {str(e)}'}), 500
+    job = submit_ingestion_job(collection, filepath)
+    return jsonify({'message': 'File accepted for loading', 'job_id': job.job_id}), 202
+
+def ingest_file(collection, filepath, progress=None):
+    with collection_registry.checkout(collection, write=True) as manager:
+        return manager.load_text_into_faiss(
+            filepath,
+            n_char=GeneralCfg.n_char,
+            overlap=GeneralCfg.overlap,
+            batch_size=GeneralCfg.ingest_batch_size,
+            progress=progress
+        )
+
+def submit_ingestion_job(collection, filepath):
+    return ingestion_job_manager.submit(
+        filepath,
+        lambda path, progress: ingest_file(collection, path, progress)
+    )
+
+@app.route('/ingest_jobs', methods=['GET'])
+def ingest_jobs():
+    return jsonify({'jobs': [job.to_dict() for job in ingestion_job_manager.list()]})
+
+@app.route('/ingest_jobs/<job_id>', methods=['GET'])
+def ingest_job_status(job_id):
+    job = ingestion_job_manager.get(job_id)
+    if job is None:
+        return jsonify({'message': f'Unknown job {job_id}'}), 404
+    return jsonify(job.to_dict())
 
 @app.route('/save_faiss_index', methods=['POST'])
 def save_faiss_index():
     try:
         data = request.get_json()
         path = data.get('path')
-        faq_answer_manager.save_faiss_index(path)
+        collection = requested_collection(data)
+        error = collection_error(collection)
+        if error:
+            return error
+        with collection_registry.checkout(collection) as manager:
+            manager.save_faiss_index(path)
         return jsonify({'message': f'Database saved to {path}.'})
     except Exception as e:
         return jsonify({'message': f'Error saving database: {str(e)}'}), 500
@@ -111,7 +474,12 @@ def load_faiss_index():
     try:
         data = request.get_json()
         path = data.get('path')
-        faq_answer_manager.load_faiss_index(path)
+        collection = requested_collection(data)
+        error = collection_error(collection)
+        if error:
+            return error
+        with collection_registry.checkout(collection, write=True) as manager:
+            manager.load_faiss_index(path)
         return jsonify({'message': f'Database loaded from {path}.'})
     except Exception as e:
         return jsonify({'message': f'Error loading database: {str(e)}'}), 500
@@ -119,7 +487,12 @@ def load_faiss_index():
 @app.route('/clear_faiss_index', methods=['POST'])
 def clear_faiss_index():
     try:
-        faq_answer_manager.clear_faiss_index()
+        collection = requested_collection(request.get_json(silent=True))
+        error = collection_error(collection)
+        if error:
+            return error
+        with collection_registry.checkout(collection, write=True) as manager:
+            manager.clear_faiss_index()
         return jsonify({'message': 'Database cleared.'})
     except Exception as e:
         return jsonify({'message': f'Error clearing database: {str(e)}'}), 500
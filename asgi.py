@@ -0,0 +1,225 @@
+import asyncio
+import json
+from contextlib import asynccontextmanager
+
+from asgiref.wsgi import WsgiToAsgi
+from starlette.applications import Starlette
+from starlette.requests import Request
+from starlette.responses import JSONResponse, StreamingResponse
+from starlette.routing import Mount, Route
+
+from app import app as flask_app, batch_answer_lines, collection_registry, ingest_file, logger, submit_ingestion_job, timings_requested, upload_path
+from config import GeneralCfg, LLMPrompts
+from services.metrics import record_timings, span, timings_ms
+
+
+# Asyncio serving path: run with `uvicorn asgi:app`.
+# /ask and the index endpoints are served natively so many questions can be in
+# flight per process; everything else (UI, static files) falls through to Flask.
+
+
+def _collection(request: Request, data=None) -> str:
+    # Same precedence as Flask's requested_collection: body (JSON or form), then query string
+    return (data or {}).get('collection') or request.query_params.get('collection') or GeneralCfg.default_collection
+
+
+async def _collection_error(name: str):
+    try:
+        # Checks the collection directory on disk, so off the event loop
+        if not await asyncio.to_thread(collection_registry.exists, name):
+            return JSONResponse({'message': f'Unknown collection {name}'}, status_code=404)
+    except ValueError as e:
+        return JSONResponse({'message': str(e)}, status_code=400)
+    return None
+
+
+@asynccontextmanager
+async def _checkout(name: str, write: bool = False):
+    # Loading or saving a collection touches disk, so enter and exit off the event loop
+    context = collection_registry.checkout(name, write=write)
+    manager = await asyncio.to_thread(context.__enter__)
+    try:
+        yield manager
+    except BaseException as e:
+        if not await asyncio.to_thread(context.__exit__, type(e), e, e.__traceback__):
+            raise
+    else:
+        await asyncio.to_thread(context.__exit__, None, None, None)
+
+
+def _run_in_collection(name: str, write: bool, method: str, *args):
+    with collection_registry.checkout(name, write=write) as manager:
+        return getattr(manager, method)(*args)
+
+
+async def ask(request: Request):
+    try:
+        data = await request.json()
+        question = data.get('message')
+        if not question:
+            return JSONResponse({'response': 'No question provided'}, status_code=400)
+        collection = _collection(request, data)
+        error = await _collection_error(collection)
+        if error:
+            return error
+
+        with record_timings() as timings, span('http.ask'):
+            async with _checkout(collection) as manager:
+                answers = await manager.get_answers_async(
+                    question=question,
+                    FAQ_answer_prompt=LLMPrompts.FAQ_answer_prompt,
+                    top_k=GeneralCfg.top_k,
+                    n_answers=GeneralCfg.n_answers
+                )
+
+        if not answers:
+            response = "I couldn't find any answers to your question."
+        else:
+            response = answers
+
+        if timings_requested(data):
+            return JSONResponse({'response': response, 'timings_ms': timings_ms(timings)})
+        return JSONResponse({'response': response})
+
+    except Exception as e:
+        logger.error(f"Error processing question: {str(e)}", exc_info=True)
+        return JSONResponse({'response': f'Sorry, there was an error processing your question. Error:\n\n{str(e)}'}, status_code=500)
+
+
+async def ask_stream(request: Request):
+    data = await request.json()
+    question = data.get('message')
+    if not question:
+        return JSONResponse({'response': 'No question provided'}, status_code=400)
+    collection = _collection(request, data)
+    error = await _collection_error(collection)
+    if error:
+        return error
+
+    def sse(event, payload):
+        return f"event: {event}\ndata: {json.dumps(payload)}\n\n"
+
+    def generate():
+        try:
+            with collection_registry.checkout(collection) as manager:
+                for event, payload in manager.stream_answers(
+                    question=question,
+                    FAQ_answer_prompt=LLMPrompts.FAQ_answer_prompt,
+                    top_k=GeneralCfg.top_k,
+                    n_answers=GeneralCfg.n_answers
+                ):
+                    yield sse(event, payload)
+            yield sse('done', None)
+        except Exception as e:
+            logger.error(f"Error streaming answers: {str(e)}", exc_info=True)
+            yield sse('error', f'Sorry, there was an error processing your question. Error:\n\n{str(e)}')
+
+    # Starlette iterates sync generators in its threadpool, off the event loop
+    return StreamingResponse(
+        generate(),
+        media_type='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    )
+
+
+async def ask_batch(request: Request):
+    if request.headers.get('content-type', '').startswith('multipart/form-data'):
+        form = await request.form()
+        file = form.get('file')
+        content = await file.read() if file and getattr(file, 'filename', None) else b''
+        collection = _collection(request, form)
+    else:
+        content = await request.body()
+        collection = _collection(request)
+    error = await _collection_error(collection)
+    if error:
+        return error
+    lines = content.splitlines()
+    if not any(line.strip() for line in lines):
+        return JSONResponse({'message': 'No questions provided'}, status_code=400)
+
+    # Starlette iterates sync generators in its threadpool, off the event loop
+    return StreamingResponse(
+        batch_answer_lines(collection, lines),
+        media_type='application/x-ndjson',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    )
+
+
+def _save_upload(filepath: str, content: bytes) -> None:
+    with open(filepath, 'wb') as f:
+        f.write(content)
+
+
+async def load_faiss(request: Request):
+    form = await request.form()
+    file = form.get('file')
+    if not file or not getattr(file, 'filename', None):
+        return JSONResponse({'message': 'No file uploaded'}, status_code=400)
+    collection = _collection(request, form)
+    error = await _collection_error(collection)
+    if error:
+        return error
+    filepath = upload_path(collection, file.filename)
+    await asyncio.to_thread(_save_upload, filepath, await file.read())
+    if request.query_params.get('wait'):
+        try:
+            await asyncio.to_thread(ingest_file, collection, filepath)
+            return JSONResponse({'message': 'File loaded successfully'})
+        except Exception as e:
+            return JSONResponse({'message': f'Error: {str(e)}'}, status_code=500)
+    job = submit_ingestion_job(collection, filepath)
+    return JSONResponse({'message': 'File accepted for loading', 'job_id': job.job_id}, status_code=202)
+
+
+async def save_faiss_index(request: Request):
+    try:
+        data = await request.json()
+        path = data.get('path')
+        collection = _collection(request, data)
+        error = await _collection_error(collection)
+        if error:
+            return error
+        await asyncio.to_thread(_run_in_collection, collection, False, 'save_faiss_index', path)
+        return JSONResponse({'message': f'Database saved to {path}.'})
+    except Exception as e:
+        return JSONResponse({'message': f'Error saving database: {str(e)}'}, status_code=500)
+
+
+async def load_faiss_index(request: Request):
+    try:
+        data = await request.json()
+        path = data.get('path')
+        collection = _collection(request, data)
+        error = await _collection_error(collection)
+        if error:
+            return error
+        await asyncio.to_thread(_run_in_collection, collection, True, 'load_faiss_index', path)
+        return JSONResponse({'message': f'Database loaded from {path}.'})
+    except Exception as e:
+        return JSONResponse({'message': f'Error loading database: {str(e)}'}, status_code=500)
+
+
+async def clear_faiss_index(request: Request):
+    try:
+        body = await request.body()
+        collection = _collection(request, json.loads(body) if body else None)
+        error = await _collection_error(collection)
+        if error:
+            return error
+        await asyncio.to_thread(_run_in_collection, collection, True, 'clear_faiss_index')
+        return JSONResponse({'message': 'Database cleared.'})
+    except Exception as e:
+        return JSONResponse({'message': f'Error clearing database: {str(e)}'}, status_code=500)
+
+
+app = Starlette(routes=[
+    Route('/ask', ask, methods=['POST']),
+    Route('/ask_stream', ask_stream, methods=['POST']),
+    Route('/ask_batch', ask_batch, methods=['POST']),
+    Route('/load_faiss', load_faiss, methods=['POST']),
+    Route('/save_faiss_index', save_faiss_index, methods=['POST']),
+    Route('/load_faiss_index', load_faiss_index, methods=['POST']),
+    Route('/clear_faiss_index', clear_faiss_index, methods=['POST']),
+    Mount('/', app=WsgiToAsgi(flask_app)),
+])
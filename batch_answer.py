@@ -0,0 +1,72 @@
+"""
+Offline bulk question answering: reads a JSONL file of {"id", "question"}
+records and appends one JSONL answer record per question to the output file,
+as each is answered. Questions are embedded and searched in matrix batches
+and the Gemini calls run with bounded concurrency and retries (see the
+`GeneralCfg.batch_qa_*` options).
+
+With --resume, ids already answered in the output file are skipped, so an
+interrupted run continues where it stopped; questions that failed are retried.
+
+Usage (from the project root):
+    python batch_answer.py tickets.jsonl -o answers.jsonl --index path/to/index_dir
+    python batch_answer.py tickets.jsonl -o answers.jsonl --collection tenant_a --resume
+"""
+
+import argparse
+import json
+import sys
+import time
+
+from app import batch_answerer, collection_registry
+from config import GeneralCfg, LLMPrompts
+from core.batch_answerer import iter_question_records, read_checkpoint
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("questions", help="JSONL file of {\"id\", \"question\"} records")
+    parser.add_argument("-o", "--output", required=True, help="JSONL file the answers are appended to")
+    parser.add_argument("--collection", default=GeneralCfg.default_collection)
+    parser.add_argument("--index", default=None, help="Saved index directory to load into the default collection first")
+    parser.add_argument("--resume", action="store_true", help="Skip ids already answered in the output file")
+    parser.add_argument("--top-k", type=int, default=GeneralCfg.top_k)
+    parser.add_argument("--n-answers", type=int, default=GeneralCfg.n_answers)
+    args = parser.parse_args()
+
+    if not collection_registry.exists(args.collection):
+        sys.exit(f"Unknown collection {args.collection}")
+    if args.index is not None and args.collection != GeneralCfg.default_collection:
+        sys.exit("--index only applies to the default collection; tenant collections load from GeneralCfg.collections_dir")
+    done = read_checkpoint(args.output) if args.resume else set()
+    if done:
+        print(f"Resuming: {len(done)} questions already answered.", file=sys.stderr)
+
+    n_answered = n_failed = 0
+    start = time.perf_counter()
+    with collection_registry.checkout(args.collection, write=args.index is not None) as manager:
+        if args.index is not None:
+            manager.load_faiss_index(args.index)
+        with open(args.questions, "r", encoding="utf-8") as questions, \
+                open(args.output, "a" if args.resume else "w", encoding="utf-8") as output:
+            for record in batch_answerer.iter_answers(
+                manager,
+                iter_question_records(questions),
+                FAQ_answer_prompt=LLMPrompts.FAQ_answer_prompt,
+                top_k=args.top_k,
+                n_answers=args.n_answers,
+                skip_ids=done
+            ):
+                output.write(json.dumps(record, ensure_ascii=False) + "\n")
+                # Flush per record so the output is a valid checkpoint at any time
+                output.flush()
+                if "answers" in record:
+                    n_answered += 1
+                else:
+                    n_failed += 1
+    elapsed = time.perf_counter() - start
+    print(f"Answered {n_answered} questions ({n_failed} failed) in {elapsed:.1f}s.", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
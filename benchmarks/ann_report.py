@@ -0,0 +1,152 @@
+"""
+Recall-vs-latency report for the approximate FAISS index types against the
+exact flat index, with the resident bytes per vector of each index. The
+compact "fp16" and "binary" types are measured the way FaissVectorDatabase
+searches them: a shortlist of rerank_factor * top_k is re-scored with the
+exact vectors, which live in a memory-mapped file and are not counted.
+
+Usage (from the project root):
+    python -m benchmarks.ann_report --n-vectors 200000 --n-queries 1000 --top-k 10
+    python -m benchmarks.ann_report --index-types fp16 binary --rerank-factor 1 4 16
+"""
+
+import argparse
+import time
+from typing import Dict, List
+
+import faiss
+import numpy as np
+
+from services.faiss_manager import build_faiss_index, set_search_params, INDEX_TYPES, RERANKED_INDEX_TYPES
+
+
+def synthetic_vectors(n: int, dim: int, n_clusters: int = 256, seed: int = 0) -> np.ndarray:
+    """
+    Generates L2-normalized clustered vectors, which resemble sentence embeddings
+    more closely than uniform noise.
+    """
+    rng = np.random.default_rng(seed)
+    centers = rng.standard_normal((n_clusters, dim)).astype(np.float32)
+    assignments = rng.integers(0, n_clusters, size=n)
+    vectors = centers[assignments] + 0.35 * rng.standard_normal((n, dim)).astype(np.float32)
+    faiss.normalize_L2(vectors)
+    return vectors
+
+
+def recall_at_k(ground_truth: np.ndarray, found: np.ndarray) -> float:
+    """
+    Fraction of the exact top-k neighbours that were also returned.
+    """
+    hits = sum(len(set(gt) & set(fd)) for gt, fd in zip(ground_truth, found))
+    return hits / ground_truth.size
+
+
+def rerank(vectors: np.ndarray, queries: np.ndarray, candidates: np.ndarray, top_k: int) -> np.ndarray:
+    """
+    Re-scores each query's candidate ids with the exact vectors and returns the best top_k ids.
+    """
+    valid = candidates >= 0
+    similarities = np.einsum("qkd,qd->qk", vectors[np.where(valid, candidates, 0)], queries)
+    similarities[~valid] = -np.inf
+    order = np.argsort(-similarities, axis=1)[:, :top_k]
+    return np.take_along_axis(candidates, order, axis=1)
+
+
+def bytes_per_vector(index: faiss.Index) -> float:
+    return len(faiss.serialize_index(index)) / max(index.ntotal, 1)
+
+
+def run_report(
+    vectors: np.ndarray,
+    queries: np.ndarray,
+    top_k: int,
+    index_types: List[str],
+    nlist: int,
+    nprobes: List[int],
+    ef_searches: List[int],
+    rerank_factors: List[int]
+) -> List[Dict]:
+    """
+    Builds every requested index over `vectors` and measures recall@k and
+    per-query latency for each query-time setting.
+    """
+    dim = vectors.shape[1]
+    flat = build_faiss_index(dim, "flat")
+    flat.add(vectors)
+    start = time.perf_counter()
+    _, ground_truth = flat.search(queries, top_k)
+    flat_ms = (time.perf_counter() - start) * 1000 / len(queries)
+    rows = [{
+        "index_type": "flat", "param": None, "recall": 1.0, "ms_per_query": flat_ms, "build_s": 0.0,
+        "bytes_per_vector": bytes_per_vector(flat),
+    }]
+
+    for index_type in index_types:
+        if index_type == "flat":
+            continue
+        start = time.perf_counter()
+        index = build_faiss_index(dim, index_type, nlist=nlist)
+        if INDEX_TYPES[index_type]:
+            index.train(vectors)
+        index.add(vectors)
+        build_s = time.perf_counter() - start
+
+        if index_type.startswith("ivf"):
+            settings = [("nprobe", value) for value in nprobes]
+        elif index_type == "hnsw":
+            settings = [("efSearch", value) for value in ef_searches]
+        elif index_type in RERANKED_INDEX_TYPES:
+            settings = [("rerank", value) for value in rerank_factors]
+        else:
+            settings = [(None, None)]
+
+        for name, value in settings:
+            if name == "nprobe":
+                set_search_params(index, nprobe=value)
+            elif name == "efSearch":
+                set_search_params(index, ef_search=value)
+            start = time.perf_counter()
+            if name == "rerank":
+                _, candidates = index.search(queries, top_k * value)
+                found = rerank(vectors, queries, candidates, top_k)
+            else:
+                _, found = index.search(queries, top_k)
+            ms = (time.perf_counter() - start) * 1000 / len(queries)
+            rows.append({
+                "index_type": index_type,
+                "param": f"{name}={value}" if name else None,
+                "recall": recall_at_k(ground_truth, found),
+                "ms_per_query": ms,
+                "build_s": build_s,
+                "bytes_per_vector": bytes_per_vector(index),
+            })
+    return rows
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--n-vectors", type=int, default=100_000)
+    parser.add_argument("--n-queries", type=int, default=1000)
+    parser.add_argument("--dim", type=int, default=384)
+    parser.add_argument("--top-k", type=int, default=10)
+    parser.add_argument("--nlist", type=int, default=1024)
+    parser.add_argument("--index-types", nargs="+", default=[t for t in INDEX_TYPES if t != "flat"])
+    parser.add_argument("--nprobe", nargs="+", type=int, default=[1, 4, 16, 64])
+    parser.add_argument("--ef-search", nargs="+", type=int, default=[16, 64, 256])
+    parser.add_argument("--rerank-factor", nargs="+", type=int, default=[1, 4, 16])
+    args = parser.parse_args()
+
+    data = synthetic_vectors(args.n_vectors + args.n_queries, args.dim)
+    vectors, queries = data[:args.n_vectors], data[args.n_vectors:]
+    rows = run_report(vectors, queries, args.top_k, args.index_types, args.nlist, args.nprobe, args.ef_search, args.rerank_factor)
+
+    print(f"{'index':<10} {'param':<14} {'recall@' + str(args.top_k):>10} {'ms/query':>10} {'build s':>9} {'bytes/vec':>10}")
+    for row in rows:
+        print(
+            f"{row['index_type']:<10} {row['param'] or '-':<14} {row['recall']:>10.4f} {row['ms_per_query']:>10.4f} "
+            f"{row['build_s']:>9.2f} {row['bytes_per_vector']:>10.1f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,113 @@
+"""
+Chunking benchmark: compares the fixed character-window chunker with the
+structured, token-sized chunker on the documents in uploads/ (or the given
+files). Reports chunk counts, total indexed tokens, chunk sizes, how many
+chunks exceed the model's sequence length, how many Q/A pairs end up split
+from their answer, and chunking throughput.
+
+Usage (from the project root):
+    python -m benchmarks.chunking
+    python -m benchmarks.chunking uploads/amazon_faq.pdf --max-tokens 200 --model all-MiniLM-L6-v2
+"""
+
+import argparse
+import glob
+import json
+import os
+import time
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+from config import GeneralCfg
+from services.IO_manager import IOManager
+from services.chunker import StructuredChunker, TokenCounter, estimate_tokens, tokenizer_counter
+from services.pdf_extractor import PdfExtractor
+from utils.utils import iter_page_chunks
+
+
+def qa_pairs(chunker: StructuredChunker, pages: List[Tuple[Optional[int], str]]) -> List[Tuple[str, str]]:
+    """
+    Returns (question, start of answer) for every Q/A pair the structured chunker detects.
+    """
+    return [(question, answer[:40]) for question, answer in chunker.iter_qa_pairs(pages)]
+
+
+def split_pairs(chunks: List[str], pairs: List[Tuple[str, str]]) -> int:
+    """
+    Counts Q/A pairs whose question and answer start never share a chunk.
+    Whitespace is normalized first, since the chunkers join lines differently,
+    and numbering stripped from the questions is not required.
+    """
+    normalized = [" ".join(chunk.split()) for chunk in chunks]
+    return sum(
+        not any(" ".join(question.split()) in chunk and " ".join(answer.split()) in chunk for chunk in normalized)
+        for question, answer in pairs
+    )
+
+
+def measure(
+    name: str,
+    chunk: Callable[[], Iterable[Tuple[str, dict]]],
+    count_tokens: TokenCounter,
+    model_max_tokens: int,
+    pairs: List[Tuple[str, str]],
+    n_chars: int
+) -> Dict:
+    start = time.perf_counter()
+    chunks = [text for text, _ in chunk()]
+    elapsed = time.perf_counter() - start
+    tokens = count_tokens(chunks)
+    return {
+        "chunker": name,
+        "chunks": len(chunks),
+        "total_tokens": sum(tokens),
+        "mean_tokens": sum(tokens) / len(tokens) if tokens else 0.0,
+        "max_tokens": max(tokens, default=0),
+        "over_model_limit": sum(n > model_max_tokens for n in tokens),
+        "qa_pairs_split": split_pairs(chunks, pairs),
+        "chunking_ms": elapsed * 1000,
+        "mb_per_s": n_chars / 1e6 / elapsed if elapsed else None,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("files", nargs="*", help="Documents to chunk (default: everything in uploads/)")
+    parser.add_argument("--n-char", type=int, default=GeneralCfg.n_char)
+    parser.add_argument("--overlap", type=int, default=GeneralCfg.overlap)
+    parser.add_argument("--max-tokens", type=int, default=GeneralCfg.chunk_max_tokens)
+    parser.add_argument("--overlap-tokens", type=int, default=GeneralCfg.chunk_overlap_tokens)
+    parser.add_argument("--model", default=None, help="Count tokens with this sentence-transformer's tokenizer (default: estimate)")
+    parser.add_argument("--model-max-tokens", type=int, default=256, help="Model sequence length used for the over-limit count")
+    parser.add_argument("--repeat", type=int, default=5, help="Chunk each document this many times and keep the fastest")
+    args = parser.parse_args()
+
+    count_tokens = estimate_tokens
+    if args.model:
+        from sentence_transformers import SentenceTransformer
+        count_tokens = tokenizer_counter(SentenceTransformer(args.model).tokenizer)
+
+    io_manager = IOManager(pdf_extractor=PdfExtractor(max_workers=1))
+    files = args.files or sorted(
+        path for path in glob.glob(os.path.join("uploads", "*"))
+        if os.path.splitext(path)[1].lower() in (".pdf", ".txt", ".docx")
+    )
+    structured = StructuredChunker(max_tokens=args.max_tokens, overlap_tokens=args.overlap_tokens, count_tokens=count_tokens)
+    report = []
+    for path in files:
+        # Extract once up front so the timings cover chunking only
+        pages = list(io_manager.iter_pages(path))
+        n_chars = sum(len(text) for _, text in pages)
+        pairs = qa_pairs(structured, pages)
+        runs = {
+            "characters": lambda: iter_page_chunks(pages, args.n_char, args.overlap),
+            "structured": lambda: structured.iter_chunks(pages),
+        }
+        for name, chunk in runs.items():
+            results = [measure(name, chunk, count_tokens, args.model_max_tokens, pairs, n_chars) for _ in range(args.repeat)]
+            best = min(results, key=lambda result: result["chunking_ms"])
+            report.append(dict(best, file=path, chars=n_chars, qa_pairs=len(pairs)))
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
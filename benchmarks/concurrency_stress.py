@@ -0,0 +1,175 @@
+"""
+Concurrency stress test for FaissVectorDatabase: reader threads search while
+writer threads ingest, and a swapper thread periodically saves, reloads and
+clears the index. Every search result is checked for a consistent
+(vector, text, metadata) triple; the run fails on the first mismatch.
+
+Texts are embedded with a deterministic hash-seeded embedding instead of the
+sentence transformer, so the test needs no model and the expected nearest
+neighbour of every query is known.
+
+Usage (from the project root):
+    python -m benchmarks.concurrency_stress --seconds 20 --readers 8 --writers 2
+    python -m benchmarks.concurrency_stress --index-type ivf_flat --min-train-vectors 2000
+"""
+
+import argparse
+import hashlib
+import json
+import logging
+import tempfile
+import threading
+import time
+from typing import Dict, List
+
+import faiss
+import numpy as np
+
+from schemas.general_schemas import TextEmbedder
+from services.faiss_manager import FaissVectorDatabase
+
+
+class HashEmbedder(TextEmbedder):
+    """
+    Embedder whose embedding of a text is a random unit vector seeded by the text.
+    """
+
+    def __init__(self, dim: int) -> None:
+        self.model_name = self.name = "hash-embedding"
+        self._dim = dim
+
+    @property
+    def dim(self) -> int:
+        return self._dim
+
+    @property
+    def tokenizer(self):
+        raise NotImplementedError("HashEmbedder has no tokenizer")
+
+    def embed(self, texts: List[str]) -> np.ndarray:
+        vectors = np.empty((len(texts), self.dim), dtype=np.float32)
+        for i, text in enumerate(texts):
+            seed = int.from_bytes(hashlib.blake2b(text.encode("utf-8"), digest_size=8).digest(), "little")
+            vectors[i] = np.random.default_rng(seed).standard_normal(self.dim)
+        faiss.normalize_L2(vectors)
+        return vectors
+
+
+def chunk_text(i: int) -> str:
+    return f"chunk {i}"
+
+
+def run(args: argparse.Namespace) -> Dict:
+    logger = logging.getLogger("concurrency_stress")
+    database = FaissVectorDatabase(
+        embedder=HashEmbedder(args.dim),
+        logger=logger,
+        index_type=args.index_type,
+        nlist=args.nlist,
+        min_train_vectors=args.min_train_vectors,
+        nprobe=args.nlist,
+        delta_max_vectors=args.delta_max_vectors
+    )
+    stop = threading.Event()
+    errors: List[str] = []
+    next_id = [0]
+    id_lock = threading.Lock()
+    latencies: List[float] = []
+    counts = {"searches": 0, "adds": 0, "swaps": 0}
+    counts_lock = threading.Lock()
+
+    def fail(message: str) -> None:
+        errors.append(message)
+        stop.set()
+
+    def writer() -> None:
+        while not stop.is_set():
+            with id_lock:
+                ids = range(next_id[0], next_id[0] + args.batch_size)
+                next_id[0] += args.batch_size
+            database.add_texts([chunk_text(i) for i in ids], [{"i": i} for i in ids])
+            with counts_lock:
+                counts["adds"] += 1
+
+    def reader(seed: int) -> None:
+        rng = np.random.default_rng(seed)
+        while not stop.is_set():
+            n_issued = next_id[0]
+            if not n_issued:
+                time.sleep(0.001)
+                continue
+            i = int(rng.integers(0, n_issued))
+            query = database.embed_texts([chunk_text(i)])
+            start = time.perf_counter()
+            results = database.search_batch_by_vectors(query, top_k=args.top_k, include_metadata=True)[0]
+            elapsed = time.perf_counter() - start
+            for text, similarity, metadata in results:
+                if metadata is None or text != chunk_text(metadata["i"]):
+                    return fail(f"text {text!r} returned with metadata {metadata!r}")
+                expected = float(database.embed_texts([text]) @ query[0])
+                if abs(expected - similarity) > 1e-3 and args.index_type in ("flat", "ivf_flat", "hnsw", "fp16", "binary"):
+                    return fail(f"text {text!r} returned with similarity {similarity:.4f}, its vector gives {expected:.4f}")
+            if results and results[0][1] > 0.999 and results[0][0] != chunk_text(i):
+                return fail(f"query for {chunk_text(i)!r} matched {results[0][0]!r} exactly")
+            with counts_lock:
+                counts["searches"] += 1
+                latencies.append(elapsed)
+
+    def swapper(path: str) -> None:
+        while not stop.wait(args.swap_interval):
+            database.save_index(path)
+            database.load_index(path)
+            counts["swaps"] += 1
+            if args.clear_every and counts["swaps"] % args.clear_every == 0:
+                database.clear_index()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        threads = [threading.Thread(target=writer) for _ in range(args.writers)]
+        threads += [threading.Thread(target=reader, args=(seed,)) for seed in range(args.readers)]
+        if args.swap_interval > 0:
+            threads.append(threading.Thread(target=swapper, args=(tmp,)))
+        for thread in threads:
+            thread.start()
+        stop.wait(args.seconds)
+        stop.set()
+        for thread in threads:
+            thread.join()
+
+    latencies_ms = np.array(latencies or [0.0]) * 1000
+    return {
+        "ok": not errors,
+        "errors": errors,
+        "index_type": args.index_type,
+        "vectors": database.ntotal,
+        "trained": database.is_trained,
+        **counts,
+        "search_p50_ms": float(np.percentile(latencies_ms, 50)),
+        "search_p99_ms": float(np.percentile(latencies_ms, 99)),
+        "search_max_ms": float(latencies_ms.max()),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--seconds", type=float, default=10.0)
+    parser.add_argument("--readers", type=int, default=8)
+    parser.add_argument("--writers", type=int, default=2)
+    parser.add_argument("--batch-size", type=int, default=64)
+    parser.add_argument("--top-k", type=int, default=5)
+    parser.add_argument("--dim", type=int, default=64)
+    parser.add_argument("--index-type", default="flat")
+    parser.add_argument("--nlist", type=int, default=16)
+    parser.add_argument("--min-train-vectors", type=int, default=None)
+    parser.add_argument("--delta-max-vectors", type=int, default=2000)
+    parser.add_argument("--swap-interval", type=float, default=1.0, help="Seconds between save/load swaps; 0 disables them")
+    parser.add_argument("--clear-every", type=int, default=0, help="Clear the index after every N swaps; 0 never clears")
+    args = parser.parse_args()
+
+    report = run(args)
+    print(json.dumps(report, indent=2))
+    if not report["ok"]:
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,129 @@
+"""
+Embedding backend benchmark: embeds the same texts with each TextEmbedder
+backend (PyTorch sentence transformer, ONNX Runtime export, int8 quantized
+ONNX export) and reports load time, batch throughput, single-query latency
+and embedding drift against the sentence transformer: the cosine similarity
+of each text's two embeddings, and how many of each query's top-k neighbours
+are still found.
+
+Texts are the lines of the given files, or synthetic FAQ-style sentences.
+
+Usage (from the project root):
+    python -m benchmarks.embedding_backends --texts 2000
+    python -m benchmarks.embedding_backends faq_lines.txt --backends onnx onnx_int8 --threads 4
+"""
+
+import argparse
+import json
+import random
+import time
+from typing import Dict, List
+
+import numpy as np
+
+from config import GeneralCfg
+from services.text_embedder import EMBEDDING_BACKENDS, build_text_embedder
+
+
+SUBJECTS = ["my order", "a refund", "the package", "my account", "the password", "a return label", "Prime", "the invoice"]
+ACTIONS = ["track", "cancel", "change", "reset", "find", "update", "print", "contact support about"]
+
+
+def synthetic_texts(n: int, seed: int = 0) -> List[str]:
+    rng = random.Random(seed)
+    texts = []
+    for i in range(n):
+        question = f"How do I {rng.choice(ACTIONS)} {rng.choice(SUBJECTS)}?"
+        answer = " ".join(f"Step {j + 1}: {rng.choice(ACTIONS)} {rng.choice(SUBJECTS)}." for j in range(rng.randint(1, 12)))
+        texts.append(f"{question} {answer}")
+    return texts
+
+
+def normalize(vectors: np.ndarray) -> np.ndarray:
+    return vectors / np.maximum(np.linalg.norm(vectors, axis=1, keepdims=True), 1e-12)
+
+
+def measure(backend: str, texts: List[str], queries: List[str], args: argparse.Namespace) -> Dict:
+    start = time.perf_counter()
+    embedder = build_text_embedder(
+        backend,
+        args.model,
+        batch_size=args.batch_size,
+        onnx_model_dir=args.onnx_model_dir,
+        onnx_threads=args.threads
+    )
+    embedder.embed(["warm up"])
+    load_s = time.perf_counter() - start
+
+    start = time.perf_counter()
+    vectors = embedder.embed(texts)
+    batch_s = time.perf_counter() - start
+
+    latencies = []
+    for query in queries:
+        start = time.perf_counter()
+        embedder.embed([query])
+        latencies.append(time.perf_counter() - start)
+    return {
+        "backend": backend,
+        "load_s": load_s,
+        "texts_per_s": len(texts) / batch_s,
+        "query_p50_ms": float(np.percentile(latencies, 50)) * 1000,
+        "query_p95_ms": float(np.percentile(latencies, 95)) * 1000,
+        "vectors": normalize(vectors),
+    }
+
+
+def drift(vectors: np.ndarray, baseline: np.ndarray, n_queries: int, top_k: int) -> Dict:
+    """
+    Compares embeddings of the same texts: per-text cosine agreement, and the
+    overlap of the top-k neighbours of the first `n_queries` texts.
+    """
+    cosines = np.sum(vectors * baseline, axis=1)
+    top_k = min(top_k, len(baseline))
+    neighbours = np.argsort(-(vectors[:n_queries] @ vectors.T), axis=1)[:, :top_k]
+    expected = np.argsort(-(baseline[:n_queries] @ baseline.T), axis=1)[:, :top_k]
+    overlap = np.mean([len(set(a) & set(b)) / top_k for a, b in zip(neighbours, expected)])
+    return {
+        "cosine_mean": float(cosines.mean()),
+        "cosine_min": float(cosines.min()),
+        f"top{top_k}_overlap": float(overlap),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("files", nargs="*", help="Text files, one text per line (default: synthetic texts)")
+    parser.add_argument("--backends", nargs="+", default=list(EMBEDDING_BACKENDS), choices=EMBEDDING_BACKENDS)
+    parser.add_argument("--model", default=GeneralCfg.text_embedding_model_name)
+    parser.add_argument("--texts", type=int, default=1000, help="Number of texts to embed")
+    parser.add_argument("--queries", type=int, default=200, help="Number of single-text calls timed")
+    parser.add_argument("--batch-size", type=int, default=GeneralCfg.text_embedding_batch_size)
+    parser.add_argument("--threads", type=int, default=GeneralCfg.onnx_threads, help="ONNX Runtime threads per call")
+    parser.add_argument("--onnx-model-dir", default=GeneralCfg.onnx_model_dir)
+    parser.add_argument("--top-k", type=int, default=10)
+    args = parser.parse_args()
+
+    texts = []
+    for path in args.files:
+        with open(path, "r", encoding="utf-8") as f:
+            texts.extend(line.strip() for line in f if line.strip())
+    texts = texts[:args.texts] if texts else synthetic_texts(args.texts)
+    queries = [text.split("?")[0] + "?" for text in texts[:args.queries]]
+
+    backends = list(dict.fromkeys(["sentence_transformers"] + args.backends))
+    results = [measure(backend, texts, queries, args) for backend in backends]
+    baseline = results[0]["vectors"]
+    report = []
+    for result in results:
+        vectors = result.pop("vectors")
+        if result["backend"] not in args.backends:
+            continue
+        result.update(drift(vectors, baseline, len(queries), args.top_k))
+        result["speedup"] = result["texts_per_s"] / results[0]["texts_per_s"]
+        report.append(result)
+    print(json.dumps({"model": args.model, "texts": len(texts), "results": report}, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,250 @@
+"""
+Local fake of the Gemini REST API and of the OpenAI chat completions API
+(`/v1/chat/completions`) for testing the LLM client layer without quota or
+network: `generateContent` and `streamGenerateContent` with a configurable
+latency distribution, slow-tail probability, error rate and request rate
+limit (answered with 429 like the real quota errors).
+
+`FakeLLMAPIManager` gives the same replies in-process, after a fixed latency,
+for benchmarks that need a deterministic LLM rather than a realistic client.
+
+The reply is a JSON list with one Q&A object echoing the prompt's question,
+streamed in a few chunks for streaming requests.
+
+Usage (from the project root):
+    python -m benchmarks.fake_llm_server --port 8081 --latency-ms 300 --slow-rate 0.05 --error-rate 0.02
+
+Point the app at it with `GeneralCfg.llm_api_endpoint = "http://127.0.0.1:8081"`, or
+`GeneralCfg.openai_compatible_base_url = "http://127.0.0.1:8081/v1"`.
+"""
+
+import argparse
+import asyncio
+import json
+import random
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Iterator, List, Optional
+from urllib.parse import parse_qs, urlparse
+
+from schemas.general_schemas import LLMAPIManager
+
+
+QUESTION_PATTERN = re.compile(r"User Question: `(.*?)`", re.S)
+
+
+class FakeLLMBehaviour:
+    """
+    Latency, failure and rate-limit settings of the fake server, shared by its handler threads.
+    """
+
+    def __init__(
+        self,
+        latency_ms: float = 200.0,
+        jitter_ms: float = 50.0,
+        slow_rate: float = 0.0,
+        slow_ms: float = 5000.0,
+        error_rate: float = 0.0,
+        rate_limit_per_s: Optional[float] = None,
+        n_stream_chunks: int = 4
+    ) -> None:
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.slow_rate = slow_rate
+        self.slow_ms = slow_ms
+        self.error_rate = error_rate
+        self.rate_limit_per_s = rate_limit_per_s
+        self.n_stream_chunks = n_stream_chunks
+        self.requests = 0
+        self._window_start = time.monotonic()
+        self._window_requests = 0
+        self._lock = threading.Lock()
+
+    def latency_s(self) -> float:
+        if random.random() < self.slow_rate:
+            return self.slow_ms / 1000
+        return max(random.gauss(self.latency_ms, self.jitter_ms), 0.0) / 1000
+
+    def status(self) -> int:
+        """
+        Returns the HTTP status the next request gets: 200, 429 (over the rate limit) or 503.
+        """
+        with self._lock:
+            self.requests += 1
+            now = time.monotonic()
+            if now - self._window_start >= 1.0:
+                self._window_start, self._window_requests = now, 0
+            self._window_requests += 1
+            if self.rate_limit_per_s is not None and self._window_requests > self.rate_limit_per_s:
+                return 429
+        return 503 if random.random() < self.error_rate else 200
+
+
+def answer_text(prompt: str) -> str:
+    match = QUESTION_PATTERN.search(prompt)
+    question = match.group(1) if match else prompt[:80]
+    return json.dumps([{"question": question, "answer": "This is a fake answer.", "score": 0.9}])
+
+
+class FakeLLMAPIManager(LLMAPIManager):
+    """
+    In-process LLM client answering every prompt with `answer_text(prompt)`
+    after exactly `latency_ms`, streamed in `n_stream_chunks` pieces.
+    """
+
+    def __init__(self, latency_ms: float = 200.0, n_stream_chunks: int = 4) -> None:
+        self.latency_ms = latency_ms
+        self.n_stream_chunks = n_stream_chunks
+        self.calls = 0
+        self._lock = threading.Lock()
+
+    def _count(self) -> None:
+        with self._lock:
+            self.calls += 1
+
+    def validate(self) -> bool:
+        return True
+
+    def send_message(self, message: Dict[str, str]) -> str:
+        return self.send_prompt(message.get("content", ""))
+
+    def send_messages(self, messages: List[Dict[str, str]]) -> str:
+        return self.send_prompt("".join(message.get("content", "") for message in messages))
+
+    def send_prompt(self, prompt: str) -> str:
+        self._count()
+        time.sleep(self.latency_ms / 1000)
+        return answer_text(prompt)
+
+    async def send_prompt_async(self, prompt: str) -> str:
+        self._count()
+        await asyncio.sleep(self.latency_ms / 1000)
+        return answer_text(prompt)
+
+    def stream_prompt(self, prompt: str) -> Iterator[str]:
+        self._count()
+        text = answer_text(prompt)
+        size = -(-len(text) // self.n_stream_chunks)
+        for i in range(0, len(text), size):
+            time.sleep(self.latency_ms / 1000 / self.n_stream_chunks)
+            yield text[i:i + size]
+
+
+def gemini_response(text: str) -> Dict:
+    return {
+        "candidates": [{"content": {"parts": [{"text": text}], "role": "model"}, "finishReason": "STOP", "index": 0}],
+        "usageMetadata": {"promptTokenCount": 0, "candidatesTokenCount": 0, "totalTokenCount": 0}
+    }
+
+
+def openai_response(text: str, stream: bool = False) -> Dict:
+    if stream:
+        return {"object": "chat.completion.chunk", "choices": [{"index": 0, "delta": {"content": text}, "finish_reason": None}]}
+    return {
+        "object": "chat.completion",
+        "choices": [{"index": 0, "message": {"role": "assistant", "content": text}, "finish_reason": "stop"}]
+    }
+
+
+def make_handler(behaviour: FakeLLMBehaviour):
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def log_message(self, format, *args):
+            pass
+
+        def _send_json(self, status: int, payload: Dict) -> None:
+            body = json.dumps(payload).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_POST(self):
+            url = urlparse(self.path)
+            request = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+            prompt = "".join(
+                part.get("text", "") for content in request.get("contents", []) for part in content.get("parts", [])
+            ) + "".join(message.get("content", "") for message in request.get("messages", []))
+            status = behaviour.status()
+            time.sleep(behaviour.latency_s())
+            if status != 200:
+                message = "Resource has been exhausted (e.g. check quota)." if status == 429 else "The service is currently unavailable."
+                self._send_json(status, {"error": {"code": status, "message": message, "status": "RESOURCE_EXHAUSTED" if status == 429 else "UNAVAILABLE"}})
+            elif url.path.endswith("/chat/completions"):
+                if request.get("stream"):
+                    self._stream(answer_text(prompt), sse=True, openai=True)
+                else:
+                    self._send_json(200, openai_response(answer_text(prompt)))
+            elif url.path.endswith(":generateContent"):
+                self._send_json(200, gemini_response(answer_text(prompt)))
+            elif url.path.endswith(":streamGenerateContent"):
+                self._stream(answer_text(prompt), sse=parse_qs(url.query).get("alt") == ["sse"])
+            else:
+                self._send_json(404, {"error": {"code": 404, "message": f"Unknown path {url.path}", "status": "NOT_FOUND"}})
+
+        def _stream(self, text: str, sse: bool, openai: bool = False) -> None:
+            size = -(-len(text) // behaviour.n_stream_chunks)
+            format_piece = (lambda piece: openai_response(piece, stream=True)) if openai else gemini_response
+            pieces = [json.dumps(format_piece(text[i:i + size])) for i in range(0, len(text), size)]
+            if openai:
+                pieces.append("[DONE]")
+            self.send_response(200)
+            self.send_header("Content-Type", "text/event-stream" if sse else "application/json")
+            self.send_header("Transfer-Encoding", "chunked")
+            self.end_headers()
+            for i, piece in enumerate(pieces):
+                data = f"data: {piece}\r\n\r\n" if sse else ("[" if i == 0 else ",\r\n") + piece + ("]" if i == len(pieces) - 1 else "")
+                payload = data.encode("utf-8")
+                self.wfile.write(f"{len(payload):X}\r\n".encode("ascii") + payload + b"\r\n")
+                self.wfile.flush()
+                time.sleep(behaviour.latency_ms / 1000 / behaviour.n_stream_chunks)
+            self.wfile.write(b"0\r\n\r\n")
+
+    return Handler
+
+
+def start_server(behaviour: FakeLLMBehaviour, host: str = "127.0.0.1", port: int = 0) -> ThreadingHTTPServer:
+    """
+    Starts the fake server on a daemon thread; port 0 picks a free port (see `server.server_port`).
+    """
+    server = ThreadingHTTPServer((host, port), make_handler(behaviour))
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name="fake-llm-server", daemon=True).start()
+    return server
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8081)
+    parser.add_argument("--latency-ms", type=float, default=200.0)
+    parser.add_argument("--jitter-ms", type=float, default=50.0)
+    parser.add_argument("--slow-rate", type=float, default=0.0, help="Fraction of requests that take --slow-ms")
+    parser.add_argument("--slow-ms", type=float, default=5000.0)
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Fraction of requests answered with 503")
+    parser.add_argument("--rate-limit", type=float, default=None, help="Requests per second before 429s")
+    args = parser.parse_args()
+
+    behaviour = FakeLLMBehaviour(
+        latency_ms=args.latency_ms,
+        jitter_ms=args.jitter_ms,
+        slow_rate=args.slow_rate,
+        slow_ms=args.slow_ms,
+        error_rate=args.error_rate,
+        rate_limit_per_s=args.rate_limit
+    )
+    server = ThreadingHTTPServer((args.host, args.port), make_handler(behaviour))
+    print(f"Fake Gemini API listening on http://{args.host}:{args.port}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
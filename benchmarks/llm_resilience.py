@@ -0,0 +1,100 @@
+"""
+LLM client resilience benchmark: sends prompts through the Gemini client to a
+local fake Gemini server (benchmarks.fake_llm_server) with a slow tail, errors
+and a quota, once with the bare client and once through
+ResilientLLMAPIManager. Reports success rate, latency percentiles, and the
+retry, hedge and circuit breaker counters.
+
+Usage (from the project root):
+    python -m benchmarks.llm_resilience --requests 400 --concurrency 16 --slow-rate 0.05 --error-rate 0.05
+    python -m benchmarks.llm_resilience --rate-limit 20 --client-rate-limit 18
+"""
+
+import argparse
+import json
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List
+
+from benchmarks.fake_llm_server import FakeLLMBehaviour, start_server
+from services.llm_api_manager import GeminiLLMAPIManager
+from services.resilient_llm import ResilientLLMAPIManager
+
+
+PROMPT = "User Question: `How do I track my package?`"
+
+
+def percentile(values: List[float], q: float) -> float:
+    values = sorted(values)
+    return values[min(int(len(values) * q), len(values) - 1)] if values else 0.0
+
+
+def run(name: str, llm_api_manager, n_requests: int, concurrency: int) -> Dict:
+    def call(_):
+        start = time.perf_counter()
+        try:
+            llm_api_manager.send_prompt(PROMPT)
+            return True, time.perf_counter() - start
+        except Exception:
+            return False, time.perf_counter() - start
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        results = list(executor.map(call, range(n_requests)))
+    elapsed = time.perf_counter() - start
+    latencies = [latency for ok, latency in results if ok]
+    report = {
+        "client": name,
+        "success_rate": len(latencies) / n_requests,
+        "p50_ms": percentile(latencies, 0.50) * 1000,
+        "p95_ms": percentile(latencies, 0.95) * 1000,
+        "p99_ms": percentile(latencies, 0.99) * 1000,
+        "requests_per_s": n_requests / elapsed,
+    }
+    stats = getattr(llm_api_manager, "stats", None)
+    if stats is not None:
+        report["stats"] = stats()
+    return report
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--latency-ms", type=float, default=200.0)
+    parser.add_argument("--slow-rate", type=float, default=0.05)
+    parser.add_argument("--slow-ms", type=float, default=5000.0)
+    parser.add_argument("--error-rate", type=float, default=0.05)
+    parser.add_argument("--rate-limit", type=float, default=None, help="Server quota in requests per second")
+    parser.add_argument("--client-rate-limit", type=float, default=None, help="Token-bucket rate of the resilient client")
+    parser.add_argument("--timeout", type=float, default=3.0)
+    args = parser.parse_args()
+
+    behaviour = FakeLLMBehaviour(
+        latency_ms=args.latency_ms,
+        slow_rate=args.slow_rate,
+        slow_ms=args.slow_ms,
+        error_rate=args.error_rate,
+        rate_limit_per_s=args.rate_limit
+    )
+    server = start_server(behaviour)
+    endpoint = f"http://127.0.0.1:{server.server_port}"
+    bare = GeminiLLMAPIManager(api_key="fake", model_name="gemini-2.0-flash", api_endpoint=endpoint)
+    resilient = ResilientLLMAPIManager(
+        GeminiLLMAPIManager(api_key="fake", model_name="gemini-2.0-flash", timeout_s=args.timeout, api_endpoint=endpoint),
+        logger=logging.getLogger("llm_resilience"),
+        timeout_s=args.timeout,
+        backoff_base_s=0.1,
+        rate_limit_per_s=args.client_rate_limit
+    )
+    report = [
+        run("bare", bare, args.requests, args.concurrency),
+        run("resilient", resilient, args.requests, args.concurrency),
+    ]
+    server.shutdown()
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
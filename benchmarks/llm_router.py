@@ -0,0 +1,71 @@
+"""
+LLM router benchmark: starts fake OpenAI-compatible servers
+(benchmarks.fake_llm_server) with different latency and error rates, routes
+prompts between them with LLMRouter, and reports how traffic was split, the
+success rate and latency percentiles. Halfway through, the fastest server
+starts failing every request, to show failover.
+
+Usage (from the project root):
+    python -m benchmarks.llm_router --requests 400 --concurrency 8
+"""
+
+import argparse
+import json
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from benchmarks.fake_llm_server import FakeLLMBehaviour, start_server
+from benchmarks.llm_resilience import PROMPT, percentile
+from services.llm_api_manager import OpenAICompatibleLLMAPIManager
+from services.llm_router import LLMProvider, LLMRouter
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=400)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--cost-weight", type=float, default=0.5)
+    args = parser.parse_args()
+
+    # name -> (behaviour, price per million tokens)
+    backends = {
+        "fast": (FakeLLMBehaviour(latency_ms=80, jitter_ms=20), 0.6),
+        "cheap": (FakeLLMBehaviour(latency_ms=250, jitter_ms=50), 0.0),
+        "flaky": (FakeLLMBehaviour(latency_ms=60, jitter_ms=20, error_rate=0.3), 0.1),
+    }
+    servers = []
+    providers = []
+    for name, (behaviour, cost) in backends.items():
+        server = start_server(behaviour)
+        servers.append(server)
+        manager = OpenAICompatibleLLMAPIManager(base_url=f"http://127.0.0.1:{server.server_port}/v1", model_name="fake", timeout_s=10)
+        providers.append(LLMProvider(name=name, manager=manager, cost_per_1m_tokens=cost))
+    router = LLMRouter(providers, logger=logging.getLogger("llm_router"), cost_weight=args.cost_weight)
+
+    def call(i):
+        if i == args.requests // 2:
+            backends["fast"][0].error_rate = 1.0
+        start = time.perf_counter()
+        try:
+            router.send_prompt(PROMPT)
+            return True, time.perf_counter() - start
+        except Exception:
+            return False, time.perf_counter() - start
+
+    with ThreadPoolExecutor(max_workers=args.concurrency) as executor:
+        results = list(executor.map(call, range(args.requests)))
+    latencies = [latency for ok, latency in results if ok]
+    for server in servers:
+        server.shutdown()
+    print(json.dumps({
+        "success_rate": len(latencies) / args.requests,
+        "p50_ms": percentile(latencies, 0.50) * 1000,
+        "p95_ms": percentile(latencies, 0.95) * 1000,
+        "server_requests": {name: behaviour.requests for name, (behaviour, _) in backends.items()},
+        "providers": router.stats(),
+    }, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,65 @@
+"""
+Startup-time benchmark: measures, in a fresh interpreter, how long it takes to
+import the app and to serve the first page and the first retrieval.
+
+Usage (from the project root):
+    python -m benchmarks.startup --runs 3
+    python -m benchmarks.startup --no-warm-up
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+
+
+CHILD = r"""
+import json, sys, time
+t0 = time.perf_counter()
+from config import GeneralCfg
+GeneralCfg.warm_up_on_start = {warm_up}
+import app
+t_import = time.perf_counter() - t0
+client = app.app.test_client()
+client.get('/')
+t_first_page = time.perf_counter() - t0
+app.faiss_vector_database.search('how do I track my order?', top_k=1)
+t_first_search = time.perf_counter() - t0
+print(json.dumps({{
+    'import_s': t_import,
+    'first_page_s': t_first_page,
+    'first_search_s': t_first_search,
+}}))
+"""
+
+
+def run_once(warm_up: bool) -> dict:
+    """
+    Starts a fresh interpreter and returns its timings in seconds.
+    """
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    output = subprocess.run(
+        [sys.executable, "-c", CHILD.format(warm_up=warm_up)],
+        cwd=root,
+        capture_output=True,
+        text=True,
+        check=True,
+    ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--no-warm-up", action="store_true", help="Disable the background warm-up thread")
+    args = parser.parse_args()
+
+    runs = [run_once(warm_up=not args.no_warm_up) for _ in range(args.runs)]
+    report = {key: min(run[key] for run in runs) for key in runs[0]}
+    report["runs"] = runs
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,444 @@
+"""
+Benchmark suite for comparing runs of the whole pipeline. Sections:
+
+    io        IOManager.load throughput on the documents in uploads/ (or the given files)
+    chunking  chunk_text throughput on their text, repeated up to --chunk-mb
+    index     FaissVectorDatabase.add_texts throughput, search latency and
+              recall@k against an exact flat database, on synthetic corpora of
+              each --n-chunks size (up to 1M chunks)
+    e2e       /ask latency through the Flask app, on an index of the documents,
+              with every LLM provider replaced by a FakeLLMAPIManager of fixed
+              latency, so the router and resilience layers are still timed
+
+Synthetic corpora and questions are seeded, and the synthetic embedder is
+deterministic, so two runs on one machine differ only by timing noise.
+
+The output is one JSON document: `meta` (commit, versions, settings),
+`metrics` (a flat name -> number map, the part that is compared) and
+`details`. With --baseline, every metric is compared with the same metric of
+an earlier run, and the exit status is 1 if any got worse by more than
+--threshold (relative). Metrics ending in `_per_s` and recall are better
+when higher, all others (latencies) when lower.
+
+Usage (from the project root):
+    python -m benchmarks.suite --output results.json
+    python -m benchmarks.suite --sections index --n-chunks 10000 100000 1000000 --index-type ivf_flat
+    python -m benchmarks.suite --output new.json --baseline results.json --threshold 0.1
+    python -m benchmarks.suite --compare results.json new.json --threshold 0.1
+"""
+
+import argparse
+import glob
+import hashlib
+import json
+import logging
+import os
+import platform
+import random
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Dict, Iterator, List, Optional
+
+import faiss
+import numpy as np
+
+from benchmarks.fake_llm_server import FakeLLMAPIManager
+from benchmarks.llm_resilience import percentile
+from config import GeneralCfg
+from schemas.general_schemas import TextEmbedder
+from services.IO_manager import IOManager
+from services.faiss_manager import INDEX_TYPES, FaissVectorDatabase
+from services.pdf_extractor import PdfExtractor
+from utils.utils import batched, chunk_text
+
+
+SECTIONS = ("io", "chunking", "index", "e2e")
+DOCUMENT_PATTERNS = ("*.pdf", "*.txt", "*.docx")
+FALLBACK_WORDS = "how do i track cancel change reset find update my order refund package account password invoice".split()
+
+logger = logging.getLogger("benchmarks.suite")
+
+
+class TopicEmbedder(TextEmbedder):
+    """
+    Deterministic embedder for synthetic corpora: a text starting with
+    "topic-<t>" is embedded as the centre of cluster t plus noise seeded by
+    the text. Clustered vectors resemble sentence embeddings, where uniform
+    random vectors would understate the recall of IVF and HNSW indexes.
+    """
+
+    def __init__(self, dim: int, n_topics: int, noise: float = 0.35, seed: int = 0) -> None:
+        self.model_name = self.name = f"topic-embedding-{dim}-{n_topics}-{seed}"
+        self._dim = dim
+        self.noise = noise
+        self.centers = np.random.default_rng(seed).standard_normal((n_topics, dim)).astype(np.float32)
+
+    @property
+    def dim(self) -> int:
+        return self._dim
+
+    @property
+    def tokenizer(self):
+        raise NotImplementedError("TopicEmbedder has no tokenizer")
+
+    def embed(self, texts: List[str]) -> np.ndarray:
+        vectors = np.empty((len(texts), self.dim), dtype=np.float32)
+        for i, text in enumerate(texts):
+            seed = int.from_bytes(hashlib.blake2b(text.encode("utf-8"), digest_size=8).digest(), "little")
+            prefix = text.split(" ", 1)[0]
+            topic = int(prefix[6:]) if prefix.startswith("topic-") and prefix[6:].isdigit() else seed
+            noise = np.random.default_rng(seed).standard_normal(self.dim)
+            vectors[i] = self.centers[topic % len(self.centers)] + self.noise * noise
+        faiss.normalize_L2(vectors)
+        return vectors
+
+
+def synthetic_texts(n: int, words: List[str], n_topics: int, n_words: int, kind: str = "chunk", seed: int = 0) -> Iterator[str]:
+    """
+    Yields `n` texts of `n_words` words drawn from `words`, each prefixed with
+    its topic and a unique id, e.g. "topic-17 chunk-42 ...".
+    """
+    rng = random.Random(f"{kind}-{seed}")
+    for i in range(n):
+        yield f"topic-{rng.randrange(n_topics)} {kind}-{i} " + " ".join(rng.choices(words, k=n_words))
+
+
+def document_paths(files: List[str]) -> List[str]:
+    if files:
+        return files
+    return sorted(path for pattern in DOCUMENT_PATTERNS for path in glob.glob(os.path.join("uploads", pattern)))
+
+
+def latency_metrics(prefix: str, latencies: List[float]) -> Dict[str, float]:
+    return {f"{prefix}_p{int(q * 100)}_ms": percentile(latencies, q) * 1000 for q in (0.50, 0.95, 0.99)}
+
+
+def run_io(paths: List[str], io_manager: IOManager, repeats: int) -> Dict:
+    metrics, details = {}, {}
+    total_bytes = total_s = 0.0
+    for path in paths:
+        timings = []
+        for _ in range(repeats):
+            start = time.perf_counter()
+            text = io_manager.load(path)
+            timings.append(time.perf_counter() - start)
+        size = os.path.getsize(path)
+        elapsed = statistics.median(timings)
+        name = os.path.basename(path)
+        metrics[f"io.{name}.mb_per_s"] = size / elapsed / 1e6
+        details[name] = {"bytes": size, "chars": len(text), "load_ms": elapsed * 1000}
+        total_bytes += size
+        total_s += elapsed
+    if total_s:
+        metrics["io.mb_per_s"] = total_bytes / total_s / 1e6
+    return {"metrics": metrics, "details": details}
+
+
+def run_chunking(texts: List[str], chunk_mb: float, n_char: int, overlap: int, repeats: int) -> Dict:
+    text = "\n".join(texts) or " ".join(FALLBACK_WORDS)
+    text = text * max(1, int(chunk_mb * 1e6 / len(text)))
+    timings = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        chunks = chunk_text(text, n_char, overlap)
+        timings.append(time.perf_counter() - start)
+    elapsed = statistics.median(timings)
+    return {
+        "metrics": {
+            "chunking.mb_per_s": len(text) / elapsed / 1e6,
+            "chunking.chunks_per_s": len(chunks) / elapsed,
+        },
+        "details": {"chars": len(text), "chunks": len(chunks), "n_char": n_char, "overlap": overlap},
+    }
+
+
+def build_database(embedder: TextEmbedder, index_type: str, args: argparse.Namespace) -> FaissVectorDatabase:
+    """
+    Builds a database configured like the app's (see `app.build_vector_database`),
+    hybrid search included, with the index settings given on the command line.
+    """
+    return FaissVectorDatabase(
+        embedder=embedder,
+        logger=logger,
+        index_type=index_type,
+        nlist=args.nlist,
+        pq_m=GeneralCfg.pq_m,
+        pq_nbits=GeneralCfg.pq_nbits,
+        hnsw_m=GeneralCfg.hnsw_m,
+        hnsw_ef_construction=GeneralCfg.hnsw_ef_construction,
+        nprobe=args.nprobe,
+        ef_search=args.ef_search,
+        min_train_vectors=GeneralCfg.min_train_vectors,
+        deduplicate=GeneralCfg.deduplicate_chunks,
+        delta_max_vectors=GeneralCfg.index_delta_max_vectors,
+        delta_growth=GeneralCfg.index_delta_growth,
+        hybrid=GeneralCfg.hybrid_search_enabled,
+        bm25_k1=GeneralCfg.bm25_k1,
+        bm25_b=GeneralCfg.bm25_b,
+        rrf_k=GeneralCfg.rrf_k,
+        hybrid_candidate_factor=GeneralCfg.hybrid_candidate_factor,
+        rerank_factor=GeneralCfg.rerank_factor
+    )
+
+
+def run_index(n_chunks: int, words: List[str], args: argparse.Namespace) -> Dict:
+    """
+    Ingests a synthetic corpus in batches, then times `top_k` searches and
+    compares their results with those of an exact flat database over the same
+    corpus, so recall measures only what the approximate index loses.
+    """
+    prefix = f"index.{n_chunks}"
+    embedder = TopicEmbedder(args.dim, args.n_topics, seed=args.seed)
+    database = build_database(embedder, args.index_type, args)
+    reference = build_database(embedder, "flat", args) if args.index_type != "flat" else database
+
+    add_s = 0.0
+    for batch in batched(synthetic_texts(n_chunks, words, args.n_topics, args.words_per_chunk, seed=args.seed), args.batch_size):
+        start = time.perf_counter()
+        database.add_texts(batch)
+        add_s += time.perf_counter() - start
+        if reference is not database:
+            reference.add_texts(batch)
+
+    queries = list(synthetic_texts(args.n_queries, words, args.n_topics, args.words_per_query, kind="question", seed=args.seed))
+    latencies = []
+    hits = 0
+    for query in queries:
+        start = time.perf_counter()
+        found = database.search(query, top_k=args.top_k)
+        latencies.append(time.perf_counter() - start)
+        expected = reference.search(query, top_k=args.top_k) if reference is not database else found
+        hits += len({text for text, _ in found} & {text for text, _ in expected})
+
+    metrics = {f"{prefix}.add_per_s": n_chunks / add_s}
+    metrics.update(latency_metrics(f"{prefix}.search", latencies))
+    metrics[f"{prefix}.recall_at_{args.top_k}"] = hits / (len(queries) * args.top_k)
+    details = {
+        "index_type": args.index_type,
+        "trained": database.is_trained,
+        "ntotal": database.ntotal,
+        "memory_mb": database.memory_bytes() / 2 ** 20,
+    }
+    return {"metrics": metrics, "details": details}
+
+
+def faq_questions(texts: List[str], n: int, seed: int) -> List[str]:
+    """
+    Returns `n` questions: the lines of the documents ending in "?", repeated if there are fewer.
+    """
+    lines = [line.strip() for text in texts for line in text.splitlines()]
+    questions = list(dict.fromkeys(line for line in lines if line.endswith("?") and len(line) > 10))
+    if not questions:
+        questions = [f"How do I {action} my order?" for action in FALLBACK_WORDS]
+    random.Random(seed).shuffle(questions)
+    return [questions[i % len(questions)] for i in range(n)]
+
+
+def run_e2e(paths: List[str], texts: List[str], args: argparse.Namespace) -> Dict:
+    """
+    Indexes the documents through the app's default collection and times
+    POST /ask with the Flask test client. The app is imported here, so its
+    embedding model is only loaded when this section runs.
+    """
+    GeneralCfg.warm_up_on_start = False
+    GeneralCfg.embedding_cache_dir = None
+    GeneralCfg.collections_dir = tempfile.mkdtemp(prefix="faq-bench-collections-")
+    import app as faq_app
+
+    try:
+        return time_e2e(faq_app, paths, texts, args)
+    finally:
+        faq_app.io_manager.pdf_extractor.close()
+
+
+def time_e2e(faq_app, paths: List[str], texts: List[str], args: argparse.Namespace) -> Dict:
+    fake_llm = FakeLLMAPIManager(latency_ms=args.llm_latency_ms)
+    # Replacing the providers keeps the router and the resilient client in the timed path
+    for provider in faq_app.llm_router.providers:
+        provider.manager = fake_llm
+    manager = faq_app.faq_answer_manager
+    if not args.answer_cache:
+        manager.answer_cache = None
+    manager.clear_faiss_index()
+
+    start = time.perf_counter()
+    n_chunks = sum(
+        manager.load_text_into_faiss(path, n_char=GeneralCfg.n_char, overlap=GeneralCfg.overlap, batch_size=GeneralCfg.ingest_batch_size)
+        for path in paths
+    )
+    ingest_s = time.perf_counter() - start
+
+    client = faq_app.app.test_client()
+    questions = faq_questions(texts, args.questions, args.seed)
+    client.post("/ask", json={"message": questions[0]})
+    fake_llm.calls = 0
+
+    latencies = []
+    stages: Dict[str, List[float]] = {}
+    errors = 0
+    start = time.perf_counter()
+    for question in questions:
+        request_start = time.perf_counter()
+        response = client.post("/ask", json={"message": question, "timings": True})
+        latencies.append(time.perf_counter() - request_start)
+        if response.status_code != 200:
+            errors += 1
+            continue
+        for stage, ms in (response.get_json().get("timings_ms") or {}).items():
+            stages.setdefault(stage, []).append(ms)
+    elapsed = time.perf_counter() - start
+
+    metrics = {"e2e.ingest_chunks_per_s": n_chunks / ingest_s if ingest_s else 0.0}
+    metrics.update(latency_metrics("e2e.ask", latencies))
+    metrics["e2e.requests_per_s"] = len(questions) / elapsed
+    details = {
+        "chunks": n_chunks,
+        "questions": len(questions),
+        "errors": errors,
+        "llm_calls": fake_llm.calls,
+        "llm_latency_ms": args.llm_latency_ms,
+        "stage_mean_ms": {stage: statistics.fmean(values) for stage, values in sorted(stages.items())},
+    }
+    return {"metrics": metrics, "details": details}
+
+
+def higher_is_better(metric: str) -> bool:
+    return metric.endswith("_per_s") or ".recall_at_" in metric
+
+
+def compare(baseline: Dict[str, float], current: Dict[str, float], threshold: float) -> List[Dict]:
+    """
+    Compares the metrics two runs have in common. A metric regresses when it
+    got worse by more than `threshold`, relative to the baseline.
+    """
+    rows = []
+    for metric in sorted(baseline.keys() & current.keys()):
+        old, new = baseline[metric], current[metric]
+        if not old:
+            continue
+        change = (new - old) / abs(old)
+        worse = -change if higher_is_better(metric) else change
+        rows.append({
+            "metric": metric,
+            "baseline": old,
+            "current": new,
+            "change": change,
+            "regression": worse > threshold,
+        })
+    return rows
+
+
+def git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(["git", "rev-parse", "HEAD"], capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run(args: argparse.Namespace) -> Dict:
+    paths = document_paths(args.files)
+    io_manager = IOManager(
+        pdf_extractor=PdfExtractor(max_workers=GeneralCfg.pdf_workers, pages_per_task=GeneralCfg.pdf_pages_per_task)
+    )
+    try:
+        return run_sections(paths, io_manager, args)
+    finally:
+        io_manager.pdf_extractor.close()
+
+
+def run_sections(paths: List[str], io_manager: IOManager, args: argparse.Namespace) -> Dict:
+    texts = [io_manager.load(path) for path in paths] if set(args.sections) - {"io"} else []
+    words = [word for text in texts for word in text.split()] or FALLBACK_WORDS
+
+    metrics, details = {}, {}
+    if "io" in args.sections:
+        result = run_io(paths, io_manager, args.repeats)
+        metrics.update(result["metrics"])
+        details["io"] = result["details"]
+    if "chunking" in args.sections:
+        result = run_chunking(texts, args.chunk_mb, GeneralCfg.n_char, GeneralCfg.overlap, args.repeats)
+        metrics.update(result["metrics"])
+        details["chunking"] = result["details"]
+    if "index" in args.sections:
+        details["index"] = {}
+        for n_chunks in args.n_chunks:
+            result = run_index(n_chunks, words, args)
+            metrics.update(result["metrics"])
+            details["index"][n_chunks] = result["details"]
+    if "e2e" in args.sections:
+        result = run_e2e(paths, texts, args)
+        metrics.update(result["metrics"])
+        details["e2e"] = result["details"]
+
+    meta = {
+        "time": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        "commit": git_commit(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+        "numpy": np.__version__,
+        "faiss": getattr(faiss, "__version__", None),
+        "documents": paths,
+        "args": {key: value for key, value in vars(args).items() if key not in ("baseline", "compare", "output")},
+    }
+    return {"meta": meta, "metrics": metrics, "details": details}
+
+
+def load_metrics(path: str) -> Dict[str, float]:
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)["metrics"]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("files", nargs="*", help="Documents for the io, chunking and e2e sections (default: uploads/)")
+    parser.add_argument("--sections", nargs="+", default=list(SECTIONS), choices=SECTIONS)
+    parser.add_argument("--output", help="Also write the results to this file")
+    parser.add_argument("--baseline", help="Results of an earlier run to compare with")
+    parser.add_argument("--compare", nargs=2, metavar=("BASELINE", "CURRENT"), help="Only compare two saved runs")
+    parser.add_argument("--threshold", type=float, default=0.1, help="Relative change that counts as a regression")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--repeats", type=int, default=5, help="Runs of each io and chunking measurement (median is kept)")
+    parser.add_argument("--chunk-mb", type=float, default=20.0, help="Text size chunked by the chunking section")
+    parser.add_argument("--n-chunks", nargs="+", type=int, default=[10_000, 100_000], help="Synthetic corpus sizes")
+    parser.add_argument("--index-type", default=GeneralCfg.index_type, choices=list(INDEX_TYPES))
+    parser.add_argument("--nlist", type=int, default=GeneralCfg.ivf_nlist)
+    parser.add_argument("--nprobe", type=int, default=GeneralCfg.nprobe)
+    parser.add_argument("--ef-search", type=int, default=GeneralCfg.ef_search)
+    parser.add_argument("--dim", type=int, default=GeneralCfg.text_embedding_dim or 384)
+    parser.add_argument("--n-topics", type=int, default=1024, help="Clusters of the synthetic corpus")
+    parser.add_argument("--words-per-chunk", type=int, default=60)
+    parser.add_argument("--words-per-query", type=int, default=12)
+    parser.add_argument("--batch-size", type=int, default=GeneralCfg.ingest_batch_size, help="Chunks per add_texts call")
+    parser.add_argument("--n-queries", type=int, default=500)
+    parser.add_argument("--top-k", type=int, default=GeneralCfg.top_k)
+    parser.add_argument("--questions", type=int, default=200, help="Requests sent to /ask")
+    parser.add_argument("--llm-latency-ms", type=float, default=200.0, help="Latency of the fake LLM")
+    parser.add_argument("--answer-cache", action="store_true", help="Keep the semantic answer cache enabled for /ask")
+    args = parser.parse_args()
+
+    if args.compare:
+        results = {"metrics": load_metrics(args.compare[1])}
+        baseline = load_metrics(args.compare[0])
+    else:
+        results = run(args)
+        if args.output:
+            with open(args.output, "w", encoding="utf-8") as f:
+                json.dump(results, f, indent=2)
+        baseline = load_metrics(args.baseline) if args.baseline else None
+
+    if baseline is not None:
+        results["comparison"] = compare(baseline, results["metrics"], args.threshold)
+    print(json.dumps(results, indent=2))
+
+    regressions = [row["metric"] for row in results.get("comparison", []) if row["regression"]]
+    if regressions:
+        print(f"{len(regressions)} regression(s) beyond {args.threshold:.0%}: {', '.join(regressions)}", file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
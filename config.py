@@ -12,21 +12,185 @@ class GeneralCfg:
     GeneralCfg is a dataclass that holds configuration parameters for the chatbot application.
     Attributes:
     text_embedding_model_name (str): Name of the text embedding model to use. Default is "all-MiniLM-L6-v2".
-    llm_api_model_name (str): Name of the LLM API model to use. Default is "llama-3.3-70b-versatile".
-    n_char (int): Number of characters to process in each chunk. Default is 1000.
-    overlap (int): Number of overlapping characters between chunks. Default is 200.
+    text_embedding_dim (int | None): Embedding dimension of the text embedding model. When set, the model is loaded lazily on first use instead of at startup. Default is 384.
+    text_embedding_backend (str): How the embedding model runs: "sentence_transformers" (PyTorch), "onnx" (ONNX Runtime export) or "onnx_int8" (int8 dynamically quantized ONNX export). Default is "sentence_transformers".
+    text_embedding_batch_size (int): Number of texts run through the embedding model at a time. Default is 64.
+    onnx_model_dir (str): Directory where the ONNX exports are created on first use and reused afterwards. Default is "onnx_models".
+    onnx_threads (int | None): ONNX Runtime threads per embedding call; None uses all cores. Default is None.
+    llm_api_model_name (str): Name of the Gemini model to use. Default is "gemini-2.0-flash".
+    llm_providers (List[str]): LLM backends to route between: "gemini" (GEMINI_API_KEY), "groq" (GROQ_API_KEY) and "openai_compatible" (OPENAI_API_KEY if needed). Ties go to the first. Default is ["gemini"].
+    groq_model_name (str): Model served by Groq. Default is "llama-3.3-70b-versatile".
+    openai_compatible_base_url (str): API root of the OpenAI-compatible server, e.g. OpenAI, vLLM or Ollama. Default is "http://localhost:11434/v1".
+    openai_compatible_model_name (str): Model served by the OpenAI-compatible server. Default is "llama3.1".
+    llm_provider_costs (Dict[str, float]): Price per million tokens of each provider, used by the router. Default is Gemini 0.1, Groq 0.59, local 0.
+    llm_router_cost_weight (float): Seconds of latency the router trades for one unit of price per million tokens. Default is 0.5.
+    llm_router_explore_rate (float): Share of LLM calls sent to another healthy provider to keep its latency measurement fresh. Default is 0.05.
+    llm_api_endpoint (str | None): Alternative Gemini REST endpoint, e.g. a local benchmarks.fake_llm_server. Default is None.
+    llm_timeout_s (float): Deadline of an LLM call including retries and hedges; for streams, the longest wait for a chunk. Default is 30.
+    llm_max_retries (int): Retries of a failed LLM call while the deadline allows. Default is 2.
+    llm_backoff_base_s (float): Delay before the first LLM retry, doubled per retry with jitter. Default is 0.5.
+    llm_backoff_max_s (float): Largest delay between LLM retries. Default is 8.
+    llm_rate_limit_per_s (float | None): Average LLM requests per second allowed by the token bucket; None disables it. Default is None.
+    llm_rate_limit_burst (float | None): LLM requests allowed in a burst. Default is None (one second's worth).
+    llm_hedging_enabled (bool): Send a duplicate LLM request when a call is slower than the recent llm_hedge_quantile latency. Default is True.
+    llm_hedge_quantile (float): Latency quantile after which a call is hedged. Default is 0.95.
+    llm_breaker_failure_threshold (int): Consecutive failed LLM attempts that open the circuit breaker; while open, questions are answered retrieval-only. Default is 5.
+    llm_breaker_reset_s (float): How long the circuit breaker stays open before a trial call. Default is 30.
+    warm_up_on_start (bool): Load the embedding model and LLM client in a background thread at startup. Default is True.
+    collections_dir (str): Directory holding one saved index per tenant collection. Default is "collections".
+    collections_max_memory_mb (int): RAM budget for loaded tenant collections before LRU eviction. Default is 2048.
+    collections_max_loaded (int): Maximum number of loaded tenant collections before LRU eviction; bounds memory-mapped data the RAM budget does not count. Default is 64.
+    default_collection (str): Name of the in-process collection used when a request names none. Default is "default".
+    chunking_strategy (str): "structured" for Q/A-, heading- and sentence-aware chunks sized in model tokens, or "characters" for fixed n_char windows. Default is "structured".
+    chunk_max_tokens (int): Maximum embedding-model tokens per structured chunk; keep it below the model's sequence length. Default is 250.
+    chunk_overlap_tokens (int): Token overlap between the pieces of a Q/A pair or paragraph too long for one chunk. Default is 32.
+    n_char (int): Number of characters to process in each chunk with the "characters" strategy. Default is 1000.
+    overlap (int): Number of overlapping characters between chunks with the "characters" strategy. Default is 200.
+    ingest_batch_size (int): Number of chunks embedded and added to the index at a time during ingestion. Default is 256.
+    pdf_workers (int | None): Number of processes extracting PDF page ranges in parallel. Default is None (CPU count).
+    pdf_pages_per_task (int): Number of PDF pages per extraction task. Default is 16.
+    embedding_cache_dir (str | None): Directory of the persistent chunk embedding cache; None disables it. Default is "embedding_cache".
+    deduplicate_chunks (bool): Skip chunks whose normalized content is already indexed. Default is True.
     top_k (int): Number of top results to retrieve. Default is 10.
+    fast_path_enabled (bool): Answer near-exact FAQ matches straight from the index, without the LLM. Default is True.
+    fast_path_similarity_threshold (float): Cosine similarity the best hit (and, for chunks with several Q/A pairs, the stored question) must reach for the fast path. Default is 0.85.
+    context_max_tokens (int): Token budget of the retrieved context in the LLM prompt. Default is 1500.
+    context_min_similarity (float): Cosine similarity (cross-encoder relevance with the reranker) below which search hits are left out of the prompt (the best hit is always kept). Default is 0.2.
+    reranker_enabled (bool): Re-score the search hits with a CPU cross-encoder and keep only as many as needed before building the prompt. Default is False.
+    reranker_model_name (str): The sentence-transformers cross-encoder used by the reranker. Default is "cross-encoder/ms-marco-MiniLM-L-6-v2".
+    reranker_confidence_target (float): Probability that at least one kept hit is relevant at which the reranker stops adding hits. Default is 0.9.
+    reranker_min_score (float): Cross-encoder relevance below which hits are dropped (the best hit is always kept). Default is 0.2.
+    reranker_max_passages (int | None): Most hits the reranker keeps; None allows up to top_k. Default is None.
+    reranker_batch_size (int): Number of (question, hit) pairs scored at a time. Default is 32.
+    reranker_cache_size (int): Maximum number of cached (question, hit) scores before LRU eviction. Default is 8192.
     n_answers (int): Number of answers to return. (Value not set in the code snippet.)
+    answer_cache_enabled (bool): Whether to reuse answers for semantically similar questions. Default is True.
+    answer_cache_similarity_threshold (float): Minimum cosine similarity between questions for a cache hit. Default is 0.95.
+    answer_cache_ttl_seconds (float): Lifetime of a cached answer in seconds. Default is 3600.
+    answer_cache_max_size (int): Maximum number of cached answers before LRU eviction. Default is 1024.
+    index_type (str): FAISS index type: "flat", "ivf_flat", "ivf_pq", "hnsw", "sq8", "fp16" (half-precision vectors) or "binary" (sign-bit codes searched by Hamming distance). Default is "flat".
+    rerank_factor (int): For "fp16" and "binary", the index returns this many times the needed candidates, which are re-scored with exact vectors read from a memory-mapped file. Default is 4.
+    ivf_nlist (int): Number of inverted lists for IVF indexes. Default is 1024.
+    pq_m (int): Number of product-quantizer sub-vectors for "ivf_pq" (must divide the embedding dimension). Default is 16.
+    pq_nbits (int): Bits per product-quantizer code. Default is 8.
+    hnsw_m (int): Neighbours per node in the HNSW graph. Default is 32.
+    hnsw_ef_construction (int): HNSW build-time search depth. Default is 200.
+    nprobe (int): IVF lists visited per query. Default is 16.
+    ef_search (int): HNSW search-time candidate list size. Default is 64.
+    min_train_vectors (int | None): Vectors to collect before training IVF/PQ/SQ indexes. Default is None (39 * ivf_nlist for IVF, 1000 for SQ8).
+    index_delta_max_vectors (int): Size of the exact write buffer searched alongside the base index; when full it is merged into a copy of the base index. Default is 10000.
+    index_delta_growth (float): Fraction of the base index the write buffer may grow to before a merge, so large indexes are copied less often. Default is 0.05.
+    hybrid_search_enabled (bool): Keep a BM25 inverted index next to the vectors and fuse lexical and dense results by reciprocal rank fusion. Default is True.
+    bm25_k1 (float): BM25 term frequency saturation. Default is 1.2.
+    bm25_b (float): BM25 document length normalization. Default is 0.75.
+    rrf_k (int): Reciprocal rank fusion constant; a hit at rank r scores 1 / (rrf_k + r) per retriever. Default is 60.
+    hybrid_candidate_factor (int): Each retriever contributes top_k times this many candidates to the fusion. Default is 3.
+    embedding_workers (int): Size of the executor that runs embedding, search and ingestion for the async (ASGI) path. Default is 4.
+    query_batching_enabled (bool): Whether concurrent questions are embedded and searched in micro-batches. Default is True.
+    query_batch_max_size (int): Maximum number of questions per micro-batch. Default is 32.
+    query_batch_max_wait_ms (float): How long a micro-batch waits for more questions after the first arrives. Default is 2.0.
+    batch_qa_batch_size (int): Number of questions embedded and searched together by /ask_batch and batch_answer.py. Default is 64.
+    batch_qa_max_concurrency (int): Maximum number of LLM calls in flight for batch question answering. Default is 8.
+    batch_qa_max_retries (int): Retries of a failed batch answer before it is reported as an error. Default is 3.
+    batch_qa_retry_backoff_s (float): Delay before the first retry, doubled for each further one. Default is 1.0.
+    metrics_enabled (bool): Aggregate per-stage latency histograms (embedding, FAISS search, prompt building, LLM calls, answer parsing, document extraction) for GET /metrics. Default is True.
+    request_timings_enabled (bool): Allow `"timings": true` in an /ask request to return that request's per-stage breakdown. Default is True.
     """
 
     text_embedding_model_name: str = "all-MiniLM-L6-v2"
+    text_embedding_dim = 384
+    text_embedding_backend = "sentence_transformers"
+    text_embedding_batch_size = 64
+    onnx_model_dir = "onnx_models"
+    onnx_threads = None
     llm_api_model_name: str = "gemini-2.0-flash"
+    warm_up_on_start = True
 
+    llm_providers = ["gemini"]
+    groq_model_name = "llama-3.3-70b-versatile"
+    openai_compatible_base_url = "http://localhost:11434/v1"
+    openai_compatible_model_name = "llama3.1"
+    llm_provider_costs = {"gemini": 0.1, "groq": 0.59, "openai_compatible": 0.0}
+    llm_router_cost_weight = 0.5
+    llm_router_explore_rate = 0.05
+    llm_api_endpoint = None
+    llm_timeout_s = 30.0
+    llm_max_retries = 2
+    llm_backoff_base_s = 0.5
+    llm_backoff_max_s = 8.0
+    llm_rate_limit_per_s = None
+    llm_rate_limit_burst = None
+    llm_hedging_enabled = True
+    llm_hedge_quantile = 0.95
+    llm_breaker_failure_threshold = 5
+    llm_breaker_reset_s = 30.0
+
+    collections_dir = "collections"
+    collections_max_memory_mb = 2048
+    collections_max_loaded = 64
+    default_collection = "default"
+
+    chunking_strategy = "structured"
+    chunk_max_tokens = 250
+    chunk_overlap_tokens = 32
     n_char = 1000
     overlap = 200
+    ingest_batch_size = 256
+    pdf_workers = None
+    pdf_pages_per_task = 16
+    embedding_cache_dir = "embedding_cache"
+    deduplicate_chunks = True
     top_k = 10
+    fast_path_enabled = True
+    fast_path_similarity_threshold = 0.85
+    context_max_tokens = 1500
+    context_min_similarity = 0.2
+    reranker_enabled = False
+    reranker_model_name = "cross-encoder/ms-marco-MiniLM-L-6-v2"
+    reranker_confidence_target = 0.9
+    reranker_min_score = 0.2
+    reranker_max_passages = None
+    reranker_batch_size = 32
+    reranker_cache_size = 8192
     n_answers = 3
 
+    answer_cache_enabled = True
+    answer_cache_similarity_threshold = 0.95
+    answer_cache_ttl_seconds = 3600.0
+    answer_cache_max_size = 1024
+
+    index_type = "flat"
+    rerank_factor = 4
+    ivf_nlist = 1024
+    pq_m = 16
+    pq_nbits = 8
+    hnsw_m = 32
+    hnsw_ef_construction = 200
+    nprobe = 16
+    ef_search = 64
+    min_train_vectors = None
+    index_delta_max_vectors = 10000
+    index_delta_growth = 0.05
+    hybrid_search_enabled = True
+    bm25_k1 = 1.2
+    bm25_b = 0.75
+    rrf_k = 60
+    hybrid_candidate_factor = 3
+
+    embedding_workers = 4
+
+    query_batching_enabled = True
+    query_batch_max_size = 32
+    query_batch_max_wait_ms = 2.0
+
+    batch_qa_batch_size = 64
+    batch_qa_max_concurrency = 8
+    batch_qa_max_retries = 3
+    batch_qa_retry_backoff_s = 1.0
+
+    metrics_enabled = True
+    request_timings_enabled = True
+
 
 
 
@@ -51,7 +215,8 @@ Your task:
 
 Input:
 - User Question: `{question}`
-- Retrieved Results: `{search_results}` (This is the ONLY source of truth)
+- Retrieved Results (This is the ONLY source of truth), as numbered passages with their similarity to the question:
+{search_results}
 
 Instructions:
 - RETURN a normal response if the USER QUESTION is not a question, the normal response should NOT be json, it should be a normal text, like (hello -> Hi, how I can help you today) and so on.
@@ -63,16 +228,14 @@ Instructions:
 - If the search_results is empty, return this message "No databse provided, please add database first"
 - Filter out duplicated answers.
 - Remove the question or answer order or number if there is a one.
-- If the database does not contain relevant results, return an empty JSON array `[
-
-(
-    "question": the non-relevant question,
+- If the database does not contain relevant results, return a JSON array with this single object: `[
+  {{
+    "question": "<the user question>",
     "answer": "The bot ca not find a relavent answer in the database",
     "score": 0.0
-  )
-
+  }}
 ]`.
-- Ensure that all output is properly escaped and parseable JSON.
+- Ensure that all output is properly escaped and parseable JSON: objects in curly braces, strings in double quotes, no trailing commas, no code fences.
 - Return at most {n_answers} answers, even if more are available in search_results.
 - Do NOT fabricate or hallucinate answers.
 
@@ -80,16 +243,16 @@ Instructions:
 
 Example Output:
 [
-  (
+  {{
     "question": "How do I track my Amazon package?",
     "answer": "Visit “Your Orders” and click “Track package” to see delivery status.",
     "score": 0.94
-  ),
-  (
+  }},
+  {{
     "question": "What if my package shows delivered but I can’t find it?",
     "answer": "Check delivery driver’s photo note, wait a bit, then contact Amazon support.",
     "score": 0.91
-  )
+  }}
 ]
 
 
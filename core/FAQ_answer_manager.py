@@ -1,10 +1,24 @@
 
 
+import asyncio
+from concurrent.futures import Executor, ThreadPoolExecutor
+from functools import partial
+from typing import Callable, Iterator, List, Optional, Tuple
+
 from schemas.general_schemas import VectorDatabase, LLMAPIManager
 from services.IO_manager import IOManager
+from services.answer_cache import SemanticAnswerCache
+from services.answer_parser import AnswerParser, parse_answers
+from services.chunker import StructuredChunker
+from services.context_builder import ContextBuilder
+from services.fast_path import RetrievalFastPath
+from services.metrics import run_with_context, span, timed
+from services.query_batcher import QueryBatcher
+from services.reranker import CrossEncoderReranker
+from services.resilient_llm import LLMUnavailableError
 
 
-from utils.utils import chunk_text, filter_json
+from utils.utils import batched, iter_page_chunks, prefetch
 
 class FAQAnswerManager:
     """
@@ -16,7 +30,14 @@ class FAQAnswerManager:
         Faiss_vecotr_database: VectorDatabase,
         llm_api_manager: LLMAPIManager,
         io_manager: IOManager,
-        logger
+        logger,
+        answer_cache: Optional[SemanticAnswerCache] = None,
+        executor: Optional[Executor] = None,
+        query_batcher: Optional[QueryBatcher] = None,
+        chunker: Optional[StructuredChunker] = None,
+        context_builder: Optional[ContextBuilder] = None,
+        fast_path: Optional[RetrievalFastPath] = None,
+        reranker: Optional[CrossEncoderReranker] = None
     ):
         """
         Initializes the FAQAnswerManager.
@@ -25,39 +46,216 @@ class FAQAnswerManager:
         :param llm_api_manager: An instance of LLMAPIManager for interacting with the language model API.
         :param io_manager: An object responsible for input/output operations (e.g., loading files).
         :param logger: Logger instance for logging information and errors.
+        :param answer_cache: Optional semantic cache of answers keyed on query embeddings.
+        :param executor: Bounded executor used by the async methods for CPU-bound embedding,
+                         search and ingestion. Defaults to a 4-worker thread pool.
+        :param query_batcher: Optional micro-batcher that embeds and searches concurrent questions together.
+        :param chunker: Optional structure- and token-aware chunker. When None, documents are
+                        cut into fixed character windows of `n_char` with `overlap`.
+        :param context_builder: Optional stage that filters, deduplicates and budgets the
+                                search hits put into the prompt. When None, the raw hits are used.
+        :param fast_path: Optional retrieval-only path that answers near-exact FAQ matches
+                          from the index without calling the LLM.
+        :param reranker: Optional cross-encoder stage that re-scores the search hits and keeps
+                         only as many as needed before the prompt is built.
+
+        When the LLM client raises `LLMUnavailableError` (deadline missed, circuit
+        open), questions are answered retrieval-only from the closest search hits.
         """
         self.Faiss_vecotr_database = Faiss_vecotr_database
         self.llm_api_manager = llm_api_manager
         self.io_manager = io_manager
         self.logger = logger
+        self.answer_cache = answer_cache
+        self.executor = executor or ThreadPoolExecutor(max_workers=4, thread_name_prefix="faq-embed")
+        self.query_batcher = query_batcher
+        self.chunker = chunker
+        self.context_builder = context_builder
+        self.fast_path = fast_path
+        self.reranker = reranker
+        self.retrieval_fallback = fast_path or RetrievalFastPath(Faiss_vecotr_database.embed_texts, chunker=chunker)
+    
+
+    def warm_up(self) -> None:
+        """
+        Loads the embedding model and LLM client ahead of the first request.
+        """
+        for component in (self.Faiss_vecotr_database, self.llm_api_manager, self.reranker):
+            warm_up = getattr(component, "warm_up", None)
+            if warm_up is not None:
+                warm_up()
+        self.logger.info("Warm-up finished.")
+    
+
+    async def _run_blocking(self, func, *args):
+        """
+        Runs a blocking call on the bounded executor without blocking the event loop.
+        The call runs in a copy of the caller's context, so its timing spans reach
+        the caller's per-request breakdown.
+        """
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.executor, run_with_context(func, *args))
+    
+
+    def _embed_query(self, question: str):
+        """
+        Embeds a question, in a micro-batch when a query batcher is set. The
+        batcher times its queue wait and batch work as separate stages.
+        """
+        if self.query_batcher is not None:
+            return self.query_batcher.submit_embedding(question).result()
+        with span("faq.embed"):
+            return self.Faiss_vecotr_database.embed_texts([question])
+    
+
+    async def _embed_query_async(self, question: str):
+        """
+        Async variant of `_embed_query`.
+        """
+        if self.query_batcher is not None:
+            return await asyncio.wrap_future(self.query_batcher.submit_embedding(question))
+        with span("faq.embed"):
+            return await self._run_blocking(self.Faiss_vecotr_database.embed_texts, [question])
+    
+
+    def _search(self, question: str, q_vec, top_k: int) -> list:
+        """
+        Searches the index for an embedded question, in a micro-batch when a
+        query batcher is set. Only called after an answer cache miss.
+        """
+        if self.query_batcher is not None:
+            return self.query_batcher.submit_search(q_vec, question, top_k).result()
+        with span("faq.search"):
+            return self.Faiss_vecotr_database.search_by_vector(q_vec, top_k=top_k, query=question)
+    
+
+    async def _search_async(self, question: str, q_vec, top_k: int) -> list:
+        """
+        Async variant of `_search`.
+        """
+        if self.query_batcher is not None:
+            return await asyncio.wrap_future(self.query_batcher.submit_search(q_vec, question, top_k))
+        with span("faq.search"):
+            return await self._run_blocking(
+                partial(self.Faiss_vecotr_database.search_by_vector, query=question), q_vec, top_k
+            )
+    
+
+    @timed("faq.cache_lookup")
+    def _cached_answer(self, q_vec, n_answers: int) -> Tuple[Optional[str], int]:
+        """
+        Returns the cached answer for a query embedding and answer count, or None,
+        with the cache generation to pass to `_cache_answer` on a miss.
+        """
+        if self.answer_cache is None:
+            return None, 0
+        generation = self.answer_cache.generation
+        cached = self.answer_cache.get(q_vec, variant=n_answers)
+        if cached is not None:
+            self.logger.debug("Answer cache hit.")
+        return cached, generation
+    
+
+    def _cache_answer(self, q_vec, parser: AnswerParser, n_answers: int, generation: int) -> None:
+        """
+        Caches a reply that parsed into Q&A answers. Plain-text replies, such as
+        errors or "No response received", are not cached, so a transient
+        failure is not served until the TTL runs out.
+        """
+        if self.answer_cache is not None and parser.answers:
+            self.answer_cache.put(q_vec, parser.result(), variant=n_answers, generation=generation)
     
 
-    def load_text_into_faiss(self, file_path: str, n_char:int, overlap:int) -> None:
+    @timed("faq.parse")
+    def _store_answer(self, q_vec, llm_output: str, n_answers: int, generation: int) -> str:
+        """
+        Parses the raw LLM output into its normalized form and caches it for the query embedding.
+        """
+        parser = parse_answers(llm_output)
+        self._cache_answer(q_vec, parser, n_answers, generation)
+        return parser.result()
+    
+
+    def _invalidate_answer_cache(self) -> None:
+        """
+        Drops cached answers, since they may no longer match the index contents.
+        """
+        if self.answer_cache is not None:
+            self.answer_cache.clear()
+    
+
+    @timed("faq.ingest")
+    def load_text_into_faiss(
+        self,
+        file_path: str,
+        n_char:int,
+        overlap:int,
+        batch_size: int = 256,
+        progress: Optional[Callable[[int], None]] = None
+    ) -> int:
         """
         Loads text from a file into the Faiss vector database.
 
+        The file is streamed: pages/paragraphs are extracted on a background
+        thread (PDF page ranges in parallel processes), chunked incrementally,
+        and embedded and added to the index in batches, so memory stays bounded
+        by the batch size rather than the document. Each chunk records the
+        pages it came from as metadata.
+
+        With a `chunker`, chunks follow the document structure and are sized
+        in tokens, and `n_char`/`overlap` are ignored.
+
         :param file_path: Path to the text file to be loaded.
         :param n_char: Number of characters per text chunk.
         :param overlap: Number of overlapping characters between chunks.
+        :param batch_size: Number of chunks embedded and added to the index at a time.
+        :param progress: Optional callback receiving the running number of chunks added.
+        :return: The number of chunks added.
         """
 
+        n_chunks = 0
         try:
 
-            text = self.io_manager.load(file_path)
-            texts = chunk_text(text, n_char, overlap)
-            self.Faiss_vecotr_database.add_texts(texts)
-            self.logger.info(f"Successfully loaded text from {file_path} into Faiss.")
+            segments = prefetch(self.io_manager.iter_pages(file_path))
+            if self.chunker is not None:
+                chunks = self.chunker.iter_chunks(segments)
+            else:
+                chunks = iter_page_chunks(segments, n_char, overlap)
+            for batch in batched(chunks, batch_size):
+                texts = [text for text, _ in batch]
+                metadatas = [dict(metadata, source=file_path) for _, metadata in batch]
+                self.Faiss_vecotr_database.add_texts(texts, metadatas)
+                # Answers computed before this batch was searchable may now be incomplete
+                self._invalidate_answer_cache()
+                n_chunks += len(texts)
+                if progress is not None:
+                    progress(n_chunks)
+            self.logger.info(f"Successfully loaded {n_chunks} chunks from {file_path} into Faiss.")
+            return n_chunks
 
         except Exception as e:
             self.logger.error(f"Failed to load text from {file_path}: {e}")
+            raise
+    
+
+    async def load_text_into_faiss_async(self, file_path: str, n_char:int, overlap:int, batch_size: int = 256) -> int:
+        """
+        Async variant of `load_text_into_faiss`; parsing and embedding run on the executor.
+
+        :param file_path: Path to the text file to be loaded.
+        :param n_char: Number of characters per text chunk.
+        :param overlap: Number of overlapping characters between chunks.
+        :param batch_size: Number of chunks embedded and added to the index at a time.
+        :return: The number of chunks added.
+        """
+        return await self._run_blocking(self.load_text_into_faiss, file_path, n_char, overlap, batch_size)
     
 
     def save_faiss_index(self, index_path: str) -> None:
         """
         Saves the Faiss index and associated text metadata.
 
-        :param index_path: Path to save the Faiss index.
-        :param metadata_path: Path to save the text metadata.
+        :param index_path: Directory to save the Faiss index, texts and manifest into.
         """
         self.Faiss_vecotr_database.save_index(index_path)
     
@@ -66,10 +264,10 @@ class FAQAnswerManager:
         """
         Loads the Faiss index and associated text metadata.
 
-        :param index_path: Path to load the Faiss index from.
-        :param metadata_path: Path to load the text metadata from.
+        :param index_path: Directory written by `save_faiss_index`.
         """
         self.Faiss_vecotr_database.load_index(index_path)
+        self._invalidate_answer_cache()
     
 
     def clear_faiss_index(self) -> None:
@@ -77,8 +275,30 @@ class FAQAnswerManager:
         Clears the Faiss index and associated text metadata.
         """
         self.Faiss_vecotr_database.clear_index()
+        self._invalidate_answer_cache()
     
 
+    def _rerank(self, question: str, searches: list) -> list:
+        """
+        Returns the search hits the reranker keeps, or all of them without a reranker.
+        """
+        return self.reranker.rerank(question, searches) if self.reranker is not None else searches
+    
+
+    @timed("faq.prompt")
+    def _build_prompt(self, FAQ_answer_prompt: str, question: str, searches: list, n_answers: int) -> str:
+        """
+        Fills the prompt template, compacting the search hits first when a context builder is set.
+        """
+        search_results = self.context_builder.build(searches) if self.context_builder is not None else searches
+        return FAQ_answer_prompt.format(
+            question=question,
+            search_results=search_results,
+            n_answers=n_answers
+        )
+    
+
+    @timed("faq.answer")
     def get_answers(
         self,
         question: str,
@@ -99,12 +319,185 @@ class FAQAnswerManager:
         :return: A list of filtered answers generated by the LLM.
         """
         
-        searches = self.Faiss_vecotr_database.search(question, top_k=top_k)
-        final_prompt = FAQ_answer_prompt.format(
-            question=question,
-            search_results=searches,
-            n_answers=n_answers
-        )
-        json_content = self.llm_api_manager.send_prompt(final_prompt)
-        print(filter_json(json_content))
-        return filter_json(json_content)
\ No newline at end of file
+        q_vec = self._embed_query(question)
+        cached, generation = self._cached_answer(q_vec, n_answers)
+        if cached is not None:
+            return cached
+
+        searches = self._search(question, q_vec, top_k)
+        return self._answer_from_searches(question, q_vec, searches, FAQ_answer_prompt, n_answers, generation)
+    
+
+    def _answer_from_searches(
+        self,
+        question: str,
+        q_vec,
+        searches: list,
+        FAQ_answer_prompt: str,
+        n_answers: int,
+        generation: int,
+        fallback: bool = True
+    ) -> str:
+        """
+        Answers from the search hits via the fast path, or else the LLM, and caches the answer.
+        """
+        if self.fast_path is not None:
+            match = self.fast_path.answer(q_vec, searches)
+            if match is not None:
+                return self.fast_path.to_json(match)
+        passages = self._rerank(question, searches)
+        final_prompt = self._build_prompt(FAQ_answer_prompt, question, passages, n_answers)
+        try:
+            with span("faq.llm"):
+                json_content = self.llm_api_manager.send_prompt(final_prompt)
+        except LLMUnavailableError as e:
+            if not fallback:
+                raise
+            return self.fallback_answer(question, searches, n_answers, e)
+        return self._store_answer(q_vec, json_content, n_answers, generation)
+    
+
+    def fallback_answer(self, question: str, searches: list, n_answers: int, error: Exception) -> str:
+        """
+        Answers from the search hits alone when the LLM is unavailable. Not cached.
+        """
+        self.logger.warning(f"LLM unavailable, answered from retrieval only: {error}")
+        return self.retrieval_fallback.to_json(self.retrieval_fallback.fallback(question, searches, n_answers))
+    
+
+    def search_batch(self, questions: List[str], top_k: int = 10):
+        """
+        Embeds and searches many questions with one matrix call each.
+
+        :param questions: The questions to search for.
+        :param top_k: Number of top search results to retrieve per question.
+        :return: Tuple of (query embeddings of shape (n, dim), one list of search hits per question).
+        """
+        q_vecs = self.Faiss_vecotr_database.embed_texts(questions)
+        searches = self.Faiss_vecotr_database.search_batch_by_vectors(q_vecs, top_k=top_k, queries=questions)
+        return q_vecs, searches
+    
+
+    def answer_searched(
+        self,
+        question: str,
+        q_vec,
+        searches: list,
+        FAQ_answer_prompt: str,
+        n_answers: int = 2,
+        fallback: bool = True
+    ) -> str:
+        """
+        Answers a question that was already embedded and searched, e.g. by `search_batch`.
+
+        :param question: The question to answer.
+        :param q_vec: Normalized query embedding of shape (1, dim).
+        :param searches: Search hits for the question.
+        :param FAQ_answer_prompt: Prompt template for the LLM.
+        :param n_answers: Number of answers to generate.
+        :param fallback: Answer from the search hits alone when the LLM is unavailable;
+            if False, `LLMUnavailableError` is raised instead.
+        :return: The cleaned answers, from the cache, the fast path or the LLM.
+        """
+        cached, generation = self._cached_answer(q_vec, n_answers)
+        if cached is not None:
+            return cached
+        return self._answer_from_searches(question, q_vec, searches, FAQ_answer_prompt, n_answers, generation, fallback)
+    
+
+    @timed("faq.answer")
+    async def get_answers_async(
+        self,
+        question: str,
+        FAQ_answer_prompt: str,
+        top_k: int = 10,
+        n_answers: int = 2
+    ) -> list:
+        """
+        Async variant of `get_answers`. Embedding and search run on the bounded
+        executor and the LLM call is awaited, so the event loop can serve many
+        questions concurrently.
+
+        :param question: The question to search for.
+        :param FAQ_answer_prompt: Prompt template for the LLM.
+        :param top_k: Number of top search results to retrieve from the vector database.
+        :param n_answers: Number of answers to generate.
+        :return: A list of filtered answers generated by the LLM.
+        """
+
+        q_vec = await self._embed_query_async(question)
+        cached, generation = self._cached_answer(q_vec, n_answers)
+        if cached is not None:
+            return cached
+
+        searches = await self._search_async(question, q_vec, top_k)
+        if self.fast_path is not None:
+            match = await self._run_blocking(self.fast_path.answer, q_vec, searches)
+            if match is not None:
+                return self.fast_path.to_json(match)
+        passages = await self._run_blocking(self._rerank, question, searches)
+        final_prompt = self._build_prompt(FAQ_answer_prompt, question, passages, n_answers)
+        try:
+            with span("faq.llm"):
+                json_content = await self.llm_api_manager.send_prompt_async(final_prompt)
+        except LLMUnavailableError as e:
+            return self.fallback_answer(question, searches, n_answers, e)
+        return self._store_answer(q_vec, json_content, n_answers, generation)
+    
+
+    def stream_answers(
+        self,
+        question: str,
+        FAQ_answer_prompt: str,
+        top_k: int = 10,
+        n_answers: int = 2
+    ) -> Iterator[Tuple[str, object]]:
+        """
+        Streams answers to a given question, yielding each Q&A object as soon as
+        the LLM has generated it completely.
+
+        :param question: The question to search for.
+        :param FAQ_answer_prompt: Prompt template for the LLM.
+        :param top_k: Number of top search results to retrieve from the vector database.
+        :param n_answers: Number of answers to generate.
+        :return: An iterator of (event, payload) pairs: ("answer", dict) for each Q&A
+                 object, or a single ("message", str) when the LLM replied with plain text.
+        """
+
+        q_vec = self._embed_query(question)
+        cached, generation = self._cached_answer(q_vec, n_answers)
+        if cached is not None:
+            yield from self._answer_events([cached], AnswerParser())
+            return
+
+        searches = self._search(question, q_vec, top_k)
+        if self.fast_path is not None:
+            match = self.fast_path.answer(q_vec, searches)
+            if match is not None:
+                yield "answer", match
+                return
+        passages = self._rerank(question, searches)
+        final_prompt = self._build_prompt(FAQ_answer_prompt, question, passages, n_answers)
+        parser = AnswerParser()
+        try:
+            yield from self._answer_events(self.llm_api_manager.stream_prompt(final_prompt), parser)
+        except LLMUnavailableError as e:
+            if parser.answers or parser.message():
+                raise
+            self.logger.warning(f"LLM unavailable, answered from retrieval only: {e}")
+            for answer in self.retrieval_fallback.fallback(question, searches, n_answers):
+                yield "answer", answer
+            return
+        self._cache_answer(q_vec, parser, n_answers, generation)
+
+
+    def _answer_events(self, chunks, parser: AnswerParser) -> Iterator[Tuple[str, object]]:
+        """
+        Turns streamed LLM text into answer events as `parser` completes each Q&A object.
+        Falls back to a single plain-text message when no Q&A object was produced.
+        """
+        for chunk in chunks:
+            for answer in parser.feed(chunk):
+                yield "answer", answer.to_dict()
+        if not parser.answers:
+            yield "message", parser.message()
@@ -0,0 +1,180 @@
+import json
+import os
+import random
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from typing import Dict, Iterable, Iterator, Set
+
+from core.FAQ_answer_manager import FAQAnswerManager
+from services.resilient_llm import LLMUnavailableError
+from utils.utils import batched
+
+
+def iter_question_records(lines: Iterable[str]) -> Iterator[Dict]:
+    """
+    Parses JSONL question records of the form {"id": ..., "question": ...}.
+
+    A record without an "id" gets its 1-based line number, so reruns of the
+    same file get the same ids. Blank lines are skipped; malformed lines,
+    including records whose "id" is a list or object, are returned as records
+    with an "error" and no "question".
+
+    :param lines: Lines of a JSONL file.
+    :return: An iterator of {"id", "question"} or {"id", "error"} dicts.
+    """
+    for line_number, line in enumerate(lines, 1):
+        if isinstance(line, bytes):
+            line = line.decode("utf-8")
+        if not line.strip():
+            continue
+        try:
+            record = json.loads(line)
+            question = record.get("question") if isinstance(record, dict) else None
+            if not isinstance(question, str) or not question.strip():
+                raise ValueError('missing "question"')
+            if isinstance(record.get("id"), (list, dict)):
+                raise ValueError('"id" must be a string or number')
+        except ValueError as e:
+            yield {"id": line_number, "error": f"Invalid record on line {line_number}: {e}"}
+            continue
+        yield {"id": record.get("id", line_number), "question": question}
+
+
+def read_checkpoint(path: str) -> Set:
+    """
+    Returns the ids already answered in a JSONL answers file, so a run can resume
+    where it stopped. Records that failed or were answered from retrieval only
+    (marked "fallback") are not counted and are retried.
+
+    :param path: Answers file written by a previous run; may not exist.
+    :return: The set of answered record ids.
+    """
+    done = set()
+    if not os.path.exists(path):
+        return done
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except ValueError:
+                # A run killed mid-write leaves a partial last line
+                continue
+            if (
+                isinstance(record, dict) and "answers" in record and not record.get("fallback")
+                and not isinstance(record.get("id"), (list, dict))
+            ):
+                done.add(record.get("id"))
+    return done
+
+
+class BatchAnswerer:
+    """
+    Answers a stream of questions in bulk.
+
+    Questions are embedded and searched in matrix batches through the
+    collection's vector database; the LLM calls then run on a bounded pool
+    of workers, with retries and exponential backoff, while the next batch
+    is searched. The pool is shared by all callers, so concurrent batch
+    requests never exceed `max_concurrency` LLM calls together.
+    """
+
+    def __init__(
+        self,
+        logger,
+        batch_size: int = 64,
+        max_concurrency: int = 8,
+        max_retries: int = 3,
+        retry_backoff_s: float = 1.0
+    ):
+        """
+        Initializes the BatchAnswerer.
+
+        :param logger: Logger instance for logging information and errors.
+        :param batch_size: Number of questions embedded and searched together.
+        :param max_concurrency: Maximum number of LLM calls in flight.
+        :param max_retries: Retries of a failed answer before it is reported as an error.
+        :param retry_backoff_s: Delay before the first retry; doubled for each further one, with jitter.
+        """
+        self.logger = logger
+        self.batch_size = batch_size
+        self.max_concurrency = max_concurrency
+        self.max_retries = max_retries
+        self.retry_backoff_s = retry_backoff_s
+        self._executor = ThreadPoolExecutor(max_workers=max_concurrency, thread_name_prefix="batch-answer")
+
+
+    def _answer(self, manager: FAQAnswerManager, record: Dict, q_vec, searches: list, FAQ_answer_prompt: str, n_answers: int) -> Dict:
+        """
+        Answers one searched question, retrying failures with exponential backoff.
+        When the LLM is unavailable the record is answered from retrieval only
+        and marked with "fallback", so a resumed run asks the LLM again.
+        """
+        for attempt in range(self.max_retries + 1):
+            try:
+                answers = manager.answer_searched(
+                    record["question"], q_vec, searches, FAQ_answer_prompt, n_answers, fallback=False
+                )
+                return dict(record, answers=answers)
+            except LLMUnavailableError as e:
+                # The LLM client already retried within its deadline
+                return dict(record, answers=manager.fallback_answer(record["question"], searches, n_answers, e), fallback=True)
+            except Exception as e:
+                if attempt == self.max_retries:
+                    self.logger.error(f"Batch question {record['id']!r} failed after {attempt + 1} attempts: {e}")
+                    return dict(record, error=str(e))
+                time.sleep(self.retry_backoff_s * 2 ** attempt * random.uniform(0.5, 1.5))
+
+
+    def iter_answers(
+        self,
+        manager: FAQAnswerManager,
+        records: Iterable[Dict],
+        FAQ_answer_prompt: str,
+        top_k: int = 10,
+        n_answers: int = 2,
+        skip_ids: Set = frozenset()
+    ) -> Iterator[Dict]:
+        """
+        Answers question records, yielding each result as soon as it is ready.
+
+        :param manager: FAQ manager of the collection to answer from.
+        :param records: {"id", "question"} dicts, e.g. from `iter_question_records`.
+        :param FAQ_answer_prompt: Prompt template for the LLM.
+        :param top_k: Number of top search results to retrieve per question.
+        :param n_answers: Number of answers to generate per question.
+        :param skip_ids: Ids answered by an earlier run, e.g. from `read_checkpoint`.
+        :return: An iterator of records with "answers" or "error" added, in completion order.
+        """
+        pending: Set[Future] = set()
+        try:
+            records = (record for record in records if record["id"] not in skip_ids)
+            for batch in batched(records, self.batch_size):
+                invalid = [record for record in batch if "question" not in record]
+                yield from invalid
+                batch = [record for record in batch if "question" in record]
+                if not batch:
+                    continue
+                try:
+                    q_vecs, searches = manager.search_batch([record["question"] for record in batch], top_k)
+                except Exception as e:
+                    self.logger.error(f"Batch search of {len(batch)} questions failed: {e}")
+                    for record in batch:
+                        yield dict(record, error=str(e))
+                    continue
+                for i, record in enumerate(batch):
+                    pending.add(self._executor.submit(
+                        self._answer, manager, record, q_vecs[i:i + 1], searches[i], FAQ_answer_prompt, n_answers
+                    ))
+                # Search the next batch while the LLM calls run, but keep memory bounded
+                while len(pending) > self.max_concurrency + self.batch_size:
+                    done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        yield future.result()
+            while pending:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    yield future.result()
+        finally:
+            # The caller stopped early (e.g. the client disconnected): drop queued questions
+            for future in pending:
+                future.cancel()
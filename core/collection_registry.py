@@ -0,0 +1,214 @@
+import os
+import re
+import shutil
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterator, List, Optional
+
+from core.FAQ_answer_manager import FAQAnswerManager
+
+
+COLLECTION_NAME_PATTERN = re.compile(r"^[A-Za-z0-9_-]{1,64}$")
+
+
+class CollectionRegistry:
+    """
+    Registry of named FAQ collections, each with its own index and text store.
+
+    Collections live on disk under `root_dir/<name>` and are loaded lazily on
+    first use. Writes go through `checkout(name, write=True)`, which saves the
+    collection afterwards, so loaded collections can be dropped at any time:
+    they are kept in LRU order and evicted once their estimated memory exceeds
+    `max_memory_bytes` or there are more than `max_loaded` of them. The
+    estimate counts the index whenever it is resident, i.e. always except for
+    IVF indexes FAISS memory-maps; memory-mapped data (those indexes, texts,
+    exact vectors) is not part of it, so the count bounds open mappings.
+    Pinned collections, such as the default one, are never evicted.
+
+    Loading and saving a collection only hold that collection's lock, so a
+    slow cold load or save of one tenant does not block the others.
+    """
+
+    def __init__(
+        self,
+        root_dir: str,
+        factory: Callable[[str], FAQAnswerManager],
+        logger,
+        max_memory_bytes: int,
+        pinned: Optional[Dict[str, FAQAnswerManager]] = None,
+        max_loaded: int = 64
+    ):
+        """
+        Initializes the CollectionRegistry.
+
+        :param root_dir: Directory holding one saved index directory per collection.
+        :param factory: Builds an empty FAQAnswerManager for a collection name.
+        :param logger: Logger instance for logging information and errors.
+        :param max_memory_bytes: RAM budget for loaded, unpinned collections.
+        :param pinned: Collections that are always loaded and never evicted or persisted here.
+        :param max_loaded: Maximum number of loaded, unpinned collections.
+        """
+        self.root_dir = root_dir
+        self.factory = factory
+        self.logger = logger
+        self.max_memory_bytes = max_memory_bytes
+        self.pinned = dict(pinned or {})
+        self.max_loaded = max_loaded
+        self._loaded: "OrderedDict[str, FAQAnswerManager]" = OrderedDict()
+        self._in_use: Dict[str, int] = {}
+        self._name_locks: Dict[str, threading.Lock] = {}
+        self._lock = threading.RLock()
+        os.makedirs(root_dir, exist_ok=True)
+
+
+    def _path(self, name: str) -> str:
+        if not COLLECTION_NAME_PATTERN.match(name):
+            raise ValueError(f"Invalid collection name: {name!r}")
+        return os.path.join(self.root_dir, name)
+
+
+    def exists(self, name: str) -> bool:
+        """
+        Returns whether a collection exists.
+        """
+        return name in self.pinned or os.path.isdir(self._path(name))
+
+
+    def create(self, name: str) -> None:
+        """
+        Creates an empty collection.
+
+        :param name: Collection name (letters, digits, "_" and "-").
+        """
+        path = self._path(name)
+        with self._lock:
+            if self.exists(name):
+                raise ValueError(f"Collection already exists: {name}")
+            os.makedirs(path)
+        self.logger.info(f"Created collection {name}.")
+
+
+    def delete(self, name: str) -> None:
+        """
+        Deletes a collection from memory and disk.
+
+        :param name: Collection name.
+        """
+        if name in self.pinned:
+            raise ValueError(f"Collection {name} cannot be deleted")
+        path = self._path(name)
+        with self._name_lock(name), self._lock:
+            if not os.path.isdir(path):
+                raise KeyError(name)
+            self._loaded.pop(name, None)
+            shutil.rmtree(path)
+        self.logger.info(f"Deleted collection {name}.")
+
+
+    def list(self) -> List[Dict]:
+        """
+        Lists collections with their load state.
+        """
+        with self._lock:
+            names = set(self.pinned)
+            names.update(
+                entry for entry in os.listdir(self.root_dir)
+                if COLLECTION_NAME_PATTERN.match(entry) and os.path.isdir(os.path.join(self.root_dir, entry))
+            )
+            collections = []
+            for name in sorted(names):
+                manager = self.pinned.get(name) or self._loaded.get(name)
+                collections.append({
+                    "name": name,
+                    "loaded": manager is not None,
+                    "n_vectors": manager.Faiss_vecotr_database.ntotal if manager is not None else None,
+                })
+            return collections
+
+
+    def _name_lock(self, name: str) -> threading.Lock:
+        """
+        Returns the lock serializing loads, saves and deletion of one collection.
+        """
+        with self._lock:
+            return self._name_locks.setdefault(name, threading.Lock())
+
+
+    def _acquire(self, name: str) -> FAQAnswerManager:
+        """
+        Returns the manager of a collection, loading it if needed, and marks it in use.
+        """
+        with self._lock:
+            manager = self.pinned.get(name) or self._loaded.get(name)
+            if manager is not None:
+                if name in self._loaded:
+                    self._loaded.move_to_end(name)
+                self._in_use[name] = self._in_use.get(name, 0) + 1
+                return manager
+        with self._name_lock(name):
+            with self._lock:
+                manager = self._loaded.get(name)
+            if manager is None:
+                # Another thread may have loaded it while this one waited for the name lock
+                path = self._path(name)
+                if not os.path.isdir(path):
+                    raise KeyError(name)
+                manager = self.factory(name)
+                if os.listdir(path):
+                    manager.load_faiss_index(path)
+                self.logger.info(f"Loaded collection {name}.")
+            with self._lock:
+                manager = self._loaded.setdefault(name, manager)
+                self._loaded.move_to_end(name)
+                self._in_use[name] = self._in_use.get(name, 0) + 1
+                return manager
+
+
+    @contextmanager
+    def checkout(self, name: str, write: bool = False) -> Iterator[FAQAnswerManager]:
+        """
+        Yields the manager of a collection, loading it if needed. A checked-out
+        collection is not evicted; with `write=True` it is saved to disk
+        afterwards, unless the block raised.
+
+        :param name: Collection name.
+        :param write: Whether the caller modifies the collection.
+        """
+        manager = self._acquire(name)
+        try:
+            yield manager
+            if write and name not in self.pinned:
+                self.persist(name)
+        finally:
+            with self._lock:
+                self._in_use[name] -= 1
+                if not self._in_use[name]:
+                    del self._in_use[name]
+                self._evict()
+
+
+    def persist(self, name: str) -> None:
+        """
+        Saves a loaded collection to disk.
+
+        :param name: Collection name.
+        """
+        with self._name_lock(name):
+            with self._lock:
+                manager = self._loaded.get(name)
+            if manager is None:
+                return
+            manager.save_faiss_index(self._path(name))
+
+
+    def _evict(self) -> None:
+        total = sum(manager.Faiss_vecotr_database.memory_bytes() for manager in self._loaded.values())
+        for name in list(self._loaded):
+            if total <= self.max_memory_bytes and len(self._loaded) <= self.max_loaded:
+                break
+            if name in self._in_use:
+                continue
+            total -= self._loaded[name].Faiss_vecotr_database.memory_bytes()
+            del self._loaded[name]
+            self.logger.info(f"Evicted collection {name} from memory.")
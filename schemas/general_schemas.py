@@ -1,6 +1,5 @@
-import faiss
 import numpy as np
-from typing import List, Optional, Tuple, Callable, Dict, Any
+from typing import List, Optional, Tuple, Callable, Dict, Any, Iterator
 from abc import ABC, abstractmethod
 
 class VectorDatabase(ABC):
@@ -98,13 +97,54 @@ class LLMAPIManager(ABC):
         """
         pass
 
+    @abstractmethod
+    async def send_prompt_async(self, prompt: str) -> str:
+        """
+        Send a single prompt string to the LLM API without blocking the event loop.
+        Returns the text response.
+        """
+        pass
+
+    @abstractmethod
+    def stream_prompt(self, prompt: str) -> Iterator[str]:
+        """
+        Send a single prompt string to the LLM API.
+        Yields the response text incrementally as it is generated.
+        """
+        pass
+
 
 
 
 class TextEmbedder(ABC):
     """
     Abstract base class for text embedders.
+
+    Attributes:
+        model_name: the embedding model; vectors of embedders with the same
+            model name share a vector space and can be searched together.
+        name: identifies the backend as well, since backends of one model
+            produce slightly different vectors (e.g. for embedding caches).
     """
+    model_name: str
+    name: str
+
+    @property
+    @abstractmethod
+    def dim(self) -> int:
+        """
+        Embedding dimension.
+        """
+        pass
+
+    @property
+    @abstractmethod
+    def tokenizer(self):
+        """
+        The model's Hugging Face tokenizer, used to size chunks in model tokens.
+        """
+        pass
+
     @abstractmethod
     def embed(self, texts: List[str]) -> np.ndarray:
         """
@@ -113,4 +153,4 @@ class TextEmbedder(ABC):
         Returns:
             np.ndarray of shape (n_texts, dim).
         """
-        pass
\ No newline at end of file
+        pass
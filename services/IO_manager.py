@@ -1,14 +1,15 @@
 import os
-from typing import Union
+from typing import Iterator, Optional, Tuple, Union
 
-from PyPDF2 import PdfReader
-from docx import Document
+from services.metrics import timed, timed_iter
+from services.pdf_extractor import PdfExtractor
 
 
 class IOManager:
-    def __init__(self):
-        pass
+    def __init__(self, pdf_extractor: Optional[PdfExtractor] = None):
+        self.pdf_extractor = pdf_extractor or PdfExtractor()
 
+    @timed("io.load")
     def load(self, file_path: str) -> str:
         if not os.path.exists(file_path):
             raise FileNotFoundError(f"File not found: {file_path}")
@@ -24,18 +25,71 @@ class IOManager:
         else:
             raise ValueError(f"Unsupported file type: {extension}")
 
+    def iter_load(self, file_path: str, block_size: int = 1 << 20) -> Iterator[str]:
+        """
+        Lazily yields the text of a file in segments (text blocks, PDF pages or
+        DOCX paragraphs), so large documents never have to be held in memory at once.
+        Concatenating the segments gives the same text as `load`.
+        """
+        for _, segment in self.iter_pages(file_path, block_size):
+            yield segment
+
+    def iter_pages(self, file_path: str, block_size: int = 1 << 20) -> Iterator[Tuple[Optional[int], str]]:
+        """
+        Like `iter_load`, but yields (page number, segment) pairs. Page numbers
+        are 1-based for PDFs and None for formats without pages. The time spent
+        extracting is recorded as the "io.extract" stage.
+        """
+        return timed_iter("io.extract", self._iter_pages(file_path, block_size))
+
+    def _iter_pages(self, file_path: str, block_size: int) -> Iterator[Tuple[Optional[int], str]]:
+        if not os.path.exists(file_path):
+            raise FileNotFoundError(f"File not found: {file_path}")
+
+        extension = os.path.splitext(file_path)[1].lower()
+
+        if extension == ".txt":
+            segments = self._iter_txt(file_path, block_size)
+        elif extension == ".pdf":
+            yield from self.pdf_extractor.iter_pages(file_path)
+            return
+        elif extension == ".docx":
+            segments = self._iter_docx(file_path)
+        else:
+            raise ValueError(f"Unsupported file type: {extension}")
+        for segment in segments:
+            yield None, segment
+
+    def _iter_txt(self, file_path: str, block_size: int) -> Iterator[str]:
+        with open(file_path, "r", encoding="utf-8") as f:
+            while True:
+                block = f.read(block_size)
+                if not block:
+                    break
+                yield block
+
+    def _iter_pdf(self, file_path: str) -> Iterator[str]:
+        for _, text in self.pdf_extractor.iter_pages(file_path):
+            yield text
+
+    def _iter_docx(self, file_path: str) -> Iterator[str]:
+        from docx import Document
+        doc = Document(file_path)
+        first = True
+        for paragraph in doc.paragraphs:
+            if not paragraph.text.strip():
+                continue
+            yield paragraph.text if first else "\n" + paragraph.text
+            first = False
+
     def _read_txt(self, file_path: str) -> str:
         with open(file_path, "r", encoding="utf-8") as f:
             return f.read()
 
     def _read_pdf(self, file_path: str) -> str:
-        text = ""
-        with open(file_path, "rb") as f:
-            reader = PdfReader(f)
-            for page in reader.pages:
-                text += page.extract_text() or ""
-        return text
+        return "".join(self._iter_pdf(file_path))
 
     def _read_docx(self, file_path: str) -> str:
+        from docx import Document
         doc = Document(file_path)
         return "\n".join(paragraph.text for paragraph in doc.paragraphs if paragraph.text.strip())
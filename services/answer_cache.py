@@ -0,0 +1,136 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Hashable, Optional
+
+import numpy as np
+
+
+class SemanticAnswerCache:
+    """
+    Size-bounded LRU cache of LLM answers keyed on query embeddings.
+
+    A lookup hits when a cached query embedding has a cosine similarity with
+    the new query embedding of at least `similarity_threshold`. Embeddings are
+    expected to be L2-normalized (as produced by `FaissVectorDatabase.embed_texts`),
+    so cosine similarity is a plain dot product. Entries also carry a
+    `variant` (e.g. the number of answers asked for), which must match exactly.
+
+    Every `clear` starts a new generation. Callers read `generation` before
+    retrieving and pass it to `put`, so an answer computed from the index as it
+    was before a clear is not stored after it.
+    """
+
+    def __init__(self, similarity_threshold: float = 0.95, ttl_seconds: float = 3600.0, max_size: int = 1024) -> None:
+        """
+        Args:
+            similarity_threshold: float
+                Minimum cosine similarity for a cached answer to be reused.
+            ttl_seconds: float
+                Lifetime of a cached answer in seconds. Non-positive disables expiry.
+            max_size: int
+                Maximum number of cached answers before LRU eviction.
+        """
+        if max_size <= 0:
+            raise ValueError("max_size must be positive")
+        self.similarity_threshold = similarity_threshold
+        self.ttl_seconds = ttl_seconds
+        self.max_size = max_size
+        self._entries: "OrderedDict[int, tuple]" = OrderedDict()
+        self._matrix: Optional[np.ndarray] = None
+        self._matrix_keys: list = []
+        self._matrix_variants: list = []
+        self._next_key = 0
+        self.generation = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def _expired(self, created_at: float, now: float) -> bool:
+        return self.ttl_seconds > 0 and now - created_at > self.ttl_seconds
+
+    def _evict_expired(self, now: float) -> None:
+        expired = [key for key, (_, _, _, created_at) in self._entries.items() if self._expired(created_at, now)]
+        for key in expired:
+            del self._entries[key]
+        if expired:
+            self._matrix = None
+
+    def _build_matrix(self) -> None:
+        self._matrix_keys = list(self._entries.keys())
+        if self._matrix_keys:
+            self._matrix = np.vstack([self._entries[key][0] for key in self._matrix_keys])
+            self._matrix_variants = [self._entries[key][1] for key in self._matrix_keys]
+        else:
+            self._matrix = np.empty((0, 0), dtype=np.float32)
+
+    def get(self, embedding: np.ndarray, variant: Hashable = None) -> Optional[Any]:
+        """
+        Returns the cached answer for the most similar cached query of the same variant, if any.
+
+        Args:
+            embedding: np.ndarray - normalized query embedding of shape (dim,) or (1, dim)
+            variant: Hashable - further part of the key that must match exactly
+
+        Returns:
+            The cached answer, or None on a miss.
+        """
+        query = np.asarray(embedding, dtype=np.float32).reshape(-1)
+        with self._lock:
+            self._evict_expired(time.monotonic())
+            if not self._entries:
+                self.misses += 1
+                return None
+            if self._matrix is None:
+                self._build_matrix()
+            similarities = self._matrix @ query
+            for i, entry_variant in enumerate(self._matrix_variants):
+                if entry_variant != variant:
+                    similarities[i] = -np.inf
+            best = int(np.argmax(similarities))
+            if similarities[best] < self.similarity_threshold:
+                self.misses += 1
+                return None
+            key = self._matrix_keys[best]
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return self._entries[key][2]
+
+    def put(self, embedding: np.ndarray, answer: Any, variant: Hashable = None, generation: Optional[int] = None) -> bool:
+        """
+        Stores an answer for the given query embedding, evicting the least
+        recently used entry when the cache is full.
+
+        Args:
+            embedding: np.ndarray - normalized query embedding of shape (dim,) or (1, dim)
+            answer: Any - the answer to cache
+            variant: Hashable - further part of the key, see `get`
+            generation: Optional[int] - `generation` read before the answer was
+                computed; the answer is dropped if the cache was cleared since
+
+        Returns:
+            Whether the answer was stored
+        """
+        vector = np.asarray(embedding, dtype=np.float32).reshape(-1).copy()
+        with self._lock:
+            if generation is not None and generation != self.generation:
+                return False
+            self._entries[self._next_key] = (vector, variant, answer, time.monotonic())
+            self._next_key += 1
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+            self._matrix = None
+        return True
+
+    def clear(self) -> None:
+        """
+        Drops every cached answer. Called whenever the underlying index changes.
+        """
+        with self._lock:
+            self.generation += 1
+            self._entries.clear()
+            self._matrix = None
+            self._matrix_keys = []
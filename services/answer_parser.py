@@ -0,0 +1,215 @@
+import json
+import math
+import re
+from dataclasses import asdict, dataclass
+from typing import Dict, Iterable, Iterator, List, Optional
+
+
+# Characters that change the extractor's state; everything else is copied in bulk
+STRUCTURE_PATTERN = re.compile(r'[{}"\\]')
+# String literals are matched too, so commas inside them are left alone
+TRAILING_COMMA_PATTERN = re.compile(r'("(?:[^"\\]|\\.)*")|,\s*([}\]])')
+CODE_FENCE_PATTERN = re.compile(r"^\s*```[a-zA-Z]*\s*|\s*```\s*$")
+
+
+@dataclass(frozen=True)
+class QAAnswer:
+    """
+    One answer object of the LLM output schema.
+    """
+    question: str
+    answer: str
+    score: Optional[float] = None
+
+    @classmethod
+    def from_dict(cls, obj: Dict) -> Optional["QAAnswer"]:
+        """
+        Validates a parsed JSON object against the schema: non-empty string
+        "question" and "answer", and an optional numeric "score". A score
+        that is not a finite number is dropped.
+
+        Returns:
+            The answer, or None if the object does not match the schema
+        """
+        question, answer = obj.get("question"), obj.get("answer")
+        if not isinstance(question, str) or not isinstance(answer, str) or not question.strip() or not answer.strip():
+            return None
+        score = obj.get("score")
+        try:
+            score = float(score) if score is not None and not isinstance(score, bool) else None
+        except (TypeError, ValueError):
+            score = None
+        if score is not None and not math.isfinite(score):
+            score = None
+        return cls(question=question.strip(), answer=answer.strip(), score=score)
+
+    def to_dict(self) -> Dict:
+        return {key: value for key, value in asdict(self).items() if value is not None}
+
+
+class JSONObjectExtractor:
+    """
+    Incrementally extracts top-level JSON objects from text that arrives in
+    chunks, such as a streaming LLM response. Text outside objects (code
+    fences, list brackets, commas, prose) is ignored; braces, quotes and
+    escapes inside string literals are respected, so answers containing
+    "(", "{" or the word "json" come through intact.
+
+    Only the structural characters are inspected one at a time; the text in
+    between is copied as whole slices.
+    """
+
+    def __init__(self) -> None:
+        self._parts: List[str] = []
+        self._depth = 0
+        self._in_string = False
+        self._escaped = False
+
+    def feed(self, chunk: str) -> List[Dict]:
+        """
+        Consumes the next chunk of text.
+
+        Args:
+            chunk: str - the next text fragment
+
+        Returns:
+            The objects completed by this chunk, in order
+        """
+        objects = []
+        pos = 0
+        segment_start = 0
+        if self._escaped and chunk:
+            # The previous chunk ended inside an escape sequence
+            self._escaped = False
+            pos = 1
+        while pos < len(chunk):
+            if not self._depth:
+                start = chunk.find("{", pos)
+                if start == -1:
+                    break
+                self._depth = 1
+                segment_start = start
+                pos = start + 1
+                continue
+            match = STRUCTURE_PATTERN.search(chunk, pos)
+            if match is None:
+                break
+            c, pos = match.group(), match.end()
+            if self._in_string:
+                if c == "\\":
+                    if pos < len(chunk):
+                        pos += 1
+                    else:
+                        self._escaped = True
+                elif c == '"':
+                    self._in_string = False
+            elif c == '"':
+                self._in_string = True
+            elif c == "{":
+                self._depth += 1
+            elif c == "}":
+                self._depth -= 1
+                if not self._depth:
+                    self._parts.append(chunk[segment_start:pos])
+                    obj = self._decode("".join(self._parts))
+                    self._parts = []
+                    if obj is not None:
+                        objects.append(obj)
+        if self._depth:
+            self._parts.append(chunk[segment_start:])
+        return objects
+
+    @staticmethod
+    def _decode(text: str) -> Optional[Dict]:
+        for candidate in (text, TRAILING_COMMA_PATTERN.sub(lambda match: match.group(1) or match.group(2), text)):
+            try:
+                obj = json.loads(candidate)
+            except ValueError:
+                continue
+            return obj if isinstance(obj, dict) else None
+        return None
+
+
+class AnswerParser:
+    """
+    Parses an LLM reply into typed `QAAnswer` objects, incrementally.
+
+    Feed the reply as it streams in (or all at once); answers are returned as
+    soon as their object is complete. Exact duplicates are dropped. A reply
+    without any answer object is a plain-text message, e.g. a greeting.
+    """
+
+    def __init__(self) -> None:
+        self._extractor = JSONObjectExtractor()
+        self._text: List[str] = []
+        self._seen = set()
+        self.answers: List[QAAnswer] = []
+
+    def feed(self, chunk: str) -> List[QAAnswer]:
+        """
+        Consumes the next chunk of the reply.
+
+        Args:
+            chunk: str - the next text fragment
+
+        Returns:
+            The new answers completed by this chunk
+        """
+        self._text.append(chunk)
+        new = []
+        for obj in self._extractor.feed(chunk):
+            answer = QAAnswer.from_dict(obj)
+            if answer is not None and (answer.question, answer.answer) not in self._seen:
+                self._seen.add((answer.question, answer.answer))
+                new.append(answer)
+        self.answers.extend(new)
+        return new
+
+    def message(self) -> str:
+        """
+        Returns the reply as plain text, without surrounding code fences.
+        """
+        return CODE_FENCE_PATTERN.sub("", "".join(self._text)).strip()
+
+    def result(self) -> str:
+        """
+        Returns the normalized reply: a JSON list of the answers, or the plain-text message if there were none.
+        """
+        if self.answers:
+            return answers_to_json(self.answers)
+        return self.message()
+
+
+def parse_answers(text: str) -> AnswerParser:
+    """
+    Parses a complete LLM reply.
+
+    Args:
+        text: str - the raw reply
+
+    Returns:
+        The parser, holding `answers` and the normalized `result()`
+    """
+    parser = AnswerParser()
+    parser.feed(text)
+    return parser
+
+
+def iter_answers(chunks: Iterable[str]) -> Iterator[QAAnswer]:
+    """
+    Yields each answer of a streamed LLM reply as soon as its object is complete.
+
+    Example:
+        >>> [a.answer for a in iter_answers(['[{"question": "a", ', '"answer": "b (c) {d}"}]'])]
+        ['b (c) {d}']
+    """
+    parser = AnswerParser()
+    for chunk in chunks:
+        yield from parser.feed(chunk)
+
+
+def answers_to_json(answers: List[QAAnswer]) -> str:
+    """
+    Serializes answers as the JSON list the API returns.
+    """
+    return json.dumps([answer.to_dict() for answer in answers], ensure_ascii=False)
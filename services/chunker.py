@@ -0,0 +1,342 @@
+import re
+from bisect import bisect_left, bisect_right
+from dataclasses import dataclass, field
+from itertools import accumulate
+from typing import Callable, Iterable, Iterator, List, Optional, Tuple
+
+from utils.utils import batched
+
+
+TokenCounter = Callable[[List[str]], List[int]]
+
+# A question line ends with "?" or starts with a "Q:" / "Question 3." style marker
+QUESTION_PATTERN = re.compile(r"(?:\?\s*$)|(?:^(?:Q|Question)\s*\d*\s*[:.)])", re.IGNORECASE)
+QUESTION_MARKER_PATTERN = re.compile(r"^(?:(?:Q|Question)\s*\d*\s*[:.)]|\d+[.)])\s*", re.IGNORECASE)
+ANSWER_MARKER_PATTERN = re.compile(r"^(?:A|Answer)\s*[:.)]\s*", re.IGNORECASE)
+MARKDOWN_HEADING_PATTERN = re.compile(r"^#{1,6}\s+(?P<title>\S.*)$")
+NUMBERED_HEADING_PATTERN = re.compile(r"^(?:\d+(?:\.\d+)*\.?|[IVX]+\.|[A-Z]\.)\s+\S")
+SENTENCE_END_PATTERN = re.compile(r"[.!?:;][\"')\]]*$")
+SENTENCE_BOUNDARY_PATTERN = re.compile(r"(?<=[.!?])[\"')\]]*\s+(?=[\"'(\[]?[A-Z0-9])")
+TOKEN_ESTIMATE_PATTERN = re.compile(r"\w+|[^\w\s]")
+
+
+def estimate_tokens(texts: List[str]) -> List[int]:
+    """
+    Approximates WordPiece token counts without a tokenizer: one token per
+    punctuation mark and short word, plus one per further 6 characters of long words.
+    """
+    return [
+        sum(1 + (len(piece) - 1) // 6 for piece in TOKEN_ESTIMATE_PATTERN.findall(text))
+        for text in texts
+    ]
+
+
+def tokenizer_counter(tokenizer) -> TokenCounter:
+    """
+    Wraps a Hugging Face tokenizer into a batched token counter (special tokens excluded).
+    """
+    def count_tokens(texts: List[str]) -> List[int]:
+        if not texts:
+            return []
+        encoded = tokenizer(texts, add_special_tokens=False, verbose=False)["input_ids"]
+        return [len(ids) for ids in encoded]
+    return count_tokens
+
+
+@dataclass
+class _Unit:
+    """
+    A piece of a document that is kept together if it fits in one chunk: a
+    question with its answer, or a paragraph.
+    """
+    kind: str
+    section: Optional[str]
+    question: Optional[str] = None
+    paragraphs: List[List[str]] = field(default_factory=list)
+    pages: List[int] = field(default_factory=list)
+    n_chars: int = 0
+
+    def add_line(self, line: str, page: Optional[int], new_paragraph: bool) -> None:
+        if new_paragraph or not self.paragraphs:
+            self.paragraphs.append([])
+        self.paragraphs[-1].append(line)
+        self.n_chars += len(line) + 1
+        if page is not None:
+            self.pages.append(page)
+
+    @property
+    def body(self) -> str:
+        return "\n".join(" ".join(lines) for lines in self.paragraphs if lines)
+
+    @property
+    def text(self) -> str:
+        return "\n".join(part for part in (self.question, self.body) if part)
+
+
+class StructuredChunker:
+    """
+    Splits documents into chunks along their structure and sizes them in
+    embedding-model tokens instead of characters.
+
+    Lines are classified as headings, questions or body text. A question and
+    its answer form one unit, other text forms one unit per paragraph, and
+    headings become the section of the units below them. Q/A units become
+    one chunk each; paragraphs of the same section are packed together up to
+    `max_tokens`. Only units too large for one chunk are split, at sentence
+    boundaries and with `overlap_tokens` of overlap, and each of their pieces
+    repeats the question. Every chunk is prefixed with its section heading.
+
+    The input is streamed: at most one unit and one chunk are buffered, and
+    token counts are computed for batches of units at once.
+    """
+
+    def __init__(
+        self,
+        max_tokens: int = 250,
+        overlap_tokens: int = 32,
+        count_tokens: Optional[TokenCounter] = None,
+        count_batch_size: int = 64
+    ) -> None:
+        """
+        Args:
+            max_tokens: int
+                Maximum tokens per chunk. Keep it below the embedding model's
+                sequence length (256 word pieces for all-MiniLM-L6-v2), which truncates longer input.
+            overlap_tokens: int
+                Tokens repeated between consecutive pieces of a unit that had to be split.
+            count_tokens: Optional[TokenCounter]
+                Batched token counter, e.g. `FaissVectorDatabase.count_tokens`. Defaults to `estimate_tokens`.
+            count_batch_size: int
+                Number of units whose tokens are counted in one call.
+        """
+        if overlap_tokens >= max_tokens:
+            raise ValueError("overlap_tokens must be less than max_tokens")
+        self.max_tokens = max_tokens
+        self.overlap_tokens = overlap_tokens
+        self.count_tokens = count_tokens or estimate_tokens
+        self.count_batch_size = count_batch_size
+        # Units longer than this are certainly over budget, so they are cut off
+        # early to keep memory bounded on documents without structure
+        self.max_unit_chars = max_tokens * 16
+
+    def iter_chunks(self, segments: Iterable[Tuple[Optional[int], str]]) -> Iterator[Tuple[str, dict]]:
+        """
+        Chunks a document given as (page number, text) segments, as yielded by `IOManager.iter_pages`.
+
+        Args:
+            segments: Iterable[Tuple[Optional[int], str]] - consecutive (page number, text) pieces; page numbers may be None
+
+        Yields:
+            Tuple[str, dict]: Each chunk and its metadata {"page_start", "page_end", "section"}.
+        """
+        for units in batched(self._iter_units(self._iter_lines(segments)), self.count_batch_size):
+            counts = self.count_tokens([unit.text for unit in units])
+            yield from self._pack(zip(units, counts))
+
+    def iter_qa_pairs(self, segments: Iterable[Tuple[Optional[int], str]]) -> Iterator[Tuple[str, str]]:
+        """
+        Yields the (question, answer) pairs detected in a document or chunk,
+        with question numbering and "Q:"/"A:" markers removed.
+
+        Args:
+            segments: Iterable[Tuple[Optional[int], str]] - consecutive (page number, text) pieces
+
+        Yields:
+            Tuple[str, str]: Each question and its answer text
+        """
+        for unit in self._iter_units(self._iter_lines(segments)):
+            if unit.kind == "qa" and unit.paragraphs:
+                question = QUESTION_MARKER_PATTERN.sub("", unit.question, count=1)
+                answer = ANSWER_MARKER_PATTERN.sub("", " ".join(" ".join(lines) for lines in unit.paragraphs), count=1)
+                yield question, answer
+
+    def _iter_lines(self, segments: Iterable[Tuple[Optional[int], str]]) -> Iterator[Tuple[Optional[int], str]]:
+        """
+        Yields stripped (page, line) pairs; blank lines are yielded as "" to mark paragraph breaks.
+        Segments with a page number end at a line break; others may split a line.
+        """
+        partial = ""
+        partial_page = None
+        for page, segment in segments:
+            if not segment:
+                continue
+            lines = (partial + segment).split("\n")
+            partial = ""
+            if page is None:
+                partial, partial_page = lines.pop(), page
+            for line in lines:
+                yield page, line.strip()
+        if partial:
+            yield partial_page, partial.strip()
+
+    def _is_heading(self, line: str, previous: str) -> Optional[str]:
+        """
+        Returns the heading title if `line` looks like a heading, else None.
+        """
+        match = MARKDOWN_HEADING_PATTERN.match(line)
+        if match:
+            return match.group("title").strip()
+        if len(line) > 80 or SENTENCE_END_PATTERN.search(line) or line.endswith(","):
+            return None
+        if previous and not SENTENCE_END_PATTERN.search(previous):
+            # Most likely the last line of a wrapped paragraph
+            return None
+        words = [word for word in re.findall(r"[^\W\d_][\w'-]*", line)]
+        if not words or len(words) > 10:
+            return None
+        capitalized = sum(word[0].isupper() for word in words if len(word) > 3)
+        long_words = sum(len(word) > 3 for word in words)
+        if line.isupper() or NUMBERED_HEADING_PATTERN.match(line) or (long_words and capitalized == long_words):
+            return line
+        return None
+
+    def _iter_units(self, lines: Iterable[Tuple[Optional[int], str]]) -> Iterator[_Unit]:
+        section = None
+        unit: Optional[_Unit] = None
+        # A heading candidate is only committed once the next line shows it
+        # is not the start of a question wrapped over two lines
+        candidate: Optional[Tuple[Optional[int], str]] = None
+        previous = ""
+        new_paragraph = True
+        for page, line in lines:
+            continues_candidate = bool(line) and line[0].islower() and QUESTION_PATTERN.search(line)
+            if candidate is not None and not continues_candidate:
+                if unit is not None:
+                    yield unit
+                    unit = None
+                section = candidate[1]
+                candidate = None
+            if not line:
+                new_paragraph = True
+                previous = ""
+                continue
+            if QUESTION_PATTERN.search(line):
+                # Take back the start of a question wrapped over several lines
+                question_lines = [line]
+                pages = [page]
+                if candidate is not None:
+                    question_lines.insert(0, candidate[1])
+                    pages.insert(0, candidate[0])
+                    candidate = None
+                elif unit is not None and unit.paragraphs and not new_paragraph:
+                    tail = unit.paragraphs[-1]
+                    while len(tail) > 1 and len(question_lines) < 3 and not SENTENCE_END_PATTERN.search(tail[-1]) \
+                            and SENTENCE_END_PATTERN.search(tail[-2]):
+                        question_lines.insert(0, tail.pop())
+                if unit is not None and (unit.paragraphs and unit.paragraphs[-1] or unit.question):
+                    yield unit
+                unit = _Unit(kind="qa", section=section, question=" ".join(question_lines))
+                unit.pages.extend(page for page in pages if page is not None)
+                previous, new_paragraph = line, True
+                continue
+            heading = self._is_heading(line, previous)
+            if heading is not None:
+                candidate = (page, heading)
+                previous, new_paragraph = line, True
+                continue
+            if unit is None or (unit.kind == "text" and new_paragraph) or unit.n_chars > self.max_unit_chars:
+                if unit is not None:
+                    yield unit
+                    # An answer cut off for size continues under the same question
+                    unit = _Unit(kind=unit.kind, section=section, question=unit.question if unit.kind == "qa" else None)
+                else:
+                    unit = _Unit(kind="text", section=section)
+                if unit.kind == "text":
+                    new_paragraph = True
+            unit.add_line(line, page, new_paragraph)
+            previous, new_paragraph = line, False
+        if candidate is not None:
+            if unit is not None:
+                yield unit
+            unit = _Unit(kind="text", section=section)
+            unit.add_line(candidate[1], candidate[0], True)
+        if unit is not None and (unit.paragraphs or unit.question):
+            yield unit
+
+    @staticmethod
+    def _metadata(pages: List[int], section: Optional[str]) -> dict:
+        return {
+            "page_start": min(pages) if pages else None,
+            "page_end": max(pages) if pages else None,
+            "section": section,
+        }
+
+    def _with_prefix(self, prefix: List[str], body: str) -> str:
+        return "\n".join(prefix + [body])
+
+    def _pack(self, units: Iterable[Tuple[_Unit, int]]) -> Iterator[Tuple[str, dict]]:
+        """
+        Packs counted units into chunks.
+        """
+        pending: List[_Unit] = []
+        pending_tokens = 0
+        pending_section = None
+
+        def flush():
+            nonlocal pending, pending_tokens
+            if pending:
+                prefix = [pending_section] if pending_section else []
+                body = "\n".join(unit.body for unit in pending)
+                pages = [page for unit in pending for page in unit.pages]
+                yield self._with_prefix(prefix, body), self._metadata(pages, pending_section)
+            pending, pending_tokens = [], 0
+
+        section_tokens = {}
+        for unit, n_tokens in units:
+            if unit.section and unit.section not in section_tokens:
+                section_tokens = {unit.section: self.count_tokens([unit.section])[0]}
+            heading_tokens = section_tokens.get(unit.section, 0)
+            if unit.kind == "text" and unit.section == pending_section and pending_tokens + n_tokens + heading_tokens <= self.max_tokens:
+                pending.append(unit)
+                pending_tokens += n_tokens
+                continue
+            yield from flush()
+            if n_tokens + heading_tokens <= self.max_tokens:
+                if unit.kind == "text":
+                    pending, pending_tokens, pending_section = [unit], n_tokens, unit.section
+                else:
+                    prefix = [unit.section] if unit.section else []
+                    yield self._with_prefix(prefix, unit.text), self._metadata(unit.pages, unit.section)
+                continue
+            yield from self._split(unit, heading_tokens)
+        yield from flush()
+
+    def _split(self, unit: _Unit, heading_tokens: int) -> Iterator[Tuple[str, dict]]:
+        """
+        Splits a unit that does not fit in one chunk at sentence boundaries,
+        using prefix sums of sentence token counts to place the cuts.
+        """
+        prefix = [part for part in (unit.section, unit.question) if part]
+        prefix_tokens = heading_tokens + (self.count_tokens([unit.question])[0] if unit.question else 0)
+        if prefix_tokens > self.max_tokens // 2:
+            # Repeating a very long question would leave too little room for the answer
+            prefix = [unit.section] if unit.section and heading_tokens <= self.max_tokens // 4 else []
+            prefix_tokens = heading_tokens if prefix else 0
+            pieces = [unit.question] if unit.question else []
+        else:
+            pieces = []
+        budget = self.max_tokens - prefix_tokens
+        pieces += [sentence for sentence in SENTENCE_BOUNDARY_PATTERN.split(unit.body) if sentence.strip()]
+        counts = self.count_tokens(pieces)
+        sentences, sentence_tokens = [], []
+        for piece, n_tokens in zip(pieces, counts):
+            if n_tokens <= budget:
+                sentences.append(piece)
+                sentence_tokens.append(n_tokens)
+            else:
+                words = piece.split()
+                word_tokens = self.count_tokens(words)
+                sentences.extend(words)
+                sentence_tokens.extend(word_tokens)
+        # Overlap is measured in the same prefix sums, so it must leave room for progress
+        overlap = min(self.overlap_tokens, budget // 2)
+        offsets = [0] + list(accumulate(sentence_tokens))
+        n = len(sentences)
+        start = 0
+        while start < n:
+            end = bisect_right(offsets, offsets[start] + budget) - 1
+            end = max(end, start + 1)
+            yield self._with_prefix(prefix, " ".join(sentences[start:end])), self._metadata(unit.pages, unit.section)
+            if end >= n:
+                break
+            start = max(bisect_left(offsets, offsets[end] - overlap), start + 1)
@@ -0,0 +1,143 @@
+import re
+from typing import List, Optional, Sequence, Tuple
+
+from services.chunker import TokenCounter, estimate_tokens
+
+
+WHITESPACE_PATTERN = re.compile(r"\s+")
+
+
+def _normalize(text: str) -> str:
+    return WHITESPACE_PATTERN.sub(" ", text).strip()
+
+
+def _overlap(left: str, right: str, min_overlap: int) -> int:
+    """
+    Returns the length of the longest suffix of `left` that is a prefix of
+    `right`, or 0 if it is shorter than `min_overlap`.
+    """
+    probe = right[:min_overlap]
+    if len(probe) < min_overlap:
+        return 0
+    start = left.find(probe, max(len(left) - len(right), 0))
+    while start != -1:
+        if right.startswith(left[start:]):
+            return len(left) - start
+        start = left.find(probe, start + 1)
+    return 0
+
+
+class ContextBuilder:
+    """
+    Turns raw search hits into the compact context block sent to the LLM.
+
+    Hits below `min_similarity` are dropped (the best hit is always kept, so
+    the LLM can still say nothing relevant was found). Exact duplicates and
+    hits contained in a better one are removed, and hits that overlap, like
+    consecutive character-window chunks, are merged into one passage without
+    the repeated span. Passages are then added best first until
+    `max_tokens` is reached; the last one is truncated at a sentence or word
+    boundary if enough room is left.
+    """
+
+    def __init__(
+        self,
+        max_tokens: int = 1500,
+        min_similarity: float = 0.2,
+        count_tokens: Optional[TokenCounter] = None,
+        min_overlap_chars: int = 20,
+        min_truncated_tokens: int = 32
+    ) -> None:
+        """
+        Args:
+            max_tokens: int
+                Token budget of the whole context block.
+            min_similarity: float
+                Cosine similarity below which hits are dropped.
+            count_tokens: Optional[TokenCounter]
+                Batched token counter. Defaults to `estimate_tokens`.
+            min_overlap_chars: int
+                Shortest shared span treated as overlap between two hits.
+            min_truncated_tokens: int
+                Smallest remaining budget worth filling with a truncated passage.
+        """
+        self.max_tokens = max_tokens
+        self.min_similarity = min_similarity
+        self.count_tokens = count_tokens or estimate_tokens
+        self.min_overlap_chars = min_overlap_chars
+        self.min_truncated_tokens = min_truncated_tokens
+
+    def passages(self, searches: Sequence[Tuple]) -> List[Tuple[str, float]]:
+        """
+        Filters, deduplicates and merges search hits.
+
+        Args:
+            searches: Sequence[Tuple] - (text, similarity, ...) hits, in any order
+
+        Returns:
+            List of (passage, best similarity), best first
+        """
+        hits = sorted(((_normalize(hit[0]), float(hit[1])) for hit in searches if hit[0]), key=lambda hit: -hit[1])
+        hits = [hit for i, hit in enumerate(hits) if i == 0 or hit[1] >= self.min_similarity]
+        passages: List[List] = []
+        for text, score in hits:
+            merged = False
+            for passage in passages:
+                if text in passage[0]:
+                    merged = True
+                elif passage[0] in text:
+                    passage[0] = text
+                    merged = True
+                else:
+                    n = _overlap(passage[0], text, self.min_overlap_chars)
+                    if n:
+                        passage[0] = passage[0] + text[n:]
+                        merged = True
+                    else:
+                        n = _overlap(text, passage[0], self.min_overlap_chars)
+                        if n:
+                            passage[0] = text + passage[0][n:]
+                            merged = True
+                if merged:
+                    break
+            if not merged:
+                passages.append([text, score])
+        return [(text, score) for text, score in passages]
+
+    def _truncate(self, text: str, n_tokens: int, budget: int) -> str:
+        """
+        Cuts `text` to about `budget` tokens at the last sentence (or word) boundary.
+        """
+        cut = text[:max(int(len(text) * budget / n_tokens), 1)]
+        while cut and self.count_tokens([cut])[0] > budget:
+            cut = cut[:int(len(cut) * 0.9)]
+        sentence_end = max(cut.rfind(". "), cut.rfind("? "), cut.rfind("! "))
+        if sentence_end > len(cut) // 2:
+            return cut[:sentence_end + 1]
+        word_end = cut.rfind(" ")
+        return (cut[:word_end] if word_end > 0 else cut) + " ..."
+
+    def build(self, searches: Sequence[Tuple]) -> str:
+        """
+        Builds the context block for a prompt.
+
+        Args:
+            searches: Sequence[Tuple] - (text, similarity, ...) hits from the vector database
+
+        Returns:
+            Numbered passages with their similarity, or "" when there are no hits
+        """
+        passages = self.passages(searches)
+        headers = [f"[{i}] (similarity {score:.2f})" for i, (_, score) in enumerate(passages, 1)]
+        counts = self.count_tokens([f"{header}\n{text}" for header, (text, _) in zip(headers, passages)])
+        blocks = []
+        remaining = self.max_tokens
+        for header, (text, _), n_tokens in zip(headers, passages, counts):
+            if n_tokens <= remaining:
+                blocks.append(f"{header}\n{text}")
+                remaining -= n_tokens
+                continue
+            if remaining >= self.min_truncated_tokens:
+                blocks.append(f"{header}\n{self._truncate(text, n_tokens, remaining - 8)}")
+            break
+        return "\n\n".join(blocks)
@@ -0,0 +1,191 @@
+import json
+import os
+import re
+import threading
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Tuple
+
+import numpy as np
+
+try:
+    import fcntl
+except ImportError:  # Windows: appends are only serialized within the process
+    fcntl = None
+
+
+KEY_SIZE = 16
+
+
+class EmbeddingCache:
+    """
+    Persistent cache of chunk embeddings keyed on (model name, normalized chunk hash).
+
+    Each model gets its own directory holding:
+        vectors.f32 - append-only float32 matrix, read through np.memmap
+        keys.bin    - append-only 16-byte content hashes, one per matrix row
+        manifest.json - model name and embedding dimension
+
+    Only the key -> row mapping lives on the heap; vectors stay on disk and in
+    the OS page cache. A crash between the two appends is repaired by
+    truncating both files to the rows that are complete in each.
+
+    Several processes (e.g. gunicorn workers) may share a cache directory:
+    appends and repairs hold an exclusive `flock` on `lock` in the model
+    directory. Under it the writer first reads the keys other processes
+    appended, so row numbers always follow from the file sizes. Without
+    `fcntl` (Windows) only one process may write to a directory.
+    """
+
+    def __init__(self, cache_dir: str, model_name: str, dim: int) -> None:
+        """
+        Args:
+            cache_dir: str
+                Root directory of the cache.
+            model_name: str
+                Embedding model name; embeddings of different models never mix.
+            dim: int
+                Embedding dimension.
+        """
+        self.model_name = model_name
+        self.dim = dim
+        self.path = os.path.join(cache_dir, re.sub(r"[^A-Za-z0-9_.-]", "_", model_name))
+        self._vectors_path = os.path.join(self.path, "vectors.f32")
+        self._keys_path = os.path.join(self.path, "keys.bin")
+        self._lock = threading.Lock()
+        self._rows: Dict[bytes, int] = {}
+        self._n_rows = 0
+        self._mapped = None
+        self._open()
+
+    _shared: Dict[str, "EmbeddingCache"] = {}
+    _shared_lock = threading.Lock()
+
+    @classmethod
+    def shared(cls, cache_dir: str, model_name: str, dim: int) -> "EmbeddingCache":
+        """
+        Returns the process-wide cache instance for a directory and model, so
+        several databases never append to the same files independently.
+        """
+        key = os.path.join(os.path.abspath(cache_dir), model_name)
+        with cls._shared_lock:
+            if key not in cls._shared:
+                cls._shared[key] = cls(cache_dir, model_name, dim)
+            return cls._shared[key]
+
+    def _open(self) -> None:
+        os.makedirs(self.path, exist_ok=True)
+        manifest_path = os.path.join(self.path, "manifest.json")
+        manifest = {"model_name": self.model_name, "dim": self.dim}
+        if os.path.exists(manifest_path):
+            with open(manifest_path, "r", encoding="utf-8") as f:
+                stored = json.load(f)
+            if stored != manifest:
+                raise ValueError(f"Embedding cache at {self.path} was built for {stored}, not {manifest}")
+        else:
+            with open(manifest_path, "w", encoding="utf-8") as f:
+                json.dump(manifest, f)
+
+        for path in (self._vectors_path, self._keys_path):
+            open(path, "ab").close()
+        with self._file_lock():
+            self._refresh()
+
+    @contextmanager
+    def _file_lock(self) -> Iterator[None]:
+        """
+        Holds the exclusive cross-process lock of the cache directory.
+        """
+        with open(os.path.join(self.path, "lock"), "a+b") as f:
+            if fcntl is not None:
+                fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                if fcntl is not None:
+                    fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+
+    def _refresh(self) -> None:
+        """
+        Truncates a torn append and reads the keys appended since the last refresh,
+        by this or another process. Must be called with the file lock held.
+        """
+        row_bytes = self.dim * 4
+        keys_size = os.path.getsize(self._keys_path)
+        vectors_size = os.path.getsize(self._vectors_path)
+        n_rows = min(keys_size // KEY_SIZE, vectors_size // row_bytes)
+        if keys_size != n_rows * KEY_SIZE:
+            os.truncate(self._keys_path, n_rows * KEY_SIZE)
+        if vectors_size != n_rows * row_bytes:
+            os.truncate(self._vectors_path, n_rows * row_bytes)
+        if n_rows > self._n_rows:
+            with open(self._keys_path, "rb") as f:
+                f.seek(self._n_rows * KEY_SIZE)
+                keys = f.read((n_rows - self._n_rows) * KEY_SIZE)
+            for i in range(n_rows - self._n_rows):
+                self._rows.setdefault(keys[i * KEY_SIZE:(i + 1) * KEY_SIZE], self._n_rows + i)
+        self._n_rows = n_rows
+
+    def __len__(self) -> int:
+        return len(self._rows)
+
+    def __contains__(self, key: bytes) -> bool:
+        return key in self._rows
+
+    def _vectors(self) -> np.ndarray:
+        n_rows = self._n_rows
+        if self._mapped is None or self._mapped.shape[0] < n_rows:
+            self._mapped = np.memmap(self._vectors_path, dtype=np.float32, mode="r", shape=(n_rows, self.dim)) if n_rows else np.empty((0, self.dim), dtype=np.float32)
+        return self._mapped
+
+    def get_many(self, keys: List[bytes]) -> Tuple[np.ndarray, List[int]]:
+        """
+        Looks up embeddings for content hashes.
+
+        Args:
+            keys: List[bytes] - content hashes, see `utils.content_hash`
+
+        Returns:
+            Tuple of (matrix of shape (len(keys), dim) with cached rows filled in,
+            positions of the keys that were not cached)
+        """
+        out = np.zeros((len(keys), self.dim), dtype=np.float32)
+        missing: List[int] = []
+        with self._lock:
+            vectors = self._vectors()
+            for i, key in enumerate(keys):
+                row = self._rows.get(key)
+                if row is None:
+                    missing.append(i)
+                else:
+                    out[i] = vectors[row]
+        return out, missing
+
+    def put_many(self, keys: List[bytes], vectors: np.ndarray) -> None:
+        """
+        Appends embeddings for content hashes not cached yet.
+
+        Args:
+            keys: List[bytes] - content hashes
+            vectors: np.ndarray - embeddings of shape (len(keys), dim)
+        """
+        with self._lock, self._file_lock():
+            self._refresh()
+            new_keys: List[bytes] = []
+            new_rows: List[int] = []
+            seen = set()
+            for i, key in enumerate(keys):
+                if key not in self._rows and key not in seen:
+                    seen.add(key)
+                    new_keys.append(key)
+                    new_rows.append(i)
+            if not new_keys:
+                return
+            block = np.ascontiguousarray(vectors[new_rows], dtype=np.float32)
+            # Vectors first: a row without a key is dropped on open, a key without a row never exists
+            with open(self._vectors_path, "ab") as f:
+                f.write(block.tobytes())
+            with open(self._keys_path, "ab") as f:
+                f.write(b"".join(new_keys))
+            for offset, key in enumerate(new_keys):
+                self._rows[key] = self._n_rows + offset
+            self._n_rows += len(new_keys)
@@ -1,33 +1,427 @@
 import faiss
 import logging
+import os
 import pickle
-from sentence_transformers import SentenceTransformer
-from typing import List, Tuple
+import threading
+from dataclasses import dataclass, replace
+from typing import Dict, List, Optional, Sequence, Tuple
 import numpy as np
 
-from schemas.general_schemas import VectorDatabase
+from schemas.general_schemas import TextEmbedder, VectorDatabase
+from services.embedding_cache import EmbeddingCache
+from services.chunker import tokenizer_counter
+from services.index_store import is_memory_mapped, open_chunk_stores, read_index_dir, write_index_dir
+from services.lexical_index import BM25Index
+from services.metrics import timed
+from services.text_store import TextStore
+from services.vector_store import VectorStore
+from utils.utils import content_hash
+
+
+# Supported index types and whether they need training before vectors can be added.
+INDEX_TYPES = {
+    "flat": False,
+    "ivf_flat": True,
+    "ivf_pq": True,
+    "hnsw": False,
+    "sq8": True,
+    "fp16": False,
+    "binary": False,
+}
+
+# Index types storing compact codes whose first-pass scores are approximate.
+# Their exact vectors are kept in a memory-mapped VectorStore, and a shortlist
+# of rerank_factor times the requested results is re-scored with them.
+RERANKED_INDEX_TYPES = ("fp16", "binary")
+
+
+def build_faiss_index(
+    dim: int,
+    index_type: str = "flat",
+    nlist: int = 1024,
+    pq_m: int = 16,
+    pq_nbits: int = 8,
+    hnsw_m: int = 32,
+    hnsw_ef_construction: int = 200
+) -> faiss.Index:
+    """
+    Builds an empty inner-product FAISS index of the requested type.
+
+    Args:
+        dim: int - embedding dimension
+        index_type: str - one of "flat", "ivf_flat", "ivf_pq", "hnsw", "sq8",
+            "fp16" (half-precision vectors) or "binary" (sign bits of the
+            vectors, searched by Hamming distance)
+        nlist: int - number of IVF inverted lists
+        pq_m: int - number of PQ sub-quantizers (must divide dim)
+        pq_nbits: int - bits per PQ sub-quantizer code
+        hnsw_m: int - number of HNSW graph neighbours per node
+        hnsw_ef_construction: int - HNSW construction-time search depth
+
+    Returns:
+        faiss.Index using the inner product metric, except "binary", whose
+        search returns Hamming distances (lower is closer)
+    """
+    if index_type == "flat":
+        return faiss.IndexFlatIP(dim)
+    if index_type == "binary":
+        # One bit per dimension, no rotation and a threshold of 0: the code is the sign of each component
+        return faiss.IndexLSH(dim, dim, False, False)
+    if index_type == "ivf_flat":
+        description = f"IVF{nlist},Flat"
+    elif index_type == "ivf_pq":
+        description = f"IVF{nlist},PQ{pq_m}x{pq_nbits}"
+    elif index_type == "hnsw":
+        description = f"HNSW{hnsw_m},Flat"
+    elif index_type == "sq8":
+        description = "SQ8"
+    elif index_type == "fp16":
+        description = "SQfp16"
+    else:
+        raise ValueError(f"Unsupported index type: {index_type}")
+    index = faiss.index_factory(dim, description, faiss.METRIC_INNER_PRODUCT)
+    if index_type == "hnsw":
+        index.hnsw.efConstruction = hnsw_ef_construction
+    return index
+
+
+def set_search_params(index: faiss.Index, nprobe: Optional[int] = None, ef_search: Optional[int] = None) -> None:
+    """
+    Applies query-time parameters to an index, ignoring those that do not apply to its type.
+
+    Args:
+        index: faiss.Index - the index to tune
+        nprobe: Optional[int] - number of IVF lists to visit per query
+        ef_search: Optional[int] - HNSW search-time candidate list size
+    """
+    if nprobe is not None:
+        try:
+            faiss.extract_index_ivf(index).nprobe = nprobe
+        except RuntimeError:
+            pass
+    if ef_search is not None and hasattr(index, "hnsw"):
+        index.hnsw.efSearch = ef_search
+
+
+def search_params(index: faiss.Index, nprobe: Optional[int] = None, ef_search: Optional[int] = None) -> Optional[faiss.SearchParameters]:
+    """
+    Returns per-call search parameters for an index, or None when none apply.
+    Unlike `set_search_params` this does not modify the index, so concurrent
+    searches with different settings do not interfere.
+
+    Args:
+        index: faiss.Index - the index to be searched
+        nprobe: Optional[int] - number of IVF lists to visit per query
+        ef_search: Optional[int] - HNSW search-time candidate list size
+    """
+    if nprobe is not None:
+        try:
+            faiss.extract_index_ivf(index)
+            return faiss.SearchParametersIVF(nprobe=nprobe)
+        except RuntimeError:
+            pass
+    if ef_search is not None and hasattr(index, "hnsw"):
+        return faiss.SearchParametersHNSW(efSearch=ef_search)
+    return None
+
+
+@dataclass(frozen=True)
+class IndexSnapshot:
+    """
+    Consistent view of a FaissVectorDatabase that searches run against.
+
+    `base` is never modified once published. Vectors added since the last
+    merge live in the small exact `delta` index, which writers replace rather
+    than modify; its ids follow those of `base`. The text stores are
+    append-only, so the rows a snapshot can return never change. `lexical`
+    is the BM25 index over the same ids when hybrid search is enabled, and
+    `vectors` the exact vectors over the same ids when the base index stores
+    compact codes that search results are re-ranked from.
+    """
+    base: faiss.Index
+    delta: faiss.Index
+    texts: TextStore
+    metadatas: TextStore
+    base_mapped: bool = False
+    lexical: Optional[BM25Index] = None
+    vectors: Optional[VectorStore] = None
+
+    @property
+    def ntotal(self) -> int:
+        return self.base.ntotal + self.delta.ntotal
 
 
 class FaissVectorDatabase(VectorDatabase):
-    def __init__(self, model_name: str, logger: logging.Logger) -> None:
+    """
+    FAISS index plus chunk store, safe for concurrent searches and writes.
+
+    Searches run lock-free against the current `IndexSnapshot`. Writers are
+    serialized by a lock and never modify a published index: added vectors go
+    into a copy of the small delta index, which is merged into a copy of the
+    base index once it grows past `delta_max_vectors` (or `delta_growth` times
+    the base index, so the base is copied a logarithmic number of times as
+    it grows), and the new snapshot is
+    published with a single reference swap. A search therefore never blocks
+    on ingestion and always sees matching index and text rows.
+    """
+
+    def __init__(
+        self,
+        embedder: TextEmbedder,
+        logger: logging.Logger,
+        index_type: str = "flat",
+        nlist: int = 1024,
+        pq_m: int = 16,
+        pq_nbits: int = 8,
+        hnsw_m: int = 32,
+        hnsw_ef_construction: int = 200,
+        nprobe: int = 16,
+        ef_search: int = 64,
+        min_train_vectors: Optional[int] = None,
+        embedding_cache_dir: Optional[str] = None,
+        deduplicate: bool = True,
+        delta_max_vectors: int = 10000,
+        delta_growth: float = 0.05,
+        hybrid: bool = False,
+        bm25_k1: float = 1.2,
+        bm25_b: float = 0.75,
+        rrf_k: int = 60,
+        hybrid_candidate_factor: int = 3,
+        rerank_factor: int = 4
+    ) -> None:
         """
-        Initializes the manager with the given model name.
+        Initializes the manager with the given embedder.
 
         Args:
-            model_name: str
-                The name of the sentence transformer model to use.
+            embedder: TextEmbedder
+                Embeds chunks and queries, see `services.text_embedder`. It may
+                be shared between databases.
             logger: logging.Logger
                 The logger instance used for logging.
+            index_type: str
+                FAISS index type, one of "flat", "ivf_flat", "ivf_pq", "hnsw", "sq8",
+                "fp16", "binary". The last two keep exact vectors in a
+                memory-mapped file to re-rank their approximate results.
+            nlist, pq_m, pq_nbits, hnsw_m, hnsw_ef_construction: int
+                Build-time parameters, see `build_faiss_index`.
+            nprobe, ef_search: int
+                Default query-time parameters, see `set_search_params`.
+            min_train_vectors: Optional[int]
+                Number of vectors to collect before training an index type that
+                needs it. Defaults to 39 * nlist for IVF types and 1000 otherwise.
+                Until then vectors are kept in a flat index, so search always works.
+            embedding_cache_dir: Optional[str]
+                Directory of a persistent chunk embedding cache; only chunks not seen
+                before are run through the model. None disables the cache.
+            deduplicate: bool
+                Skip chunks whose normalized content is already in the index.
+            delta_max_vectors: int
+                Size of the exact write buffer searched alongside the base index.
+                Larger values copy the base index less often during ingestion
+                but make every search scan more vectors exhaustively.
+            delta_growth: float
+                The write buffer may also grow to this fraction of the base index
+                before a merge, which bounds the total merge copying of a large
+                ingestion to a constant multiple of its size.
+            hybrid: bool
+                Maintain a BM25 inverted index next to the vectors and fuse its
+                results with the dense results by reciprocal rank fusion.
+            bm25_k1, bm25_b: float
+                BM25 term frequency saturation and length normalization.
+            rrf_k: int
+                Reciprocal rank fusion constant: a hit at rank r scores 1 / (rrf_k + r) per retriever.
+            hybrid_candidate_factor: int
+                Each retriever contributes top_k * hybrid_candidate_factor candidates to the fusion.
+            rerank_factor: int
+                With exact vectors stored, the base index returns this many
+                times the needed candidates, which are re-scored exactly.
         """
-        self.model = SentenceTransformer(model_name)
-        self.dim = self.model.get_sentence_embedding_dimension()
-        # Use inner product index for efficient dot-product similarity
-        self.index = faiss.IndexFlatIP(self.dim)
+        if index_type not in INDEX_TYPES:
+            raise ValueError(f"Unsupported index type: {index_type}")
+        self.embedder = embedder
+        self.model_name = embedder.model_name
+        self.dim = embedder.dim
+        self.index_type = index_type
+        self.index_params = dict(
+            nlist=nlist,
+            pq_m=pq_m,
+            pq_nbits=pq_nbits,
+            hnsw_m=hnsw_m,
+            hnsw_ef_construction=hnsw_ef_construction
+        )
+        self.nprobe = nprobe
+        self.ef_search = ef_search
+        if min_train_vectors is None:
+            min_train_vectors = 39 * nlist if index_type.startswith("ivf") else 1000
+        self.min_train_vectors = min_train_vectors
+        self.delta_max_vectors = delta_max_vectors
+        self.delta_growth = delta_growth
+        self.hybrid = hybrid
+        self.bm25_k1 = bm25_k1
+        self.bm25_b = bm25_b
+        self.rrf_k = rrf_k
+        self.hybrid_candidate_factor = hybrid_candidate_factor
+        self.rerank_factor = rerank_factor
         self.logger = logger
-        # Store texts for mapping indices to original content
-        self.texts: List[str] = []
-        self.logger.info(f"Initialized FaissIndexManager with model '{model_name}' and dimension {self.dim}.")
+        self.embedding_cache = EmbeddingCache.shared(embedding_cache_dir, embedder.name, self.dim) if embedding_cache_dir else None
+        self.deduplicate = deduplicate
+        # Serializes writers; readers only ever read self._snapshot
+        self._write_lock = threading.Lock()
+        self._reset_hashes()
+        self._snapshot = self._empty_snapshot()
+        self.logger.info(f"Initialized FaissIndexManager with embedder '{embedder.name}', dimension {self.dim} and index type '{index_type}'.")
+
+    @property
+    def snapshot(self) -> IndexSnapshot:
+        """
+        The current published snapshot. It stays valid, and unchanged, while
+        later writes publish new ones.
+        """
+        return self._snapshot
+
+    @property
+    def ntotal(self) -> int:
+        """
+        Number of vectors in the current snapshot.
+        """
+        return self._snapshot.ntotal
 
+    @property
+    def texts(self) -> TextStore:
+        return self._snapshot.texts
+
+    @property
+    def metadatas(self) -> TextStore:
+        return self._snapshot.metadatas
+
+    def warm_up(self) -> None:
+        """
+        Loads the model and runs one embedding so the first request does not pay for it.
+        """
+        self.embed_texts(["warm up"])
+
+    def memory_bytes(self) -> int:
+        """
+        Estimates the resident memory of the index and the in-memory texts.
+        Memory-mapped data is not counted, since the OS can page it out.
+        """
+        snapshot = self._snapshot
+        index_bytes = snapshot.delta.ntotal * self.dim * 4
+        if not snapshot.base_mapped:
+            code_size = getattr(snapshot.base, "code_size", None) or self.dim * 4
+            index_bytes += snapshot.base.ntotal * code_size
+            if hasattr(snapshot.base, "hnsw"):
+                # Graph links: about 2 * M neighbours of 4 bytes per vector on the base level
+                index_bytes += snapshot.base.ntotal * 8 * self.index_params["hnsw_m"]
+        lexical_bytes = snapshot.lexical.memory_bytes() if snapshot.lexical is not None else 0
+        vector_bytes = snapshot.vectors.memory_bytes() if snapshot.vectors is not None else 0
+        return index_bytes + lexical_bytes + vector_bytes + snapshot.texts.memory_bytes() + snapshot.metadatas.memory_bytes()
+
+    def _reset_hashes(self) -> None:
+        """
+        Forgets the content hashes of the indexed texts.
+        """
+        # Content hashes of the indexed texts, used for deduplication: hashes
+        # loaded from disk (lazily turned into a set) plus hashes added since.
+        # Only writers touch these, under self._write_lock.
+        self._loaded_hashes: Optional[np.ndarray] = None
+        self._new_hashes: List[bytes] = []
+        self._hash_set: Optional[set] = set()
+
+    def _empty_snapshot(self) -> IndexSnapshot:
+        return IndexSnapshot(
+            base=self._new_index(),
+            delta=faiss.IndexFlatIP(self.dim),
+            # Store texts for mapping indices to original content
+            texts=TextStore(),
+            # Per-text metadata (e.g. source page numbers), aligned with texts
+            metadatas=TextStore.json(),
+            lexical=BM25Index.empty(self.bm25_k1, self.bm25_b) if self.hybrid else None,
+            vectors=VectorStore(self.dim) if self.index_type in RERANKED_INDEX_TYPES else None
+        )
+
+    @property
+    def _content_hashes(self) -> set:
+        if self._hash_set is None:
+            if self._loaded_hashes is not None:
+                self._hash_set = {row.tobytes() for row in self._loaded_hashes}
+            else:
+                self._hash_set = {content_hash(text) for text in self.texts}
+            self._hash_set.update(self._new_hashes)
+        return self._hash_set
+
+    def _hash_matrix(self) -> np.ndarray:
+        """
+        Returns the content hashes of all texts as a (n, 16) uint8 array, in index order.
+        """
+        parts = []
+        if self._loaded_hashes is not None:
+            parts.append(np.asarray(self._loaded_hashes))
+            n_known = len(self._loaded_hashes)
+        else:
+            n_known = 0
+        n_missing = len(self.texts) - len(self._new_hashes) - n_known
+        if n_missing > 0:
+            missing = [content_hash(self.texts[i]) for i in range(n_known, n_known + n_missing)]
+            parts.append(np.frombuffer(b"".join(missing), dtype=np.uint8).reshape(-1, 16))
+        if self._new_hashes:
+            parts.append(np.frombuffer(b"".join(self._new_hashes), dtype=np.uint8).reshape(-1, 16))
+        return np.concatenate(parts) if parts else np.empty((0, 16), dtype=np.uint8)
+
+    def _new_index(self) -> faiss.Index:
+        """
+        Returns an empty index to start filling. Index types that need training
+        start out as a flat index and are converted by `_merge_delta`.
+        """
+        if INDEX_TYPES[self.index_type]:
+            return faiss.IndexFlatIP(self.dim)
+        index = build_faiss_index(self.dim, self.index_type, **self.index_params)
+        set_search_params(index, self.nprobe, self.ef_search)
+        return index
+
+    def _is_trained(self, index: faiss.Index) -> bool:
+        return not INDEX_TYPES[self.index_type] or not isinstance(index, faiss.IndexFlat)
+
+    @property
+    def is_trained(self) -> bool:
+        """
+        Whether the configured index type is in use, i.e. any required training has happened.
+        """
+        return self._is_trained(self._snapshot.base)
+
+    def _merge_delta(self, snapshot: IndexSnapshot, force: bool = False) -> IndexSnapshot:
+        """
+        Returns a snapshot with the delta merged into a copy of the base index
+        once the delta is full (or `force` is set), training the configured
+        index type instead once enough vectors have been collected. Returns
+        `snapshot` itself when there is nothing to do.
+        """
+        train = not self._is_trained(snapshot.base) and snapshot.ntotal >= self.min_train_vectors
+        delta_full = snapshot.delta.ntotal >= max(self.delta_max_vectors, self.delta_growth * snapshot.base.ntotal)
+        if not train and not (delta_full or (force and snapshot.delta.ntotal)):
+            return snapshot
+        delta_vectors = snapshot.delta.reconstruct_n(0, snapshot.delta.ntotal)
+        if train:
+            vectors = np.concatenate([snapshot.base.reconstruct_n(0, snapshot.base.ntotal), delta_vectors])
+            base = build_faiss_index(self.dim, self.index_type, **self.index_params)
+            self.logger.info(f"Training '{self.index_type}' index on {len(vectors)} vectors.")
+            base.train(vectors)
+            base.add(vectors)
+        else:
+            # Copy on write: the published base may be in use by searches, or memory-mapped
+            base = faiss.deserialize_index(faiss.serialize_index(snapshot.base))
+            base.add(delta_vectors)
+        set_search_params(base, self.nprobe, self.ef_search)
+        return IndexSnapshot(
+            base=base,
+            delta=faiss.IndexFlatIP(self.dim),
+            texts=snapshot.texts,
+            metadatas=snapshot.metadatas,
+            lexical=snapshot.lexical.merged() if snapshot.lexical is not None else None,
+            vectors=snapshot.vectors
+        )
+
+    @timed("faiss.embed")
     def embed_texts(self, texts: List[str], normalize: bool = True) -> np.ndarray:
         """
         Embeds a list of texts into vectors.
@@ -40,38 +434,115 @@ class FaissVectorDatabase(VectorDatabase):
             np.ndarray of shape (len(texts), dim)
         """
         self.logger.debug(f"Embedding {len(texts)} texts.")
-        embeddings = self.model.encode(texts, convert_to_numpy=True)
+        embeddings = self.embedder.embed(texts)
         if normalize:
             faiss.normalize_L2(embeddings)
         return embeddings
 
-    def add_text(self, text: str) -> None:
+    def count_tokens(self, texts: List[str]) -> List[int]:
+        """
+        Counts the model's word-piece tokens of each text in one batched
+        tokenizer call, without special tokens. Loads the model if needed.
+
+        Args:
+            texts: List[str] - texts to count
+
+        Returns:
+            List of token counts, one per text
+        """
+        return tokenizer_counter(self.embedder.tokenizer)(texts)
+
+    def embed_chunks(self, texts: List[str]) -> np.ndarray:
+        """
+        Embeds document chunks, serving previously seen chunks from the
+        embedding cache and running the model only on new ones.
+
+        Args:
+            texts: List[str] - chunks to embed
+
+        Returns:
+            np.ndarray of shape (len(texts), dim), L2-normalized
+        """
+        if self.embedding_cache is None:
+            return self.embed_texts(texts)
+        keys = [content_hash(text) for text in texts]
+        vecs, missing = self.embedding_cache.get_many(keys)
+        if missing:
+            new_vecs = self.embed_texts([texts[i] for i in missing])
+            vecs[missing] = new_vecs
+            self.embedding_cache.put_many([keys[i] for i in missing], new_vecs)
+        self.logger.debug(f"Embedding cache served {len(texts) - len(missing)} of {len(texts)} chunks.")
+        return vecs
+
+    def add_text(self, text: str, metadata: Optional[Dict] = None) -> None:
         """
         Embeds and adds a single text to the FAISS index.
 
         Args:
             text: str - the text to add
+            metadata: Optional[Dict] - metadata stored alongside the text
         """
         self.logger.debug(f"Adding single text to index: {text}")
-        vec = self.embed_texts([text])
-        self.index.add(vec)
-        self.texts.append(text)
-        self.logger.info(f"Added text to index. Total size: {self.index.ntotal} vectors.")
+        self.add_texts([text], [metadata])
 
-    def add_texts(self, texts: List[str]) -> None:
+    @timed("faiss.add")
+    def add_texts(self, texts: List[str], metadatas: Optional[List[Optional[Dict]]] = None) -> None:
         """
-        Embeds and adds multiple texts to the FAISS index.
+        Embeds and adds multiple texts to the FAISS index. With deduplication
+        enabled, texts whose normalized content is already indexed (or repeated
+        within `texts`) are skipped. The texts become searchable all at once
+        when the call returns.
 
         Args:
             texts: List[str] - texts to add
+            metadatas: Optional[List[Optional[Dict]]] - metadata stored alongside each text
         """
-        self.logger.debug(f"Adding {len(texts)} texts to index.")
-        vecs = self.embed_texts(texts)
-        self.index.add(vecs)
-        self.texts.extend(texts)
-        self.logger.info(f"Added {len(texts)} texts. Total size: {self.index.ntotal} vectors.")
+        if metadatas is not None and len(metadatas) != len(texts):
+            raise ValueError("metadatas must have the same length as texts")
+        if metadatas is None:
+            metadatas = [None] * len(texts)
+        hashes = [content_hash(text) for text in texts]
+        with self._write_lock:
+            if self.deduplicate:
+                keep = []
+                seen = set()
+                for i, h in enumerate(hashes):
+                    if h not in self._content_hashes and h not in seen:
+                        seen.add(h)
+                        keep.append(i)
+                if len(keep) < len(texts):
+                    self.logger.debug(f"Skipping {len(texts) - len(keep)} duplicate texts.")
+                texts = [texts[i] for i in keep]
+                metadatas = [metadatas[i] for i in keep]
+                hashes = [hashes[i] for i in keep]
+            if not texts:
+                return
+
+            self.logger.debug(f"Adding {len(texts)} texts to index.")
+            vecs = self.embed_chunks(texts)
+            current = self._snapshot
+            delta = faiss.clone_index(current.delta)
+            delta.add(vecs)
+            lexical = current.lexical.add_documents(texts) if current.lexical is not None else None
+            snapshot = self._merge_delta(replace(current, delta=delta, lexical=lexical))
+            # Rows past current.ntotal are invisible to published snapshots until the swap below
+            current.texts.extend(texts)
+            current.metadatas.extend(metadatas)
+            if current.vectors is not None:
+                current.vectors.extend(vecs)
+            self._new_hashes.extend(hashes)
+            if self._hash_set is not None:
+                self._hash_set.update(hashes)
+            self._snapshot = snapshot
+        self.logger.info(f"Added {len(texts)} texts. Total size: {snapshot.ntotal} vectors.")
 
-    def search(self, query: str, top_k: int = 5) -> List[Tuple[str, float]]:
+    def search(
+        self,
+        query: str,
+        top_k: int = 5,
+        nprobe: Optional[int] = None,
+        ef_search: Optional[int] = None
+    ) -> List[Tuple[str, float]]:
         """
         Searches the FAISS index for the top_k nearest neighbors to the query,
         returning cosine similarity scores.
@@ -79,54 +550,288 @@ class FaissVectorDatabase(VectorDatabase):
         Args:
             query: str - the search query text
             top_k: int - number of nearest neighbors to return
+            nprobe: Optional[int] - IVF lists to visit for this query (default: self.nprobe)
+            ef_search: Optional[int] - HNSW search depth for this query (default: self.ef_search)
 
         Returns:
             List of tuples (text, similarity)
         """
         self.logger.debug(f"Searching for top {top_k} results for query: {query}")
         q_vec = self.embed_texts([query])
+        return self.search_by_vector(q_vec, top_k=top_k, nprobe=nprobe, ef_search=ef_search, query=query)
+
+    def search_by_vector(
+        self,
+        q_vec: np.ndarray,
+        top_k: int = 5,
+        nprobe: Optional[int] = None,
+        ef_search: Optional[int] = None,
+        query: Optional[str] = None
+    ) -> List[Tuple[str, float]]:
+        """
+        Searches the FAISS index with an already embedded query, so callers that
+        need the query embedding themselves do not have to embed it twice.
+
+        Args:
+            q_vec: np.ndarray - normalized query embedding of shape (1, dim)
+            top_k: int - number of nearest neighbors to return
+            nprobe: Optional[int] - IVF lists to visit for this query (default: self.nprobe)
+            ef_search: Optional[int] - HNSW search depth for this query (default: self.ef_search)
+            query: Optional[str] - the query text, needed for hybrid search
+
+        Returns:
+            List of tuples (text, similarity)
+        """
+        queries = [query] if query is not None else None
+        return self.search_batch_by_vectors(q_vec, top_k=top_k, nprobe=nprobe, ef_search=ef_search, queries=queries)[0]
+
+    @timed("faiss.search")
+    def search_batch_by_vectors(
+        self,
+        q_vecs: np.ndarray,
+        top_k: int = 5,
+        nprobe: Optional[int] = None,
+        ef_search: Optional[int] = None,
+        include_metadata: bool = False,
+        queries: Optional[Sequence[str]] = None
+    ) -> List[List[Tuple]]:
+        """
+        Searches the FAISS index for a matrix of embedded queries in a single call.
+
+        Args:
+            q_vecs: np.ndarray - normalized query embeddings of shape (n_queries, dim)
+            top_k: int - number of nearest neighbors to return per query
+            nprobe: Optional[int] - IVF lists to visit for these queries (default: self.nprobe)
+            ef_search: Optional[int] - HNSW search depth for these queries (default: self.ef_search)
+            include_metadata: bool - return (text, similarity, metadata) triples instead
+            queries: Optional[Sequence[str]] - the query texts; with hybrid search
+                enabled, their BM25 hits are fused with the dense hits
+
+        Returns:
+            One list of tuples (text, similarity) per query, in query order
+        """
+        snapshot = self._snapshot
+        hybrid = snapshot.lexical is not None and queries is not None
+        n_candidates = top_k * self.hybrid_candidate_factor if hybrid else top_k
+        rerank = snapshot.vectors is not None and snapshot.base.ntotal > 0
+        params = search_params(snapshot.base, nprobe, ef_search)
         # For IP index, higher is more similar
-        similarities, indices = self.index.search(q_vec, top_k)
+        similarities, indices = snapshot.base.search(
+            q_vecs, n_candidates * self.rerank_factor if rerank else n_candidates, params=params
+        )
+        if rerank:
+            similarities, indices = self._rerank(snapshot, q_vecs, indices, n_candidates)
+        if snapshot.delta.ntotal:
+            delta_sims, delta_ids = snapshot.delta.search(q_vecs, n_candidates)
+            delta_ids = np.where(delta_ids >= 0, delta_ids + snapshot.base.ntotal, -1)
+            similarities = np.concatenate([similarities, delta_sims], axis=1)
+            indices = np.concatenate([indices, delta_ids], axis=1)
+            # Missing results carry -FLT_MAX similarity, so they sort last
+            order = np.argsort(-similarities, axis=1, kind="stable")[:, :n_candidates]
+            similarities = np.take_along_axis(similarities, order, axis=1)
+            indices = np.take_along_axis(indices, order, axis=1)
+        if hybrid:
+            fused = [
+                self._fuse(snapshot, q_vec, query, row_sims, row_indices, top_k, n_candidates)
+                for q_vec, query, row_sims, row_indices in zip(q_vecs, queries, similarities, indices)
+            ]
+            similarities = [[sim for _, sim in row] for row in fused]
+            indices = [[idx for idx, _ in row] for row in fused]
+
+        batch_results: List[List[Tuple]] = []
+        for row_sims, row_indices in zip(similarities, indices):
+            results: List[Tuple] = []
+            for sim, idx in zip(row_sims, row_indices):
+                if idx < snapshot.ntotal and idx >= 0:
+                    if include_metadata:
+                        results.append((snapshot.texts[idx], float(sim), snapshot.metadatas[idx]))
+                    else:
+                        results.append((snapshot.texts[idx], float(sim)))
+            batch_results.append(results)
+        self.logger.info(f"Search of {len(batch_results)} queries returned {sum(len(r) for r in batch_results)} results.")
+        return batch_results
+
+    @timed("faiss.rerank")
+    def _rerank(
+        self,
+        snapshot: IndexSnapshot,
+        q_vecs: np.ndarray,
+        indices: np.ndarray,
+        n_candidates: int
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Re-scores the base index's shortlist with the exact vectors and keeps
+        the best `n_candidates` per query.
 
-        results: List[Tuple[str, float]] = []
-        for sim, idx in zip(similarities[0], indices[0]):
-            if idx < len(self.texts) and idx >= 0:
-                results.append((self.texts[idx], float(sim)))
-        self.logger.info(f"Search returned {len(results)} results.")
-        return results
+        Returns:
+            (similarities, indices) arrays of shape (n_queries, n_candidates)
+        """
+        valid = indices >= 0
+        vectors = snapshot.vectors.take(np.where(valid, indices, 0).ravel()).reshape(*indices.shape, self.dim)
+        similarities = np.einsum("qkd,qd->qk", vectors, q_vecs)
+        similarities[~valid] = -np.finfo(np.float32).max
+        order = np.argsort(-similarities, axis=1, kind="stable")[:, :n_candidates]
+        return np.take_along_axis(similarities, order, axis=1), np.take_along_axis(indices, order, axis=1)
+
+    def _fuse(
+        self,
+        snapshot: IndexSnapshot,
+        q_vec: np.ndarray,
+        query: str,
+        row_sims: np.ndarray,
+        row_indices: np.ndarray,
+        top_k: int,
+        n_candidates: int
+    ) -> List[Tuple[int, float]]:
+        """
+        Fuses one query's dense and BM25 candidates by reciprocal rank fusion.
+
+        Returns:
+            Up to top_k (id, cosine similarity) pairs in fused order
+        """
+        dense = [(int(idx), float(sim)) for sim, idx in zip(row_sims, row_indices) if 0 <= idx < snapshot.ntotal]
+        lexical = snapshot.lexical.search(query, n_candidates)
+        scores: Dict[int, float] = {}
+        for ranking in (dense, lexical):
+            for rank, (idx, _) in enumerate(ranking, 1):
+                scores[idx] = scores.get(idx, 0.0) + 1.0 / (self.rrf_k + rank)
+        ranked = sorted(scores, key=lambda idx: -scores[idx])[:top_k]
+        dense_sims = dict(dense)
+        missing = [idx for idx in ranked if idx not in dense_sims]
+        if missing:
+            # Lexical-only hits still report a cosine similarity, which the
+            # context builder and the fast path threshold on
+            dense_sims.update(zip(missing, self._similarities(snapshot, q_vec, missing, dense)))
+        return [(idx, dense_sims[idx]) for idx in ranked]
+
+    def _similarities(
+        self,
+        snapshot: IndexSnapshot,
+        q_vec: np.ndarray,
+        ids: List[int],
+        dense: List[Tuple[int, float]]
+    ) -> List[float]:
+        """
+        Cosine similarities of the query to stored vectors `ids`. Indexes that
+        cannot reconstruct vectors (e.g. IVF without a direct map) and keep no
+        exact vectors get the lowest dense similarity instead.
+        """
+        if snapshot.vectors is not None:
+            return [float(sim) for sim in snapshot.vectors.take(ids) @ q_vec]
+        base_ntotal = snapshot.base.ntotal
+        try:
+            vectors = np.stack([
+                snapshot.base.reconstruct(idx) if idx < base_ntotal else snapshot.delta.reconstruct(idx - base_ntotal)
+                for idx in ids
+            ])
+        except RuntimeError:
+            floor = min((sim for _, sim in dense), default=0.0)
+            return [floor] * len(ids)
+        return [float(sim) for sim in vectors @ q_vec]
 
     def clear_index(self) -> None:
         """
         Clears the FAISS index and stored texts.
         """
-        self.index = faiss.IndexFlatIP(self.dim)
-        self.texts = []
+        with self._write_lock:
+            self._reset_hashes()
+            self._snapshot = self._empty_snapshot()
         self.logger.info("Cleared FAISS index and text store.")
 
-    def save_index(self, index_path: str, metadata_path: str) -> None:
+    @timed("faiss.save")
+    def save_index(self, index_path: str) -> None:
         """
-        Saves the FAISS index and associated text metadata.
+        Saves the FAISS index, texts and metadata as a new generation of the
+        index directory `index_path`. The switch to the new generation is an
+        atomic rename, so a crash mid-save leaves the previous save intact.
+        Pending delta vectors are merged into the base index first. Afterwards
+        the texts, metadata and exact vectors are served from the saved files,
+        so the rows added since the last load leave the heap.
 
         Args:
-            index_path: str - file path to save the FAISS index
-            metadata_path: str - file path to save the texts metadata
+            index_path: str - directory to save the index into
         """
-        self.logger.debug(f"Saving FAISS index to {index_path} and metadata to {metadata_path}.")
-        faiss.write_index(self.index, index_path)
-        with open(index_path, 'wb') as f:
-            pickle.dump(self.texts, f)
-        self.logger.info("Index and metadata saved successfully.")
+        self.logger.debug(f"Saving FAISS index and texts to {index_path}.")
+        with self._write_lock:
+            snapshot = self._merge_delta(self._snapshot, force=True)
+            self._snapshot = snapshot
+            gen_path = write_index_dir(
+                index_path,
+                snapshot.base,
+                snapshot.texts,
+                snapshot.metadatas,
+                self._hash_matrix(),
+                manifest={"model_name": self.model_name, "embedder": self.embedder.name, "dim": self.dim, "index_type": self.index_type},
+                lexical=snapshot.lexical,
+                vectors=snapshot.vectors
+            )
+            texts, metadatas, vectors = open_chunk_stores(gen_path, self.dim)
+            self._snapshot = replace(snapshot, texts=texts, metadatas=metadatas, vectors=vectors)
+        self.logger.info(f"Index and texts saved to {gen_path}.")
 
-    def load_index(self, index_path: str, metadata_path: str) -> None:
+    @timed("faiss.load")
+    def load_index(self, index_path: str, metadata_path: Optional[str] = None, mmap: bool = True, verify_checksums: bool = False) -> None:
         """
-        Loads the FAISS index and associated text metadata.
+        Loads an index directory written by `save_index`. The index is
+        memory-mapped where FAISS supports it and the texts always are, so load
+        time does not grow with the index size. The loaded index replaces the
+        current one atomically; searches in flight finish on the old one.
+
+        A plain FAISS index file plus a pickled list of texts (`metadata_path`)
+        is still accepted for indexes saved by older versions. With hybrid
+        search enabled, the BM25 index is built from the texts if none was saved.
 
         Args:
-            index_path: str - file path to load the FAISS index from
-            metadata_path: str - file path to load the texts metadata from
-        """
-        self.logger.debug(f"Loading FAISS index from {index_path} and metadata from {metadata_path}.")
-        self.index = faiss.read_index(index_path)
-        with open(metadata_path, 'rb') as f:
-            self.texts = pickle.load(f)
-        self.logger.info(f"Index and metadata loaded. Total vectors: {self.index.ntotal}.")
\ No newline at end of file
+            index_path: str - index directory (or legacy FAISS index file) to load
+            metadata_path: Optional[str] - legacy pickled texts file
+            mmap: bool - memory-map the FAISS index
+            verify_checksums: bool - verify the SHA-256 checksums in the manifest
+        """
+        self.logger.debug(f"Loading FAISS index from {index_path}.")
+        hashes = None
+        if os.path.isfile(index_path):
+            index = faiss.read_index(index_path)
+            texts = []
+            if metadata_path is not None:
+                with open(metadata_path, 'rb') as f:
+                    texts = pickle.load(f)
+            if index.d != self.dim:
+                raise ValueError(f"Index dimension {index.d} does not match model dimension {self.dim}")
+            snapshot = IndexSnapshot(
+                base=index,
+                delta=faiss.IndexFlatIP(self.dim),
+                texts=TextStore(texts),
+                metadatas=TextStore.json([None] * len(texts))
+            )
+        else:
+            index, texts, metadatas, hashes, lexical, vectors, manifest = read_index_dir(
+                index_path, mmap=mmap, verify_checksums=verify_checksums, bm25_k1=self.bm25_k1, bm25_b=self.bm25_b
+            )
+            if manifest.get("dim") != self.dim or manifest.get("model_name") != self.model_name:
+                raise ValueError(
+                    f"Index was built with model '{manifest.get('model_name')}' (dim {manifest.get('dim')}), "
+                    f"not '{self.model_name}' (dim {self.dim})"
+                )
+            snapshot = IndexSnapshot(
+                base=index,
+                delta=faiss.IndexFlatIP(self.dim),
+                texts=texts,
+                metadatas=metadatas,
+                base_mapped=is_memory_mapped(index),
+                lexical=lexical,
+                vectors=vectors
+            )
+            if vectors is None and isinstance(index, faiss.IndexLSH):
+                raise ValueError(f"Binary index at {index_path} was saved without the exact vectors needed to re-rank")
+        if not self.hybrid:
+            snapshot = replace(snapshot, lexical=None)
+        elif snapshot.lexical is None:
+            self.logger.info("Index has no BM25 index; building it from the texts.")
+            snapshot = replace(snapshot, lexical=BM25Index.build(snapshot.texts, k1=self.bm25_k1, b=self.bm25_b))
+        set_search_params(snapshot.base, self.nprobe, self.ef_search)
+        with self._write_lock:
+            self._reset_hashes()
+            self._loaded_hashes = hashes
+            self._hash_set = None
+            self._snapshot = snapshot
+        self.logger.info(f"Index and metadata loaded. Total vectors: {snapshot.ntotal}.")
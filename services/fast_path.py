@@ -0,0 +1,127 @@
+import json
+import threading
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from services.chunker import SENTENCE_END_PATTERN, StructuredChunker
+
+
+class RetrievalFastPath:
+    """
+    Answers questions straight from the index when the best search hit is a
+    near-exact match for a stored FAQ, skipping the LLM call.
+
+    When the closest hit's cosine similarity reaches `similarity_threshold`, the
+    Q/A pairs in its text are extracted. A chunk holding one pair answers
+    directly; with several pairs (e.g. character-window chunks) the stored
+    questions are embedded and the closest one must also reach the threshold.
+    Answers that look cut off by a chunk boundary fall back to the LLM.
+    """
+
+    def __init__(
+        self,
+        embed_texts: Callable[[List[str]], np.ndarray],
+        similarity_threshold: float = 0.85,
+        chunker: Optional[StructuredChunker] = None
+    ) -> None:
+        """
+        Args:
+            embed_texts: Callable[[List[str]], np.ndarray]
+                Embeds texts into L2-normalized vectors, e.g. `FaissVectorDatabase.embed_texts`.
+            similarity_threshold: float
+                Minimum cosine similarity between the question and the stored match.
+            chunker: Optional[StructuredChunker]
+                Chunker whose Q/A detection is used to parse hits. Defaults to a new one.
+        """
+        self.embed_texts = embed_texts
+        self.similarity_threshold = similarity_threshold
+        self.chunker = chunker or StructuredChunker()
+        self._stats_lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+
+    def _match(self, q_vec: np.ndarray, searches: Sequence[Tuple]) -> Optional[Dict]:
+        if not searches:
+            return None
+        # With hybrid search the first hit is the best fused one, not necessarily the closest
+        text, similarity = max(searches, key=lambda hit: hit[1])[:2]
+        similarity = float(similarity)
+        if similarity < self.similarity_threshold:
+            return None
+        pairs = [
+            (question, answer) for question, answer in self.chunker.iter_qa_pairs([(None, text)])
+            if answer and SENTENCE_END_PATTERN.search(answer)
+        ]
+        if not pairs:
+            return None
+        if len(pairs) > 1:
+            similarities = self.embed_texts([question for question, _ in pairs]) @ q_vec[0]
+            best = int(np.argmax(similarities))
+            similarity = float(similarities[best])
+            if similarity < self.similarity_threshold:
+                return None
+            pairs = [pairs[best]]
+        question, answer = pairs[0]
+        return {"question": question, "answer": answer, "score": round(similarity, 2)}
+
+    def answer(self, q_vec: np.ndarray, searches: Sequence[Tuple]) -> Optional[Dict]:
+        """
+        Returns the stored Q&A object answering the question, or None to fall back to the LLM.
+
+        Args:
+            q_vec: np.ndarray - normalized query embedding of shape (1, dim)
+            searches: Sequence[Tuple] - (text, similarity) hits
+
+        Returns:
+            {"question", "answer", "score"} or None
+        """
+        match = self._match(q_vec, searches)
+        with self._stats_lock:
+            if match is None:
+                self._misses += 1
+            else:
+                self._hits += 1
+        return match
+
+    def fallback(self, question: str, searches: Sequence[Tuple], n_answers: int) -> List[Dict]:
+        """
+        Builds retrieval-only answers for when the LLM is unavailable: the Q/A
+        pairs of the closest hits, or the hit text itself when it holds none.
+
+        Args:
+            question: str - the user question
+            searches: Sequence[Tuple] - (text, similarity) hits
+            n_answers: int - maximum number of answers
+
+        Returns:
+            List of {"question", "answer", "score"} dicts, closest first
+        """
+        answers = []
+        for hit in sorted(searches, key=lambda hit: -hit[1]):
+            pairs = [pair for pair in self.chunker.iter_qa_pairs([(None, hit[0])]) if pair[1]]
+            for stored_question, answer in pairs or [(question, hit[0].strip())]:
+                answers.append({"question": stored_question, "answer": answer, "score": round(float(hit[1]), 2)})
+            if len(answers) >= n_answers:
+                break
+        return answers[:n_answers]
+
+    @staticmethod
+    def to_json(match) -> str:
+        """
+        Formats a match, or a list of them, like the cleaned LLM output: a JSON list of Q&A objects.
+        """
+        return json.dumps(match if isinstance(match, list) else [match], ensure_ascii=False)
+
+    def stats(self) -> Dict[str, object]:
+        """
+        Returns how many questions were answered without the LLM since startup.
+        """
+        with self._stats_lock:
+            total = self._hits + self._misses
+            return {
+                "hits": self._hits,
+                "misses": self._misses,
+                "hit_rate": self._hits / total if total else 0.0,
+                "similarity_threshold": self.similarity_threshold,
+            }
@@ -0,0 +1,226 @@
+import hashlib
+import json
+import os
+import shutil
+import time
+import uuid
+from typing import Dict, Optional, Tuple
+
+import faiss
+import numpy as np
+
+from services.lexical_index import BM25Index
+from services.text_store import TextStore
+from services.vector_store import VectorStore
+
+
+FORMAT_VERSION = 1
+CURRENT_FILE = "CURRENT"
+INDEX_FILE = "index.faiss"
+TEXTS_NAME = "texts"
+METADATAS_NAME = "metadatas"
+HASHES_FILE = "hashes.bin"
+LEXICAL_NAME = "lexical"
+VECTORS_NAME = "vectors"
+MANIFEST_FILE = "manifest.json"
+
+# On-disk layout of a saved index directory:
+#
+#   <path>/CURRENT              name of the live generation
+#   <path>/gen-<id>/index.faiss FAISS index
+#   <path>/gen-<id>/texts.bin   UTF-8 chunk texts, texts.idx holds uint64 offsets
+#   <path>/gen-<id>/metadatas.* JSON chunk metadata, same layout as texts
+#   <path>/gen-<id>/hashes.bin  16-byte content hash per chunk
+#   <path>/gen-<id>/lexical.*   optional BM25 postings (.npy arrays) and vocabulary
+#   <path>/gen-<id>/vectors.f32 optional exact float32 vectors, kept for indexes
+#                               storing compact codes, to re-rank with
+#   <path>/gen-<id>/manifest.json
+#
+# A save writes a complete new generation, then atomically replaces CURRENT
+# via rename, so readers see either the old or the new generation, never a mix.
+
+
+def _sha256(path: str, block_size: int = 1 << 20) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(block_size), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def _fsync_dir(path: str) -> None:
+    try:
+        fd = os.open(path, os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(fd)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
+
+
+def write_index_dir(
+    path: str,
+    index: faiss.Index,
+    texts: TextStore,
+    metadatas: TextStore,
+    hashes: np.ndarray,
+    manifest: Dict,
+    lexical: Optional[BM25Index] = None,
+    vectors: Optional[VectorStore] = None
+) -> str:
+    """
+    Saves an index and its chunk store as a new generation under `path`.
+
+    Args:
+        path: str - index directory
+        index: faiss.Index - the index to save
+        texts: TextStore - chunk texts aligned with the index ids
+        metadatas: TextStore - chunk metadata aligned with the index ids
+        hashes: np.ndarray - uint8 array of shape (n, 16) with chunk content hashes
+        manifest: Dict - extra manifest fields, e.g. model name and dimension
+        lexical: Optional[BM25Index] - BM25 index aligned with the index ids
+        vectors: Optional[VectorStore] - exact vectors aligned with the index ids
+
+    Returns:
+        The path of the written generation directory
+    """
+    os.makedirs(path, exist_ok=True)
+    generation = f"gen-{int(time.time() * 1000)}-{uuid.uuid4().hex[:8]}"
+    gen_path = os.path.join(path, generation)
+    os.makedirs(gen_path)
+    try:
+        faiss.write_index(index, os.path.join(gen_path, INDEX_FILE))
+        texts.write(os.path.join(gen_path, TEXTS_NAME))
+        metadatas.write(os.path.join(gen_path, METADATAS_NAME))
+        with open(os.path.join(gen_path, HASHES_FILE), "wb") as f:
+            f.write(np.ascontiguousarray(hashes, dtype=np.uint8).tobytes())
+            f.flush()
+            os.fsync(f.fileno())
+        if lexical is not None:
+            lexical.write(os.path.join(gen_path, LEXICAL_NAME))
+        if vectors is not None:
+            vectors.write(os.path.join(gen_path, VECTORS_NAME))
+
+        files = {}
+        for name in sorted(os.listdir(gen_path)):
+            file_path = os.path.join(gen_path, name)
+            files[name] = {"size": os.path.getsize(file_path), "sha256": _sha256(file_path)}
+        full_manifest = dict(manifest, format_version=FORMAT_VERSION, ntotal=int(index.ntotal), files=files)
+        with open(os.path.join(gen_path, MANIFEST_FILE), "w", encoding="utf-8") as f:
+            json.dump(full_manifest, f, indent=2)
+            f.flush()
+            os.fsync(f.fileno())
+        _fsync_dir(gen_path)
+
+        current_tmp = os.path.join(path, f"{CURRENT_FILE}.{uuid.uuid4().hex[:8]}.tmp")
+        with open(current_tmp, "w", encoding="utf-8") as f:
+            f.write(generation)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(current_tmp, os.path.join(path, CURRENT_FILE))
+        _fsync_dir(path)
+    except Exception:
+        shutil.rmtree(gen_path, ignore_errors=True)
+        raise
+
+    # Older generations are no longer reachable; processes that still have them
+    # memory-mapped keep their pages until they unmap.
+    for name in os.listdir(path):
+        if name.startswith("gen-") and name != generation:
+            shutil.rmtree(os.path.join(path, name), ignore_errors=True)
+    return gen_path
+
+
+def current_generation(path: str) -> str:
+    """
+    Returns the directory of the live generation of a saved index.
+    """
+    with open(os.path.join(path, CURRENT_FILE), "r", encoding="utf-8") as f:
+        return os.path.join(path, f.read().strip())
+
+
+def open_chunk_stores(gen_path: str, dim: int) -> Tuple[TextStore, TextStore, Optional[VectorStore]]:
+    """
+    Memory-maps the texts, metadata and (if saved) exact vectors of a generation directory.
+
+    Args:
+        gen_path: str - generation directory, see `current_generation`
+        dim: int - embedding dimension
+
+    Returns:
+        Tuple of (texts, metadatas, vectors or None)
+    """
+    texts = TextStore.open(os.path.join(gen_path, TEXTS_NAME))
+    metadatas = TextStore.open_json(os.path.join(gen_path, METADATAS_NAME))
+    vectors_path = os.path.join(gen_path, VECTORS_NAME)
+    vectors = VectorStore.open(vectors_path, dim) if VectorStore.exists(vectors_path) else None
+    return texts, metadatas, vectors
+
+
+def is_memory_mapped(index: faiss.Index) -> bool:
+    """
+    Returns whether an index's data is served from a memory-mapped file. Only
+    IVF inverted lists are mapped by `faiss.IO_FLAG_MMAP`; other index types
+    are read fully into RAM even when the flag is given.
+    """
+    ivf = faiss.try_extract_index_ivf(index)
+    return ivf is not None and isinstance(faiss.downcast_InvertedLists(ivf.invlists), faiss.OnDiskInvertedLists)
+
+
+def read_index_dir(
+    path: str,
+    mmap: bool = True,
+    verify_checksums: bool = False,
+    bm25_k1: float = 1.2,
+    bm25_b: float = 0.75
+) -> Tuple[faiss.Index, TextStore, TextStore, Optional[np.ndarray], Optional[BM25Index], Optional[VectorStore], Dict]:
+    """
+    Opens the live generation of a saved index directory.
+
+    Args:
+        path: str - index directory written by `write_index_dir`
+        mmap: bool - memory-map the FAISS index (faiss.IO_FLAG_MMAP) where the index type supports it
+        verify_checksums: bool - verify the SHA-256 of every file (reads all data; sizes are always checked)
+        bm25_k1, bm25_b: float - BM25 parameters of the loaded lexical index
+
+    Returns:
+        Tuple of (index, texts, metadatas, memory-mapped hashes or None, BM25 index or None,
+        memory-mapped exact vectors or None, manifest)
+    """
+    gen_path = current_generation(path)
+    with open(os.path.join(gen_path, MANIFEST_FILE), "r", encoding="utf-8") as f:
+        manifest = json.load(f)
+    if manifest.get("format_version") != FORMAT_VERSION:
+        raise ValueError(f"Unsupported index format version: {manifest.get('format_version')}")
+    for name, info in manifest["files"].items():
+        file_path = os.path.join(gen_path, name)
+        if os.path.getsize(file_path) != info["size"]:
+            raise ValueError(f"Size mismatch for {file_path}")
+        if verify_checksums and _sha256(file_path) != info["sha256"]:
+            raise ValueError(f"Checksum mismatch for {file_path}")
+
+    index_path = os.path.join(gen_path, INDEX_FILE)
+    index = None
+    if mmap:
+        try:
+            index = faiss.read_index(index_path, faiss.IO_FLAG_MMAP)
+        except RuntimeError:
+            index = None
+    if index is None:
+        index = faiss.read_index(index_path)
+
+    texts, metadatas, vectors = open_chunk_stores(gen_path, index.d)
+    hashes_path = os.path.join(gen_path, HASHES_FILE)
+    hashes = np.memmap(hashes_path, dtype=np.uint8, mode="r").reshape(-1, 16) if os.path.getsize(hashes_path) else None
+    if len(texts) != index.ntotal or len(metadatas) != index.ntotal:
+        raise ValueError(f"Index at {gen_path} has {index.ntotal} vectors but {len(texts)} texts")
+    lexical_path = os.path.join(gen_path, LEXICAL_NAME)
+    lexical = BM25Index.open(lexical_path, mmap=mmap, k1=bm25_k1, b=bm25_b) if BM25Index.exists(lexical_path) else None
+    if lexical is not None and lexical.n_docs != index.ntotal:
+        raise ValueError(f"Index at {gen_path} has {index.ntotal} vectors but {lexical.n_docs} lexical documents")
+    if vectors is not None and len(vectors) != index.ntotal:
+        raise ValueError(f"Index at {gen_path} has {index.ntotal} vectors but {len(vectors)} exact vectors")
+    return index, texts, metadatas, hashes, lexical, vectors, manifest
@@ -0,0 +1,105 @@
+import logging
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field, asdict
+from typing import Callable, Dict, List, Optional
+
+
+@dataclass
+class IngestionJob:
+    """
+    Status record of a background document ingestion.
+    """
+    job_id: str
+    file_path: str
+    status: str = "queued"  # queued -> running -> done | failed
+    chunks_added: int = 0
+    error: Optional[str] = None
+    created_at: float = field(default_factory=time.time)
+    started_at: Optional[float] = None
+    finished_at: Optional[float] = None
+
+    def to_dict(self) -> Dict:
+        return asdict(self)
+
+
+class IngestionJobManager:
+    """
+    Runs document ingestions in the background and tracks their progress.
+
+    Jobs run one at a time on a dedicated worker so concurrent uploads do not
+    interleave writes to the same index; HTTP handlers return as soon as the
+    job is queued.
+    """
+
+    def __init__(self, logger: logging.Logger, max_jobs_kept: int = 1000) -> None:
+        """
+        Args:
+            logger: logging.Logger
+                The logger instance used for logging.
+            max_jobs_kept: int
+                Number of finished jobs whose status is remembered.
+        """
+        self.logger = logger
+        self.max_jobs_kept = max_jobs_kept
+        self._jobs: Dict[str, IngestionJob] = {}
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="ingestion")
+
+    def submit(self, file_path: str, ingest: Callable[[str, Callable[[int], None]], None]) -> IngestionJob:
+        """
+        Queues an ingestion job.
+
+        Args:
+            file_path: str - the file to ingest
+            ingest: Callable - called as ingest(file_path, progress) on the worker,
+                where progress(n_chunks_added) reports the running chunk count
+
+        Returns:
+            The queued IngestionJob
+        """
+        job = IngestionJob(job_id=uuid.uuid4().hex, file_path=file_path)
+        with self._lock:
+            self._jobs[job.job_id] = job
+            self._prune()
+        self._executor.submit(self._run, job, ingest)
+        return job
+
+    def _run(self, job: IngestionJob, ingest: Callable[[str, Callable[[int], None]], None]) -> None:
+        job.status = "running"
+        job.started_at = time.time()
+
+        def progress(chunks_added: int) -> None:
+            job.chunks_added = chunks_added
+
+        try:
+            ingest(job.file_path, progress)
+            job.status = "done"
+        except Exception as e:
+            self.logger.error(f"Ingestion job {job.job_id} for {job.file_path} failed: {e}")
+            job.error = str(e)
+            job.status = "failed"
+        finally:
+            job.finished_at = time.time()
+
+    def _prune(self) -> None:
+        finished = [j for j in self._jobs.values() if j.status in ("done", "failed")]
+        excess = len(finished) - self.max_jobs_kept
+        for job in sorted(finished, key=lambda j: j.created_at)[:max(excess, 0)]:
+            del self._jobs[job.job_id]
+
+    def get(self, job_id: str) -> Optional[IngestionJob]:
+        """
+        Returns the job with the given id, or None if unknown.
+        """
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def list(self) -> List[IngestionJob]:
+        """
+        Returns all remembered jobs, oldest first.
+        """
+        with self._lock:
+            return sorted(self._jobs.values(), key=lambda j: j.created_at)
@@ -0,0 +1,259 @@
+import math
+import os
+import re
+from collections import Counter
+from dataclasses import dataclass, field, replace
+from typing import Dict, Iterable, List, Tuple
+
+import numpy as np
+
+from services.text_store import TextStore
+
+
+# Words, numbers and identifiers such as order numbers or SKUs ("B07-XJ8", "123-4567890")
+TOKEN_PATTERN = re.compile(r"[^\W_]+(?:[-_./][^\W_]+)*")
+
+LEXICAL_ARRAYS = ("offsets", "doc_ids", "term_freqs", "doc_lengths")
+
+
+def _load_array(path: str, mmap: bool) -> np.ndarray:
+    if mmap:
+        try:
+            return np.load(path, mmap_mode="r")
+        except ValueError:
+            # Empty arrays cannot be memory-mapped
+            pass
+    return np.load(path)
+
+
+def tokenize(text: str) -> List[str]:
+    """
+    Lower-cases and splits text into lexical terms. Compound identifiers are
+    kept whole and their parts are added as well, so "B07-XJ8" matches both
+    "b07-xj8" and "xj8".
+    """
+    terms = []
+    for match in TOKEN_PATTERN.finditer(text.lower()):
+        term = match.group()
+        terms.append(term)
+        if not term.isalnum():
+            terms.extend(part for part in re.split(r"[-_./]", term) if part)
+    return terms
+
+
+@dataclass(frozen=True)
+class BM25Index:
+    """
+    Immutable BM25 inverted index that grows by copy-on-write, like `IndexSnapshot`.
+
+    Postings of the base part are stored in CSR form: for term id t, documents
+    `doc_ids[offsets[t]:offsets[t + 1]]` with frequencies `term_freqs[...]`,
+    as uint32/uint16 arrays that can be memory-mapped from disk. Documents
+    added since the last merge are kept in a small `delta` of per-term
+    posting tuples. The vocabulary is shared and append-only, so a term id
+    beyond this index's own terms simply has no postings here.
+    """
+    vocabulary: Dict[str, int]
+    offsets: np.ndarray
+    doc_ids: np.ndarray
+    term_freqs: np.ndarray
+    doc_lengths: np.ndarray
+    delta: Dict[int, Tuple[Tuple[int, int], ...]] = field(default_factory=dict)
+    delta_lengths: Tuple[int, ...] = ()
+    total_length: int = 0
+    k1: float = 1.2
+    b: float = 0.75
+
+    @classmethod
+    def empty(cls, k1: float = 1.2, b: float = 0.75) -> "BM25Index":
+        return cls(
+            vocabulary={},
+            offsets=np.zeros(1, dtype=np.int64),
+            doc_ids=np.empty(0, dtype=np.uint32),
+            term_freqs=np.empty(0, dtype=np.uint16),
+            doc_lengths=np.empty(0, dtype=np.uint32),
+            k1=k1,
+            b=b
+        )
+
+    @classmethod
+    def build(cls, texts: Iterable[str], k1: float = 1.2, b: float = 0.75, batch_size: int = 10000) -> "BM25Index":
+        """
+        Builds an index over `texts`, e.g. when loading an index saved without one.
+        """
+        index = cls.empty(k1, b)
+        batch = []
+        for text in texts:
+            batch.append(text)
+            if len(batch) >= batch_size:
+                index = index.add_documents(batch).merged()
+                batch = []
+        return index.add_documents(batch).merged() if batch else index
+
+    @property
+    def n_docs(self) -> int:
+        return len(self.doc_lengths) + len(self.delta_lengths)
+
+    @property
+    def n_delta_docs(self) -> int:
+        return len(self.delta_lengths)
+
+    def memory_bytes(self) -> int:
+        """
+        Approximate heap size of the postings; memory-mapped arrays are not counted.
+        """
+        arrays = [getattr(self, name) for name in LEXICAL_ARRAYS]
+        in_memory = sum(array.nbytes for array in arrays if not isinstance(array, np.memmap))
+        delta = sum(len(postings) for postings in self.delta.values()) * 16
+        return in_memory + delta
+
+    def add_documents(self, texts: List[str]) -> "BM25Index":
+        """
+        Returns a new index with `texts` appended as the next document ids. Only
+        the delta entries of the terms that occur in `texts` are copied.
+        """
+        delta = dict(self.delta)
+        new_postings: Dict[int, List[Tuple[int, int]]] = {}
+        lengths = []
+        doc_id = self.n_docs
+        for text in texts:
+            terms = tokenize(text)
+            lengths.append(len(terms))
+            for term, tf in Counter(terms).items():
+                term_id = self.vocabulary.setdefault(term, len(self.vocabulary))
+                new_postings.setdefault(term_id, []).append((doc_id, min(tf, 65535)))
+            doc_id += 1
+        for term_id, postings in new_postings.items():
+            delta[term_id] = delta.get(term_id, ()) + tuple(postings)
+        return replace(
+            self,
+            delta=delta,
+            delta_lengths=self.delta_lengths + tuple(lengths),
+            total_length=self.total_length + sum(lengths)
+        )
+
+    def merged(self) -> "BM25Index":
+        """
+        Returns a new index with the delta merged into freshly built base arrays.
+        """
+        if not self.delta_lengths:
+            return self
+        n_terms = len(self.vocabulary)
+        base_terms = np.repeat(np.arange(len(self.offsets) - 1, dtype=np.int64), np.diff(self.offsets))
+        delta_terms, delta_docs, delta_tfs = [], [], []
+        for term_id, postings in self.delta.items():
+            delta_terms.extend([term_id] * len(postings))
+            delta_docs.extend(doc for doc, _ in postings)
+            delta_tfs.extend(tf for _, tf in postings)
+        terms = np.concatenate([base_terms, np.asarray(delta_terms, dtype=np.int64)])
+        doc_ids = np.concatenate([self.doc_ids, np.asarray(delta_docs, dtype=np.uint32)])
+        term_freqs = np.concatenate([self.term_freqs, np.asarray(delta_tfs, dtype=np.uint16)])
+        # Delta doc ids are all larger than base ones, so a stable sort by term keeps each posting list sorted by doc
+        order = np.argsort(terms, kind="stable")
+        offsets = np.zeros(n_terms + 1, dtype=np.int64)
+        np.cumsum(np.bincount(terms, minlength=n_terms), out=offsets[1:])
+        return replace(
+            self,
+            offsets=offsets,
+            doc_ids=doc_ids[order],
+            term_freqs=term_freqs[order],
+            doc_lengths=np.concatenate([self.doc_lengths, np.asarray(self.delta_lengths, dtype=np.uint32)]),
+            delta={},
+            delta_lengths=()
+        )
+
+    def _postings(self, term_id: int) -> Tuple[np.ndarray, np.ndarray]:
+        parts_ids, parts_tfs = [], []
+        if term_id < len(self.offsets) - 1:
+            start, end = self.offsets[term_id], self.offsets[term_id + 1]
+            parts_ids.append(np.asarray(self.doc_ids[start:end], dtype=np.int64))
+            parts_tfs.append(np.asarray(self.term_freqs[start:end], dtype=np.float32))
+        postings = self.delta.get(term_id)
+        if postings:
+            parts_ids.append(np.fromiter((doc for doc, _ in postings), dtype=np.int64, count=len(postings)))
+            parts_tfs.append(np.fromiter((tf for _, tf in postings), dtype=np.float32, count=len(postings)))
+        if not parts_ids:
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float32)
+        return np.concatenate(parts_ids), np.concatenate(parts_tfs)
+
+    def search(self, query: str, top_k: int = 10) -> List[Tuple[int, float]]:
+        """
+        Scores documents against `query` with BM25.
+
+        Args:
+            query: str - the search query text
+            top_k: int - number of documents to return
+
+        Returns:
+            List of (document id, BM25 score), best first; documents sharing no term are omitted
+        """
+        n_docs = self.n_docs
+        if not n_docs:
+            return []
+        avg_length = self.total_length / n_docs or 1.0
+        n_base = len(self.doc_lengths)
+        # Scores are accumulated over the postings touched only, not over every document
+        matched_ids, matched_scores = [], []
+        for term in set(tokenize(query)):
+            term_id = self.vocabulary.get(term)
+            if term_id is None:
+                continue
+            ids, tfs = self._postings(term_id)
+            # Drop postings of documents added after this index was published
+            keep = ids < n_docs
+            ids, tfs = ids[keep], tfs[keep]
+            if not len(ids):
+                continue
+            idf = math.log(1.0 + (n_docs - len(ids) + 0.5) / (len(ids) + 0.5))
+            lengths = np.empty(len(ids), dtype=np.float32)
+            in_base = ids < n_base
+            lengths[in_base] = self.doc_lengths[ids[in_base]]
+            if not in_base.all():
+                lengths[~in_base] = [self.delta_lengths[doc_id - n_base] for doc_id in ids[~in_base]]
+            norm = self.k1 * (1.0 - self.b + self.b * lengths / avg_length)
+            matched_ids.append(ids)
+            matched_scores.append(idf * tfs * (self.k1 + 1.0) / (tfs + norm))
+        if not matched_ids:
+            return []
+        doc_ids, inverse = np.unique(np.concatenate(matched_ids), return_inverse=True)
+        scores = np.bincount(inverse, weights=np.concatenate(matched_scores))
+        candidates = np.arange(len(doc_ids))
+        if len(candidates) > top_k:
+            candidates = np.argpartition(-scores, top_k - 1)[:top_k]
+        # Ties are broken by document id, as np.unique returns the ids sorted
+        candidates = candidates[np.lexsort((doc_ids[candidates], -scores[candidates]))]
+        return [(int(doc_ids[i]), float(scores[i])) for i in candidates]
+
+    def write(self, path: str) -> None:
+        """
+        Writes the merged index to `<path>.<array>.npy` files plus a `<path>.vocab` term store.
+        """
+        index = self.merged()
+        for name in LEXICAL_ARRAYS:
+            with open(f"{path}.{name}.npy", "wb") as f:
+                np.save(f, getattr(index, name))
+                f.flush()
+                os.fsync(f.fileno())
+        terms = [None] * len(index.vocabulary)
+        for term, term_id in index.vocabulary.items():
+            terms[term_id] = term
+        TextStore(terms).write(f"{path}.vocab")
+
+    @classmethod
+    def exists(cls, path: str) -> bool:
+        return os.path.exists(f"{path}.vocab.idx")
+
+    @classmethod
+    def open(cls, path: str, mmap: bool = True, k1: float = 1.2, b: float = 0.75) -> "BM25Index":
+        """
+        Opens an index written by `write`, memory-mapping the posting arrays.
+        """
+        arrays = {name: _load_array(f"{path}.{name}.npy", mmap) for name in LEXICAL_ARRAYS}
+        vocabulary = {term: term_id for term_id, term in enumerate(TextStore.open(f"{path}.vocab"))}
+        return cls(
+            vocabulary=vocabulary,
+            total_length=int(np.asarray(arrays["doc_lengths"], dtype=np.int64).sum()),
+            k1=k1,
+            b=b,
+            **arrays
+        )
@@ -1,15 +1,338 @@
 
-from typing import List, Tuple, Dict, Any
-from groq import Groq
-import google.generativeai as genai
+import json
+import threading
+from typing import List, Tuple, Dict, Any, Iterator, Optional
 
 from schemas.general_schemas import LLMAPIManager
+from services.metrics import timed, timed_iter
 
 
 
 
 
 
+class GroqLLMAPIManager(LLMAPIManager):
+    """
+    Manager for interacting with the Groq chat completions API via the official
+    `groq` client.
+
+    Adds support for specifying the model name at initialization and helpers for
+    sending a single message, multiple messages, or a raw prompt.
+    """
+
+    def __init__(self, api_key: str, model_name: str, timeout_s: Optional[float] = None) -> None:
+        """
+        Args:
+            api_key: Your Groq API key.
+            model_name: The model identifier, e.g. "llama-3.3-70b-versatile".
+            timeout_s: Transport timeout of each request. None uses the client default.
+
+        The `groq` clients are imported and created on first use; they keep a
+        connection pool that is shared by all threads.
+        """
+        self.api_key = api_key
+        self.model_name = model_name
+        self.timeout_s = timeout_s
+        self._client = None
+        self._async_client = None
+        self._client_lock = threading.Lock()
+
+    def _options(self) -> Dict[str, Any]:
+        return {"timeout": self.timeout_s} if self.timeout_s is not None else {}
+
+    @property
+    def client(self):
+        """
+        The synchronous Groq client, created on first use.
+        """
+        if self._client is None:
+            with self._client_lock:
+                if self._client is None:
+                    from groq import Groq
+                    self._client = Groq(api_key=self.api_key)
+        return self._client
+
+    @property
+    def async_client(self):
+        """
+        The asynchronous Groq client, created on first use.
+        """
+        if self._async_client is None:
+            with self._client_lock:
+                if self._async_client is None:
+                    from groq import AsyncGroq
+                    self._async_client = AsyncGroq(api_key=self.api_key)
+        return self._async_client
+
+    def warm_up(self) -> None:
+        """
+        Imports and creates the client ahead of the first request.
+        """
+        self.client
+
+    def validate(self) -> bool:
+        """
+        Validate that the API key and model name are correct.
+
+        Returns:
+            True if valid, False otherwise.
+        """
+        try:
+            self.send_message({"role": "user", "content": "Test message to validate API key."})
+            return True
+        except Exception as e:
+            print(f"Validation failed: {e}")
+            return False
+
+    def send_message(self, message: Dict[str, str]) -> Dict[str, Any]:
+        """
+        Send a single chat message to Groq API and return the raw response.
+
+        Args:
+            message: Dict with 'role' and 'content'.
+        Returns:
+            The API response object.
+        """
+        return self.send_messages([message])
+
+    def send_messages(self, messages: List[Dict[str, str]]) -> Dict[str, Any]:
+        """
+        Send chat messages to Groq API and return the raw response.
+
+        Args:
+            messages: List of dicts with 'role' and 'content'.
+        Returns:
+            The API response object.
+        """
+        return self.client.chat.completions.create(model=self.model_name, messages=messages, **self._options())
+
+    @timed("llm.groq")
+    def send_prompt(self, prompt: str) -> str:
+        """
+        Send a single prompt to Groq API and return the text output.
+
+        Args:
+            prompt: The text prompt to send.
+        Returns:
+            The text output string if available, otherwise a fallback message.
+        """
+        result = self.send_messages([{"role": "user", "content": prompt}])
+        return result.choices[0].message.content or "No response received"
+
+    @timed("llm.groq")
+    async def send_prompt_async(self, prompt: str) -> str:
+        """
+        Send a single prompt to Groq API without blocking the event loop.
+
+        Args:
+            prompt: The text prompt to send.
+        Returns:
+            The text output string if available, otherwise a fallback message.
+        """
+        result = await self.async_client.chat.completions.create(
+            model=self.model_name,
+            messages=[{"role": "user", "content": prompt}],
+            **self._options()
+        )
+        return result.choices[0].message.content or "No response received"
+
+    def stream_prompt(self, prompt: str) -> Iterator[str]:
+        """
+        Send a single prompt to Groq API and yield the text output as it streams in.
+
+        Args:
+            prompt: The text prompt to send.
+        Yields:
+            Text fragments of the response, in order.
+        """
+        return timed_iter("llm.groq.stream", self._stream_prompt(prompt), first_stage="llm.groq.first_chunk")
+
+    def _stream_prompt(self, prompt: str) -> Iterator[str]:
+        stream = self.client.chat.completions.create(
+            model=self.model_name,
+            messages=[{"role": "user", "content": prompt}],
+            stream=True,
+            **self._options()
+        )
+        for chunk in stream:
+            text = chunk.choices[0].delta.content if chunk.choices else None
+            if text:
+                yield text
+
+
+class OpenAICompatibleLLMAPIManager(LLMAPIManager):
+    """
+    Manager for any server exposing the OpenAI chat completions API, such as
+    OpenAI itself, vLLM, llama.cpp, Ollama or LM Studio, over `httpx`.
+
+    Requests share pooled keep-alive connections to `base_url`.
+    """
+
+    def __init__(
+        self,
+        base_url: str,
+        model_name: str,
+        api_key: Optional[str] = None,
+        timeout_s: Optional[float] = None,
+        max_connections: int = 32
+    ) -> None:
+        """
+        Args:
+            base_url: API root including the version, e.g. "http://localhost:11434/v1".
+            model_name: The model identifier served at `base_url`.
+            api_key: Bearer token, if the server requires one.
+            timeout_s: Transport timeout of each request. None waits indefinitely.
+            max_connections: Size of the connection pool.
+        """
+        self.base_url = base_url.rstrip("/")
+        self.model_name = model_name
+        self.api_key = api_key
+        self.timeout_s = timeout_s
+        self.max_connections = max_connections
+        self._client = None
+        self._async_client = None
+        self._client_lock = threading.Lock()
+
+    def _client_options(self) -> Dict[str, Any]:
+        import httpx
+        headers = {"Authorization": f"Bearer {self.api_key}"} if self.api_key else {}
+        return {
+            "base_url": self.base_url,
+            "headers": headers,
+            "timeout": self.timeout_s,
+            "limits": httpx.Limits(max_connections=self.max_connections, max_keepalive_connections=self.max_connections),
+        }
+
+    @property
+    def client(self):
+        """
+        The pooled synchronous HTTP client, created on first use.
+        """
+        if self._client is None:
+            with self._client_lock:
+                if self._client is None:
+                    import httpx
+                    self._client = httpx.Client(**self._client_options())
+        return self._client
+
+    @property
+    def async_client(self):
+        """
+        The pooled asynchronous HTTP client, created on first use.
+        """
+        if self._async_client is None:
+            with self._client_lock:
+                if self._async_client is None:
+                    import httpx
+                    self._async_client = httpx.AsyncClient(**self._client_options())
+        return self._async_client
+
+    def warm_up(self) -> None:
+        """
+        Imports and creates the client ahead of the first request.
+        """
+        self.client
+
+    def validate(self) -> bool:
+        """
+        Validate that the server is reachable and serves the model.
+
+        Returns:
+            True if valid, False otherwise.
+        """
+        try:
+            self.send_message({"role": "user", "content": "Test message to validate API key."})
+            return True
+        except Exception as e:
+            print(f"Validation failed: {e}")
+            return False
+
+    def _body(self, messages: List[Dict[str, str]], stream: bool = False) -> Dict[str, Any]:
+        return {"model": self.model_name, "messages": messages, "stream": stream}
+
+    @staticmethod
+    def _response_text(result: Dict[str, Any]) -> str:
+        choices = result.get("choices") or []
+        text = (choices[0].get("message") or {}).get("content") if choices else None
+        return text or "No response received"
+
+    def send_message(self, message: Dict[str, str]) -> Dict[str, Any]:
+        """
+        Send a single chat message and return the parsed JSON response.
+
+        Args:
+            message: Dict with 'role' and 'content'.
+        Returns:
+            The chat completion response as a dict.
+        """
+        return self.send_messages([message])
+
+    def send_messages(self, messages: List[Dict[str, str]]) -> Dict[str, Any]:
+        """
+        Send chat messages and return the parsed JSON response.
+
+        Args:
+            messages: List of dicts with 'role' and 'content'.
+        Returns:
+            The chat completion response as a dict.
+        """
+        response = self.client.post("/chat/completions", json=self._body(messages))
+        response.raise_for_status()
+        return response.json()
+
+    @timed("llm.openai_compatible")
+    def send_prompt(self, prompt: str) -> str:
+        """
+        Send a single prompt and return the text output.
+
+        Args:
+            prompt: The text prompt to send.
+        Returns:
+            The text output string if available, otherwise a fallback message.
+        """
+        return self._response_text(self.send_messages([{"role": "user", "content": prompt}]))
+
+    @timed("llm.openai_compatible")
+    async def send_prompt_async(self, prompt: str) -> str:
+        """
+        Send a single prompt without blocking the event loop.
+
+        Args:
+            prompt: The text prompt to send.
+        Returns:
+            The text output string if available, otherwise a fallback message.
+        """
+        response = await self.async_client.post("/chat/completions", json=self._body([{"role": "user", "content": prompt}]))
+        response.raise_for_status()
+        return self._response_text(response.json())
+
+    def stream_prompt(self, prompt: str) -> Iterator[str]:
+        """
+        Send a single prompt and yield the text output as it streams in (server-sent events).
+
+        Args:
+            prompt: The text prompt to send.
+        Yields:
+            Text fragments of the response, in order.
+        """
+        return timed_iter("llm.openai_compatible.stream", self._stream_prompt(prompt), first_stage="llm.openai_compatible.first_chunk")
+
+    def _stream_prompt(self, prompt: str) -> Iterator[str]:
+        body = self._body([{"role": "user", "content": prompt}], stream=True)
+        with self.client.stream("POST", "/chat/completions", json=body) as response:
+            response.raise_for_status()
+            for line in response.iter_lines():
+                if not line.startswith("data:"):
+                    continue
+                data = line[len("data:"):].strip()
+                if data == "[DONE]":
+                    break
+                choices = json.loads(data).get("choices") or []
+                text = (choices[0].get("delta") or {}).get("content") if choices else None
+                if text:
+                    yield text
+
+
 class GeminiLLMAPIManager(LLMAPIManager):
     """
     Manager for interacting with Google Gemini LLM API via the official
@@ -19,15 +342,45 @@ class GeminiLLMAPIManager(LLMAPIManager):
     sending a single message, multiple messages, or a raw prompt.
     """
 
-    def __init__(self, api_key: str, model_name: str) -> None:
+    def __init__(self, api_key: str, model_name: str, timeout_s: Optional[float] = None, api_endpoint: Optional[str] = None) -> None:
         """
         Args:
             api_key: Your Google Generative AI API key.
             model_name: The model identifier, e.g. "gemini-1.5-pro".
+            timeout_s: Transport timeout of each request, so abandoned calls do not linger. None uses the client default.
+            api_endpoint: Alternative REST endpoint, e.g. "http://127.0.0.1:8081" for `benchmarks.fake_llm_server`.
+
+        The `google-generativeai` client is imported and configured on first use.
         """
-        genai.configure(api_key=api_key)
+        self.api_key = api_key
         self.model_name = model_name
-        self.model = genai.GenerativeModel(model_name)
+        self.timeout_s = timeout_s
+        self.api_endpoint = api_endpoint
+        self._request_options = {"timeout": timeout_s} if timeout_s is not None else None
+        self._model = None
+        self._model_lock = threading.Lock()
+
+    @property
+    def model(self):
+        """
+        The Gemini client model, created on first use.
+        """
+        if self._model is None:
+            with self._model_lock:
+                if self._model is None:
+                    import google.generativeai as genai
+                    if self.api_endpoint is not None:
+                        genai.configure(api_key=self.api_key, transport="rest", client_options={"api_endpoint": self.api_endpoint})
+                    else:
+                        genai.configure(api_key=self.api_key)
+                    self._model = genai.GenerativeModel(self.model_name)
+        return self._model
+
+    def warm_up(self) -> None:
+        """
+        Imports and configures the client ahead of the first request.
+        """
+        self.model
 
     def validate(self) -> bool:
         """
@@ -68,7 +421,7 @@ class GeminiLLMAPIManager(LLMAPIManager):
             The API response as a dict-like object where applicable.
         """
         # Use a non-streaming generate_content call for simplicity.
-        result = self.model.generate_content(message.get("content", ""))
+        result = self.model.generate_content(message.get("content", ""), request_options=self._request_options)
         return result
 
     def send_messages(self, messages: List[Dict[str, str]]) -> Dict[str, Any]:
@@ -82,9 +435,10 @@ class GeminiLLMAPIManager(LLMAPIManager):
         """
         # Convert messages to a multi-turn chat input
         contents = self._messages_to_gemini_input(messages)
-        result = self.model.generate_content(contents)
+        result = self.model.generate_content(contents, request_options=self._request_options)
         return result
 
+    @timed("llm.gemini")
     def send_prompt(self, prompt: str) -> Dict[str, Any]:
         """
         Send a single prompt to Gemini API and return the text output.
@@ -94,7 +448,31 @@ class GeminiLLMAPIManager(LLMAPIManager):
         Returns:
             The text output string if available, otherwise a fallback message.
         """
-        result = self.model.generate_content(prompt)
+        result = self.model.generate_content(prompt, request_options=self._request_options)
+        return self._response_text(result)
+
+    @timed("llm.gemini")
+    async def send_prompt_async(self, prompt: str) -> str:
+        """
+        Send a single prompt to Gemini API without blocking the event loop.
+
+        Args:
+            prompt: The text prompt to send.
+        Returns:
+            The text output string if available, otherwise a fallback message.
+        """
+        result = await self.model.generate_content_async(prompt, request_options=self._request_options)
+        return self._response_text(result)
+
+    def _response_text(self, result: Any) -> str:
+        """
+        Extract the text output from a Gemini response.
+
+        Args:
+            result: The response returned by `generate_content`.
+        Returns:
+            The text output string if available, otherwise a fallback message.
+        """
         try:
             # Prefer the consolidated text helper when available
             text = getattr(result, "text", None)
@@ -121,3 +499,23 @@ class GeminiLLMAPIManager(LLMAPIManager):
             pass
         return "No response received"
 
+    def stream_prompt(self, prompt: str) -> Iterator[str]:
+        """
+        Send a single prompt to Gemini API and yield the text output as it streams in.
+
+        Args:
+            prompt: The text prompt to send.
+        Yields:
+            Text fragments of the response, in order.
+        """
+        return timed_iter("llm.gemini.stream", self._stream_prompt(prompt), first_stage="llm.gemini.first_chunk")
+
+    def _stream_prompt(self, prompt: str) -> Iterator[str]:
+        for chunk in self.model.generate_content(prompt, stream=True, request_options=self._request_options):
+            try:
+                text = chunk.text
+            except (ValueError, AttributeError):
+                # Chunks without text parts (e.g. safety or finish metadata)
+                continue
+            if text:
+                yield text
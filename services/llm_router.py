@@ -0,0 +1,266 @@
+import logging
+import random
+import threading
+import time
+from dataclasses import dataclass
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from schemas.general_schemas import LLMAPIManager
+from services.resilient_llm import CircuitBreaker, CircuitOpenError, LLMUnavailableError, is_service_failure
+
+
+@dataclass
+class LLMProvider:
+    """
+    An LLM backend the router can send traffic to.
+
+    `cost_per_1m_tokens` is the provider's price per million tokens (any
+    currency, as long as all providers use the same one). The remaining
+    fields are the router's running measurements.
+    """
+    name: str
+    manager: LLMAPIManager
+    cost_per_1m_tokens: float = 0.0
+    latency_s: Optional[float] = None
+    error_rate: float = 0.0
+    calls: int = 0
+    failures: int = 0
+    breaker: Optional[CircuitBreaker] = None
+
+
+class LLMRouter(LLMAPIManager):
+    """
+    Routes each LLM call to the provider with the best observed latency,
+    error rate and cost, and fails over to the next one when it errors.
+
+    Providers are ranked by `latency / (1 - error_rate) + cost_weight * cost`,
+    with latency and error rate tracked as exponentially weighted moving
+    averages. Providers not called yet rank first so they get measured;
+    providers that were called but never succeeded are ranked with
+    `default_latency_s`, so their error rate still counts against them. A
+    small share of calls (`explore_rate`) goes to a random other provider to
+    keep the measurements fresh. Each provider has its own circuit breaker;
+    providers whose circuit is open are skipped until their trial call.
+    """
+
+    def __init__(
+        self,
+        providers: List[LLMProvider],
+        logger: logging.Logger,
+        cost_weight: float = 0.5,
+        ewma_alpha: float = 0.2,
+        explore_rate: float = 0.05,
+        breaker_failure_threshold: int = 3,
+        breaker_reset_s: float = 30.0,
+        default_latency_s: float = 30.0
+    ) -> None:
+        """
+        Args:
+            providers: List[LLMProvider]
+                The backends, in order of preference for ties.
+            logger: logging.Logger
+                The logger instance used for logging.
+            cost_weight: float
+                Seconds of latency worth one unit of `cost_per_1m_tokens`.
+            ewma_alpha: float
+                Weight of the newest observation in the latency and error rate averages.
+            explore_rate: float
+                Share of calls sent to a random other healthy provider first.
+            breaker_failure_threshold: int
+                Consecutive failures that take a provider out of rotation.
+            breaker_reset_s: float
+                How long a failing provider stays out before a trial call.
+            default_latency_s: float
+                Latency assumed for a provider that has been called but has not succeeded yet.
+        """
+        if not providers:
+            raise ValueError("LLMRouter needs at least one provider")
+        self.providers = providers
+        self.logger = logger
+        self.cost_weight = cost_weight
+        self.ewma_alpha = ewma_alpha
+        self.explore_rate = explore_rate
+        self.default_latency_s = default_latency_s
+        for provider in providers:
+            provider.breaker = CircuitBreaker(breaker_failure_threshold, breaker_reset_s)
+        self._lock = threading.Lock()
+
+    def _score(self, provider: LLMProvider) -> float:
+        if provider.calls == 0:
+            return float("-inf")
+        latency_s = provider.latency_s if provider.latency_s is not None else self.default_latency_s
+        return latency_s / max(1.0 - provider.error_rate, 0.05) + self.cost_weight * provider.cost_per_1m_tokens
+
+    def _ranked(self) -> List[LLMProvider]:
+        """
+        Returns the providers not known to be down, best first.
+        """
+        with self._lock:
+            ranked = sorted(
+                (provider for provider in self.providers if provider.breaker.state != "open"),
+                key=self._score
+            )
+        if len(ranked) > 1 and random.random() < self.explore_rate:
+            ranked.insert(0, ranked.pop(random.randrange(1, len(ranked))))
+        return ranked
+
+    def _record(self, provider: LLMProvider, latency_s: Optional[float]) -> None:
+        """
+        Records a call outcome; `latency_s` is None for a failure.
+        """
+        with self._lock:
+            provider.calls += 1
+            failed = latency_s is None
+            provider.error_rate += self.ewma_alpha * (float(failed) - provider.error_rate)
+            if failed:
+                provider.failures += 1
+            elif provider.latency_s is None:
+                provider.latency_s = latency_s
+            else:
+                provider.latency_s += self.ewma_alpha * (latency_s - provider.latency_s)
+        if failed:
+            provider.breaker.record_failure()
+        else:
+            provider.breaker.record_success()
+
+    def _failed(self, provider: LLMProvider, error: BaseException) -> None:
+        self._record(provider, None)
+        self.logger.warning(f"LLM provider {provider.name} failed ({error}); failing over.")
+
+    def _unavailable(self, errors: List[Tuple[str, Exception]]) -> Exception:
+        """
+        Returns the error to raise once no provider answered. When every
+        provider rejected the request itself (e.g. a 400), that rejection is
+        raised as is, since it is not an outage; otherwise an
+        `LLMUnavailableError`, which callers count as a service failure.
+        """
+        if not errors:
+            return CircuitOpenError("All LLM providers are out of rotation")
+        if not any(is_service_failure(error) for _, error in errors):
+            return errors[-1][1]
+        return LLMUnavailableError(f"All LLM providers failed: {'; '.join(f'{name}: {error}' for name, error in errors)}")
+
+    def _call(self, method: str, *args) -> Any:
+        errors = []
+        for provider in self._ranked():
+            if not provider.breaker.allow():
+                continue
+            start = time.monotonic()
+            try:
+                result = getattr(provider.manager, method)(*args)
+            except Exception as e:
+                self._failed(provider, e)
+                errors.append((provider.name, e))
+                continue
+            except BaseException:
+                # Cancelled (e.g. a losing hedge) without an outcome: release a half-open trial
+                provider.breaker.record_neutral()
+                raise
+            self._record(provider, time.monotonic() - start)
+            return result
+        raise self._unavailable(errors)
+
+    def warm_up(self) -> None:
+        for provider in self.providers:
+            warm_up = getattr(provider.manager, "warm_up", None)
+            if warm_up is not None:
+                warm_up()
+
+    def validate(self) -> bool:
+        """
+        Returns True if at least one provider validates.
+        """
+        return any(provider.manager.validate() for provider in self.providers)
+
+    def send_message(self, message: Dict[str, str]) -> Dict[str, Any]:
+        return self._call("send_message", message)
+
+    def send_messages(self, messages: List[Dict[str, str]]) -> Dict[str, Any]:
+        return self._call("send_messages", messages)
+
+    def send_prompt(self, prompt: str) -> str:
+        """
+        Sends a prompt to the best provider, failing over to the others in rank order.
+
+        Args:
+            prompt: The text prompt to send.
+        Returns:
+            The text output of the first provider that answers.
+        Raises:
+            LLMUnavailableError: every provider failed or is out of rotation.
+        """
+        return self._call("send_prompt", prompt)
+
+    async def send_prompt_async(self, prompt: str) -> str:
+        """
+        Async variant of `send_prompt`.
+        """
+        errors = []
+        for provider in self._ranked():
+            if not provider.breaker.allow():
+                continue
+            start = time.monotonic()
+            try:
+                result = await provider.manager.send_prompt_async(prompt)
+            except Exception as e:
+                self._failed(provider, e)
+                errors.append((provider.name, e))
+                continue
+            except BaseException:
+                # Cancelled (e.g. a losing hedge) without an outcome: release a half-open trial
+                provider.breaker.record_neutral()
+                raise
+            self._record(provider, time.monotonic() - start)
+            return result
+        raise self._unavailable(errors)
+
+    def stream_prompt(self, prompt: str) -> Iterator[str]:
+        """
+        Streams a prompt's response from the best provider. Providers that fail
+        before their first chunk are failed over; the latency recorded is the
+        time to the first chunk.
+
+        Args:
+            prompt: The text prompt to send.
+        Yields:
+            Text fragments of the response, in order.
+        """
+        errors = []
+        for provider in self._ranked():
+            if not provider.breaker.allow():
+                continue
+            start = time.monotonic()
+            try:
+                chunks = iter(provider.manager.stream_prompt(prompt))
+                first = next(chunks, None)
+            except Exception as e:
+                self._failed(provider, e)
+                errors.append((provider.name, e))
+                continue
+            except BaseException:
+                # Cancelled (e.g. a losing hedge) without an outcome: release a half-open trial
+                provider.breaker.record_neutral()
+                raise
+            self._record(provider, time.monotonic() - start)
+            if first is not None:
+                yield first
+                yield from chunks
+            return
+        raise self._unavailable(errors)
+
+    def stats(self) -> Dict[str, Dict[str, object]]:
+        """
+        Returns each provider's latency and error rate averages, call counts, circuit state and routing score.
+        """
+        with self._lock:
+            return {
+                provider.name: {
+                    "latency_ms": provider.latency_s * 1000 if provider.latency_s is not None else None,
+                    "error_rate": provider.error_rate,
+                    "calls": provider.calls,
+                    "failures": provider.failures,
+                    "circuit": provider.breaker.state,
+                    "score": self._score(provider) if provider.latency_s is not None else None,
+                }
+                for provider in self.providers
+            }
@@ -0,0 +1,249 @@
+import bisect
+import contextvars
+import functools
+import inspect
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+
+# Upper bounds in seconds, from sub-millisecond embedding lookups to LLM calls
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+QUANTILES = (0.5, 0.95, 0.99)
+
+# Per-request stage durations, see `record_timings`
+_request_timings: contextvars.ContextVar[Optional[Dict[str, float]]] = contextvars.ContextVar("request_timings", default=None)
+
+
+class Histogram:
+    """
+    Cumulative-bucket latency histogram in the Prometheus layout, with
+    quantiles estimated by linear interpolation inside a bucket (as
+    Prometheus' `histogram_quantile` does).
+    """
+
+    def __init__(self, buckets: Sequence[float] = DEFAULT_BUCKETS) -> None:
+        self.buckets = tuple(buckets)
+        self._counts = [0] * (len(self.buckets) + 1)
+        self._sum = 0.0
+        self._count = 0
+        self._lock = threading.Lock()
+
+    def observe(self, value: float) -> None:
+        i = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            self._counts[i] += 1
+            self._sum += value
+            self._count += 1
+
+    def state(self) -> Tuple[List[int], float, int]:
+        """
+        Returns (cumulative bucket counts including +Inf, sum, count) as one consistent reading.
+        """
+        with self._lock:
+            counts, total, count = list(self._counts), self._sum, self._count
+        cumulative = []
+        running = 0
+        for n in counts:
+            running += n
+            cumulative.append(running)
+        return cumulative, total, count
+
+    def quantile(self, q: float, cumulative: Optional[List[int]] = None) -> Optional[float]:
+        """
+        Estimates the q-quantile in seconds, or None before the first observation.
+        Values in the +Inf bucket are reported as the largest finite bound.
+        """
+        if cumulative is None:
+            cumulative = self.state()[0]
+        count = cumulative[-1]
+        if not count:
+            return None
+        rank = q * count
+        i = bisect.bisect_left(cumulative, rank)
+        if i >= len(self.buckets):
+            return self.buckets[-1]
+        lower = self.buckets[i - 1] if i else 0.0
+        below = cumulative[i - 1] if i else 0
+        in_bucket = cumulative[i] - below
+        return lower + (self.buckets[i] - lower) * (rank - below) / in_bucket if in_bucket else lower
+
+
+class MetricsRegistry:
+    """
+    Process-wide latency histograms, one per pipeline stage (e.g. "faiss.embed",
+    "llm.gemini", "faq.prompt").
+
+    Stages are timed with `span`; each span is also added to the per-request
+    breakdown when the caller is inside `record_timings`.
+    """
+
+    def __init__(self, buckets: Sequence[float] = DEFAULT_BUCKETS, enabled: bool = True) -> None:
+        self.buckets = tuple(buckets)
+        self.enabled = enabled
+        self._histograms: Dict[str, Histogram] = {}
+        self._lock = threading.Lock()
+
+    def histogram(self, stage: str) -> Histogram:
+        histogram = self._histograms.get(stage)
+        if histogram is None:
+            with self._lock:
+                histogram = self._histograms.setdefault(stage, Histogram(self.buckets))
+        return histogram
+
+    def observe(self, stage: str, seconds: float) -> None:
+        """
+        Records a duration for a stage, and adds it to the current request's breakdown if one is being recorded.
+        """
+        timings = _request_timings.get()
+        if timings is not None:
+            timings[stage] = timings.get(stage, 0.0) + seconds
+        if self.enabled:
+            self.histogram(stage).observe(seconds)
+
+    @contextmanager
+    def span(self, stage: str) -> Iterator[None]:
+        """
+        Times the enclosed block as one observation of `stage`, whether it returns or raises.
+        """
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(stage, time.perf_counter() - start)
+
+    def timed(self, stage: str):
+        """
+        Decorator timing every call of a function or coroutine function as `stage`.
+        """
+        def decorator(func):
+            if inspect.iscoroutinefunction(func):
+                @functools.wraps(func)
+                async def async_wrapper(*args, **kwargs):
+                    with self.span(stage):
+                        return await func(*args, **kwargs)
+                return async_wrapper
+
+            @functools.wraps(func)
+            def wrapper(*args, **kwargs):
+                with self.span(stage):
+                    return func(*args, **kwargs)
+            return wrapper
+        return decorator
+
+    def timed_iter(self, stage: str, items: Iterable, first_stage: Optional[str] = None) -> Iterator:
+        """
+        Yields from `items`, recording the time spent producing them (not the
+        time the consumer spends between items) as one observation of `stage`,
+        and the time to the first item as one of `first_stage` if given.
+        """
+        elapsed = 0.0
+        iterator = iter(items)
+        try:
+            while True:
+                start = time.perf_counter()
+                try:
+                    item = next(iterator)
+                except StopIteration:
+                    elapsed += time.perf_counter() - start
+                    return
+                if first_stage is not None and not elapsed:
+                    self.observe(first_stage, time.perf_counter() - start)
+                elapsed += time.perf_counter() - start
+                yield item
+        finally:
+            self.observe(stage, elapsed)
+
+    def summary(self) -> Dict[str, Dict[str, Optional[float]]]:
+        """
+        Returns count, mean and p50/p95/p99 in milliseconds for every stage.
+        """
+        result = {}
+        for stage, histogram in sorted(self._histograms.items()):
+            cumulative, total, count = histogram.state()
+            row = {"count": count, "mean_ms": total / count * 1000 if count else None}
+            for q in QUANTILES:
+                value = histogram.quantile(q, cumulative)
+                row[f"p{int(q * 100)}_ms"] = value * 1000 if value is not None else None
+            result[stage] = row
+        return result
+
+    def render_prometheus(self, prefix: str = "faq") -> str:
+        """
+        Renders the histograms in the Prometheus text exposition format, plus
+        the estimated p50/p95/p99 as a separate gauge family.
+        """
+        name = f"{prefix}_stage_duration_seconds"
+        lines = [f"# HELP {name} Duration of each pipeline stage.", f"# TYPE {name} histogram"]
+        quantile_lines = [
+            f"# HELP {name}_quantile Estimated quantiles of the stage durations.",
+            f"# TYPE {name}_quantile gauge",
+        ]
+        for stage, histogram in sorted(self._histograms.items()):
+            cumulative, total, count = histogram.state()
+            label = _escape_label(stage)
+            for bound, n in zip(self.buckets + (float("inf"),), cumulative):
+                le = "+Inf" if bound == float("inf") else repr(bound)
+                lines.append(f'{name}_bucket{{stage="{label}",le="{le}"}} {n}')
+            lines.append(f'{name}_sum{{stage="{label}"}} {total!r}')
+            lines.append(f'{name}_count{{stage="{label}"}} {count}')
+            for q in QUANTILES:
+                value = histogram.quantile(q, cumulative)
+                if value is not None:
+                    quantile_lines.append(f'{name}_quantile{{stage="{label}",quantile="{q}"}} {value!r}')
+        return "\n".join(lines + quantile_lines) + "\n"
+
+    def reset(self) -> None:
+        with self._lock:
+            self._histograms = {}
+
+
+def _escape_label(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+@contextmanager
+def record_timings() -> Iterator[Dict[str, float]]:
+    """
+    Collects the stage durations of the enclosed block (and of the code it
+    awaits, or runs on threads through `run_with_context`) into a dict of
+    stage -> seconds. Repeated stages are summed.
+
+    Example:
+        >>> with record_timings() as timings:
+        ...     with REGISTRY.span("work"):
+        ...         pass
+        >>> list(timings)
+        ['work']
+    """
+    timings: Dict[str, float] = {}
+    token = _request_timings.set(timings)
+    try:
+        yield timings
+    finally:
+        _request_timings.reset(token)
+
+
+def timings_ms(timings: Dict[str, float]) -> Dict[str, float]:
+    """
+    Returns a per-request breakdown in milliseconds, sorted by stage name.
+    """
+    return {stage: round(seconds * 1000, 3) for stage, seconds in sorted(timings.items())}
+
+
+def run_with_context(func, *args):
+    """
+    Returns a callable running `func(*args)` in a copy of the caller's
+    context, so spans on an executor thread still reach the caller's
+    per-request breakdown.
+    """
+    context = contextvars.copy_context()
+    return lambda: context.run(func, *args)
+
+
+# Shared by every component, so all stages end up on one /metrics page
+REGISTRY = MetricsRegistry()
+span = REGISTRY.span
+timed = REGISTRY.timed
+timed_iter = REGISTRY.timed_iter
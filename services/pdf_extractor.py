@@ -0,0 +1,124 @@
+import mmap
+import multiprocessing
+import os
+import threading
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from typing import Iterator, List, Optional, Tuple
+
+
+def _open_reader(file_path: str) -> Tuple[object, mmap.mmap, object]:
+    """
+    Opens a PDF through a read-only memory map, so the file is served from the
+    OS page cache instead of being copied into each process's heap.
+    """
+    from PyPDF2 import PdfReader
+    f = open(file_path, "rb")
+    try:
+        mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    except Exception:
+        f.close()
+        raise
+    return PdfReader(mapped), mapped, f
+
+
+def count_pages(file_path: str) -> int:
+    """
+    Returns the number of pages in a PDF.
+    """
+    reader, mapped, f = _open_reader(file_path)
+    try:
+        return len(reader.pages)
+    finally:
+        del reader
+        mapped.close()
+        f.close()
+
+
+def extract_page_range(file_path: str, start: int, stop: int) -> List[Tuple[int, str]]:
+    """
+    Extracts the text of pages [start, stop) of a PDF.
+
+    Returns:
+        List of (1-based page number, page text)
+    """
+    reader, mapped, f = _open_reader(file_path)
+    try:
+        return [(i + 1, reader.pages[i].extract_text() or "") for i in range(start, stop)]
+    finally:
+        del reader
+        mapped.close()
+        f.close()
+
+
+class PdfExtractor:
+    """
+    Extracts PDF text page by page, splitting large documents into page ranges
+    that are extracted in parallel worker processes.
+
+    Pages are yielded lazily and in order; at most `max_in_flight` ranges are
+    extracted ahead of the consumer, so memory stays bounded.
+    """
+
+    def __init__(self, max_workers: Optional[int] = None, pages_per_task: int = 16, max_in_flight: Optional[int] = None) -> None:
+        """
+        Args:
+            max_workers: Optional[int]
+                Number of extraction processes. Defaults to the CPU count; 1 extracts in-process.
+            pages_per_task: int
+                Number of pages per extraction task.
+            max_in_flight: Optional[int]
+                Number of page ranges extracted ahead of the consumer. Defaults to 2 * max_workers.
+        """
+        self.max_workers = max_workers or os.cpu_count() or 1
+        self.pages_per_task = pages_per_task
+        self.max_in_flight = max_in_flight or 2 * self.max_workers
+        self._pool: Optional[ProcessPoolExecutor] = None
+        self._pool_lock = threading.Lock()
+
+    def _get_pool(self) -> ProcessPoolExecutor:
+        # Concurrent ingestions (e.g. a background job and /load_faiss?wait=1) share one pool
+        with self._pool_lock:
+            if self._pool is None:
+                # Workers are spawned, not forked: forking a process that runs other threads can deadlock the child
+                self._pool = ProcessPoolExecutor(max_workers=self.max_workers, mp_context=multiprocessing.get_context("spawn"))
+            return self._pool
+
+    def iter_pages(self, file_path: str) -> Iterator[Tuple[int, str]]:
+        """
+        Yields (1-based page number, page text) for every page of a PDF, in order.
+        """
+        n_pages = count_pages(file_path)
+        ranges = [(start, min(start + self.pages_per_task, n_pages)) for start in range(0, n_pages, self.pages_per_task)]
+
+        if self.max_workers <= 1 or len(ranges) <= 1:
+            for start, stop in ranges:
+                yield from extract_page_range(file_path, start, stop)
+            return
+
+        pool = self._get_pool()
+        pending = deque()
+        remaining = iter(ranges)
+        try:
+            for start, stop in remaining:
+                pending.append(pool.submit(extract_page_range, file_path, start, stop))
+                if len(pending) >= self.max_in_flight:
+                    break
+            while pending:
+                pages = pending.popleft().result()
+                next_range = next(remaining, None)
+                if next_range is not None:
+                    pending.append(pool.submit(extract_page_range, file_path, *next_range))
+                yield from pages
+        finally:
+            for future in pending:
+                future.cancel()
+
+    def close(self) -> None:
+        """
+        Shuts down the worker processes.
+        """
+        with self._pool_lock:
+            pool, self._pool = self._pool, None
+        if pool is not None:
+            pool.shutdown(cancel_futures=True)
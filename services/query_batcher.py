@@ -0,0 +1,208 @@
+import contextvars
+import logging
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from services.faiss_manager import FaissVectorDatabase
+from services.metrics import REGISTRY
+
+
+class QueryBatcher:
+    """
+    Coalesces concurrent queries into micro-batches that are embedded and
+    searched together, then fans the results back out to the waiting callers.
+
+    A single worker thread waits for the first pending request, then keeps
+    collecting requests for up to `max_wait_ms` or until `max_batch_size` is
+    reached, and issues one `embed_texts` call for the queries that still need
+    an embedding and one index search for the queries that need a search.
+    Embedding and search can be requested separately (`submit_embedding`,
+    `submit_search`), so a caller can consult a cache keyed on the query
+    embedding before paying for the search.
+
+    Each query records its queue wait as the stage `query_batcher.wait` and
+    the duration of its batch's embedding and search as `query_batcher.embed`
+    and `query_batcher.search`, in the submitting request's timings.
+    """
+
+    def __init__(
+        self,
+        vector_database: FaissVectorDatabase,
+        logger: logging.Logger,
+        max_batch_size: int = 32,
+        max_wait_ms: float = 2.0
+    ) -> None:
+        """
+        Args:
+            vector_database: FaissVectorDatabase
+                The database used to embed and search the batched queries.
+            logger: logging.Logger
+                The logger instance used for logging.
+            max_batch_size: int
+                Maximum number of queries embedded and searched together.
+            max_wait_ms: float
+                How long to wait for more queries after the first one arrives.
+        """
+        if max_batch_size <= 0:
+            raise ValueError("max_batch_size must be positive")
+        self.vector_database = vector_database
+        self.logger = logger
+        self.max_batch_size = max_batch_size
+        self.max_wait_s = max_wait_ms / 1000.0
+        # (query, query embedding or None, top_k or None for embedding only, enqueue time, future, submitter's context)
+        self._queue: "queue.Queue[Tuple[str, Optional[np.ndarray], Optional[int], float, Future, contextvars.Context]]" = queue.Queue()
+        self._stats_lock = threading.Lock()
+        self._n_batches = 0
+        self._n_queries = 0
+        self._max_batch_size_seen = 0
+        self._total_queue_delay_s = 0.0
+        self._max_queue_delay_s = 0.0
+        self._batch_size_counts: Dict[int, int] = {}
+        self._worker = threading.Thread(target=self._run, name="query-batcher", daemon=True)
+        self._worker.start()
+
+    def _submit(self, query: str, q_vec: Optional[np.ndarray], top_k: Optional[int]) -> Future:
+        future: Future = Future()
+        self._queue.put((query, q_vec, top_k, time.perf_counter(), future, contextvars.copy_context()))
+        return future
+
+    def submit(self, query: str, top_k: int = 5) -> Future:
+        """
+        Queues a query to be embedded and searched in the next batch.
+
+        Args:
+            query: str - the search query text
+            top_k: int - number of nearest neighbors to return
+
+        Returns:
+            Future resolving to (query embedding of shape (1, dim), list of (text, similarity))
+        """
+        return self._submit(query, None, top_k)
+
+    def submit_embedding(self, query: str) -> Future:
+        """
+        Queues a query to be embedded, but not searched, in the next batch.
+
+        Returns:
+            Future resolving to the query embedding of shape (1, dim)
+        """
+        return self._submit(query, None, None)
+
+    def submit_search(self, q_vec: np.ndarray, query: str, top_k: int = 5) -> Future:
+        """
+        Queues an already embedded query to be searched in the next batch.
+
+        Args:
+            q_vec: np.ndarray - normalized query embedding of shape (1, dim)
+            query: str - the search query text, needed for hybrid search
+            top_k: int - number of nearest neighbors to return
+
+        Returns:
+            Future resolving to a list of (text, similarity)
+        """
+        return self._submit(query, q_vec, top_k)
+
+    def search(self, query: str, top_k: int = 5) -> Tuple[np.ndarray, List[Tuple[str, float]]]:
+        """
+        Blocking convenience wrapper around `submit`.
+
+        Args:
+            query: str - the search query text
+            top_k: int - number of nearest neighbors to return
+
+        Returns:
+            Tuple of (query embedding of shape (1, dim), list of (text, similarity))
+        """
+        return self.submit(query, top_k).result()
+
+    def _collect(self) -> List[Tuple]:
+        batch = [self._queue.get()]
+        deadline = time.perf_counter() + self.max_wait_s
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.perf_counter()
+            try:
+                batch.append(self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self) -> None:
+        while True:
+            batch = self._collect()
+            started = time.perf_counter()
+            try:
+                q_vecs = [q_vec for _, q_vec, _, _, _, _ in batch]
+                to_embed = [i for i, q_vec in enumerate(q_vecs) if q_vec is None]
+                if to_embed:
+                    embedded = self.vector_database.embed_texts([batch[i][0] for i in to_embed])
+                    for row, i in enumerate(to_embed):
+                        q_vecs[i] = embedded[row:row + 1]
+                embed_s = time.perf_counter() - started
+                to_search = [i for i, (_, _, k, _, _, _) in enumerate(batch) if k is not None]
+                results = {}
+                if to_search:
+                    top_k = max(batch[i][2] for i in to_search)
+                    found = self.vector_database.search_batch_by_vectors(
+                        np.vstack([q_vecs[i] for i in to_search]),
+                        top_k=top_k,
+                        queries=[batch[i][0] for i in to_search]
+                    )
+                    results = dict(zip(to_search, found))
+                search_s = time.perf_counter() - started - embed_s
+            except Exception as e:
+                self.logger.error(f"Batched search of {len(batch)} queries failed: {e}")
+                for _, _, _, _, future, _ in batch:
+                    future.set_exception(e)
+                continue
+
+            # Recorded before the results are released, so they are in the caller's timings when it resumes
+            for _, q_vec, k, enqueued, _, context in batch:
+                context.run(self._observe, started - enqueued, embed_s if q_vec is None else None, search_s if k is not None else None)
+            for i, (_, q_vec, k, _, future, _) in enumerate(batch):
+                if k is None:
+                    future.set_result(q_vecs[i])
+                elif q_vec is None:
+                    future.set_result((q_vecs[i], results[i][:k]))
+                else:
+                    future.set_result(results[i][:k])
+            self._record(batch, started)
+
+    @staticmethod
+    def _observe(wait_s: float, embed_s: Optional[float], search_s: Optional[float]) -> None:
+        REGISTRY.observe("query_batcher.wait", wait_s)
+        if embed_s is not None:
+            REGISTRY.observe("query_batcher.embed", embed_s)
+        if search_s is not None:
+            REGISTRY.observe("query_batcher.search", search_s)
+
+    def _record(self, batch: List[Tuple], started: float) -> None:
+        delays = [started - enqueued for _, _, _, enqueued, _, _ in batch]
+        with self._stats_lock:
+            self._n_batches += 1
+            self._n_queries += len(batch)
+            self._max_batch_size_seen = max(self._max_batch_size_seen, len(batch))
+            self._batch_size_counts[len(batch)] = self._batch_size_counts.get(len(batch), 0) + 1
+            self._total_queue_delay_s += sum(delays)
+            self._max_queue_delay_s = max(self._max_queue_delay_s, max(delays))
+
+    def stats(self) -> Dict[str, object]:
+        """
+        Returns batch size and queueing delay metrics since startup.
+        """
+        with self._stats_lock:
+            n_batches = self._n_batches
+            n_queries = self._n_queries
+            return {
+                "batches": n_batches,
+                "queries": n_queries,
+                "mean_batch_size": n_queries / n_batches if n_batches else 0.0,
+                "max_batch_size": self._max_batch_size_seen,
+                "batch_size_counts": dict(sorted(self._batch_size_counts.items())),
+                "mean_queue_delay_ms": 1000 * self._total_queue_delay_s / n_queries if n_queries else 0.0,
+                "max_queue_delay_ms": 1000 * self._max_queue_delay_s,
+            }
@@ -0,0 +1,204 @@
+import threading
+from collections import OrderedDict
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from services.metrics import timed
+from utils.utils import content_hash
+
+
+class CrossEncoderReranker:
+    """
+    Re-scores search hits with a cross-encoder and keeps only as many as needed.
+
+    A cross-encoder reads the question and a passage together, so its score
+    is a much better relevance estimate than the cosine similarity of two
+    separately computed embeddings. Models with a single output (such as the
+    MS MARCO cross-encoders) give a relevance probability in [0, 1].
+
+    Hits are ranked by that probability and kept best first until the
+    probability that at least one kept passage is relevant, 1 - prod(1 - p),
+    reaches `confidence_target`. Passages below `min_score` are never kept
+    (except the best one, so the LLM can still say nothing relevant was
+    found), and at most `max_passages` are. A question with two clearly
+    relevant hits is therefore answered from two passages instead of top_k.
+
+    Scores are cached per (question, passage content) in an LRU cache, so
+    repeated questions and passages are not scored again; only the missing
+    pairs are run through the model, sorted by length to keep padding low.
+    """
+
+    def __init__(
+        self,
+        model_name: str = "cross-encoder/ms-marco-MiniLM-L-6-v2",
+        confidence_target: float = 0.9,
+        min_score: float = 0.2,
+        max_passages: Optional[int] = None,
+        batch_size: int = 32,
+        max_length: int = 512,
+        cache_size: int = 8192,
+        device: str = "cpu"
+    ) -> None:
+        """
+        Args:
+            model_name: str
+                The sentence-transformers cross-encoder to score (question, passage) pairs with.
+            confidence_target: float
+                Probability that a kept passage is relevant at which no more passages are added.
+            min_score: float
+                Relevance probability below which passages are dropped.
+            max_passages: Optional[int]
+                Upper bound on the passages kept; None keeps up to all hits.
+            batch_size: int
+                Number of pairs run through the model at a time.
+            max_length: int
+                Tokens per (question, passage) pair before truncation.
+            cache_size: int
+                Maximum number of cached pair scores before LRU eviction.
+            device: str
+                Torch device of the model.
+
+        The model is loaded on first use.
+        """
+        if cache_size <= 0:
+            raise ValueError("cache_size must be positive")
+        self.model_name = model_name
+        self.confidence_target = confidence_target
+        self.min_score = min_score
+        self.max_passages = max_passages
+        self.batch_size = batch_size
+        self.max_length = max_length
+        self.cache_size = cache_size
+        self.device = device
+        self._model = None
+        self._model_lock = threading.Lock()
+        self._cache: "OrderedDict[Tuple[str, bytes], float]" = OrderedDict()
+        self._cache_lock = threading.Lock()
+        self._stats_lock = threading.Lock()
+        self._questions = 0
+        self._hits_in = 0
+        self._hits_kept = 0
+        self._cache_hits = 0
+        self._cache_misses = 0
+
+    @property
+    def model(self):
+        """
+        The cross-encoder, loaded on first use.
+        """
+        if self._model is None:
+            with self._model_lock:
+                if self._model is None:
+                    from sentence_transformers import CrossEncoder
+                    self._model = CrossEncoder(self.model_name, max_length=self.max_length, device=self.device)
+        return self._model
+
+    def warm_up(self) -> None:
+        self.score("warm up", ["warm up"])
+
+    @timed("rerank.model")
+    def _predict(self, pairs: List[Tuple[str, str]]) -> np.ndarray:
+        order = sorted(range(len(pairs)), key=lambda i: len(pairs[i][1]))
+        model = self.model
+        # The fast tokenizer is not safe to call from several threads at once
+        with self._model_lock:
+            scores = model.predict([pairs[i] for i in order], batch_size=self.batch_size, show_progress_bar=False)
+        result = np.empty(len(pairs), dtype=np.float32)
+        result[order] = np.asarray(scores, dtype=np.float32).reshape(-1)
+        return result
+
+    def score(self, question: str, texts: Sequence[str]) -> np.ndarray:
+        """
+        Returns the relevance of each text to the question, from the cache where possible.
+        """
+        question = question.strip()
+        keys = [(question, content_hash(text)) for text in texts]
+        scores = np.empty(len(texts), dtype=np.float32)
+        missing = []
+        with self._cache_lock:
+            for i, key in enumerate(keys):
+                cached = self._cache.get(key)
+                if cached is None:
+                    missing.append(i)
+                else:
+                    self._cache.move_to_end(key)
+                    scores[i] = cached
+        if missing:
+            # Duplicate passages within one call are scored once
+            pending = {}
+            for i in missing:
+                pending.setdefault(keys[i], texts[i])
+            predicted = dict(zip(pending, self._predict([(question, text) for text in pending.values()])))
+            for i in missing:
+                scores[i] = predicted[keys[i]]
+            with self._cache_lock:
+                for key, value in predicted.items():
+                    self._cache[key] = float(value)
+                    self._cache.move_to_end(key)
+                while len(self._cache) > self.cache_size:
+                    self._cache.popitem(last=False)
+        with self._stats_lock:
+            self._cache_hits += len(texts) - len(missing)
+            self._cache_misses += len(missing)
+        return scores
+
+    def select(self, scores: np.ndarray) -> List[int]:
+        """
+        Returns the positions of the hits to keep, best first.
+
+        Example:
+            >>> CrossEncoderReranker(confidence_target=0.9).select(np.array([0.3, 0.95, 0.8, 0.05]))
+            [1]
+        """
+        kept = []
+        miss = 1.0
+        for i in np.argsort(-scores, kind="stable"):
+            if kept and (scores[i] < self.min_score or 1.0 - miss >= self.confidence_target):
+                break
+            if self.max_passages is not None and len(kept) >= self.max_passages:
+                break
+            kept.append(int(i))
+            miss *= 1.0 - float(np.clip(scores[i], 0.0, 1.0))
+        return kept
+
+    @timed("rerank")
+    def rerank(self, question: str, searches: Sequence[Tuple]) -> List[Tuple]:
+        """
+        Re-ranks search hits for a question and drops the ones not needed.
+
+        Args:
+            question: str - the user question
+            searches: Sequence[Tuple] - (text, similarity, ...) hits from the vector database
+
+        Returns:
+            The kept hits, best first, with the similarity replaced by the
+            cross-encoder relevance so later stages order them by it
+        """
+        hits = [hit for hit in searches if hit[0]]
+        if not hits:
+            return []
+        scores = self.score(question, [hit[0] for hit in hits])
+        kept = [(hits[i][0], float(scores[i])) + tuple(hits[i][2:]) for i in self.select(scores)]
+        with self._stats_lock:
+            self._questions += 1
+            self._hits_in += len(hits)
+            self._hits_kept += len(kept)
+        return kept
+
+    def stats(self) -> Dict[str, object]:
+        """
+        Returns how many hits were kept per question and the score cache hit rate since startup.
+        """
+        with self._stats_lock:
+            lookups = self._cache_hits + self._cache_misses
+            return {
+                "questions": self._questions,
+                "mean_hits_in": self._hits_in / self._questions if self._questions else 0.0,
+                "mean_hits_kept": self._hits_kept / self._questions if self._questions else 0.0,
+                "cache_hits": self._cache_hits,
+                "cache_misses": self._cache_misses,
+                "cache_hit_rate": self._cache_hits / lookups if lookups else 0.0,
+                "cache_size": len(self._cache),
+                "confidence_target": self.confidence_target,
+            }
@@ -0,0 +1,570 @@
+import asyncio
+import logging
+import queue
+import random
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Any, Callable, Dict, Iterator, List, Optional
+
+from schemas.general_schemas import LLMAPIManager
+from services.metrics import run_with_context
+
+
+# Errors that retrying or hedging cannot fix: bad credentials, model name or request
+NON_RETRYABLE_ERRORS = {"InvalidArgument", "PermissionDenied", "Unauthenticated", "NotFound", "AuthenticationError", "BadRequestError"}
+NON_RETRYABLE_STATUS_CODES = {400, 401, 403, 404}
+# Errors that say the LLM service itself is unhealthy, as opposed to rejecting or throttling a request
+TRANSPORT_ERRORS = {"APIConnectionError", "APITimeoutError", "ConnectError", "ConnectTimeout", "ReadTimeout", "RemoteProtocolError", "DeadlineExceeded", "ServiceUnavailable"}
+# Chunks a stream producer may read ahead of its consumer
+STREAM_BUFFER_CHUNKS = 64
+
+
+class LLMUnavailableError(RuntimeError):
+    """
+    Raised when the LLM could not answer within the deadline and retry budget.
+    Callers can fall back to retrieval-only answers.
+    """
+
+
+class LLMTimeoutError(LLMUnavailableError, TimeoutError):
+    """
+    Raised when an LLM call misses its deadline.
+    """
+
+
+class CircuitOpenError(LLMUnavailableError):
+    """
+    Raised without calling the LLM while the circuit breaker is open.
+    """
+
+
+def is_retryable(error: BaseException) -> bool:
+    """
+    Returns whether an LLM client error may succeed on a retry, e.g. a quota,
+    server or network error rather than a rejected request.
+    """
+    if type(error).__name__ in NON_RETRYABLE_ERRORS:
+        return False
+    return _status_code(error) not in NON_RETRYABLE_STATUS_CODES
+
+
+def _status_code(error: BaseException) -> Optional[int]:
+    response = getattr(error, "response", None)
+    status = getattr(error, "status_code", None) or getattr(response, "status_code", None) or getattr(error, "code", None)
+    return status if isinstance(status, int) else None
+
+
+def is_service_failure(error: BaseException) -> bool:
+    """
+    Returns whether an LLM client error means the service is failing (a
+    transport error, a timeout or a 5xx), which is what trips the circuit
+    breaker. Rejected or throttled requests do not. An `LLMUnavailableError`
+    from a wrapped client (e.g. the router, once every provider failed) does.
+    """
+    if isinstance(error, (TimeoutError, ConnectionError, LLMUnavailableError)) or type(error).__name__ in TRANSPORT_ERRORS:
+        return True
+    status = _status_code(error)
+    return status is not None and status >= 500
+
+
+def _close(iterator: Iterator) -> None:
+    close = getattr(iterator, "close", None)
+    if close is None:
+        return
+    try:
+        close()
+    except ValueError:
+        # A generator still running on the stream worker closes itself once it sees the stop event
+        pass
+
+
+class TokenBucket:
+    """
+    Token-bucket rate limiter: `rate` requests per second on average, with
+    bursts of up to `capacity` requests.
+    """
+
+    def __init__(self, rate: float, capacity: Optional[float] = None) -> None:
+        self.rate = rate
+        self.capacity = capacity if capacity is not None else max(rate, 1.0)
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def reserve(self) -> float:
+        """
+        Takes a token if one is available and returns 0, or else returns how
+        many seconds to wait before trying again.
+        """
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            if self._tokens >= 1.0:
+                self._tokens -= 1.0
+                return 0.0
+            return (1.0 - self._tokens) / self.rate
+
+
+class CircuitBreaker:
+    """
+    Stops calling a failing LLM. After `failure_threshold` consecutive failures
+    the circuit opens and calls fail fast for `reset_timeout_s`; then a single
+    trial call is let through (half-open) and its outcome closes or reopens it.
+    """
+
+    def __init__(self, failure_threshold: int = 5, reset_timeout_s: float = 30.0) -> None:
+        self.failure_threshold = failure_threshold
+        self.reset_timeout_s = reset_timeout_s
+        self._failures = 0
+        self._opened_at: Optional[float] = None
+        self._trial_running = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            if self._opened_at is None:
+                return "closed"
+            if time.monotonic() - self._opened_at < self.reset_timeout_s:
+                return "open"
+            return "half_open"
+
+    def allow(self) -> bool:
+        """
+        Returns whether a call may go ahead.
+        """
+        with self._lock:
+            if self._opened_at is None:
+                return True
+            if time.monotonic() - self._opened_at < self.reset_timeout_s or self._trial_running:
+                return False
+            self._trial_running = True
+            return True
+
+    def record_success(self) -> None:
+        with self._lock:
+            self._failures = 0
+            self._opened_at = None
+            self._trial_running = False
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self._failures += 1
+            if self._trial_running or self._failures >= self.failure_threshold:
+                self._opened_at = time.monotonic()
+            self._trial_running = False
+
+    def record_neutral(self) -> None:
+        """
+        Records a call that says nothing about the service's health, e.g. a
+        rejected request or a cancelled call. Only releases a half-open trial,
+        so the next call can be the trial instead.
+        """
+        with self._lock:
+            self._trial_running = False
+
+
+class ResilientLLMAPIManager(LLMAPIManager):
+    """
+    Wraps an `LLMAPIManager` with the policies a production LLM call needs.
+
+    Every call gets a deadline, waits for a token-bucket rate limiter, and
+    retries retryable errors with jittered exponential backoff while time
+    remains. When a call has not returned after the p95 of recent latencies, a
+    hedged duplicate is sent and the first answer wins. A circuit breaker
+    fails calls fast after repeated failures. All failures surface as
+    `LLMUnavailableError`, so callers can fall back to retrieval-only answers.
+    """
+
+    def __init__(
+        self,
+        llm_api_manager: LLMAPIManager,
+        logger: logging.Logger,
+        timeout_s: float = 30.0,
+        max_retries: int = 2,
+        backoff_base_s: float = 0.5,
+        backoff_max_s: float = 8.0,
+        rate_limit_per_s: Optional[float] = None,
+        rate_limit_burst: Optional[float] = None,
+        hedge: bool = True,
+        hedge_quantile: float = 0.95,
+        hedge_min_samples: int = 20,
+        latency_window: int = 200,
+        breaker_failure_threshold: int = 5,
+        breaker_reset_s: float = 30.0,
+        max_workers: int = 32
+    ) -> None:
+        """
+        Args:
+            llm_api_manager: LLMAPIManager
+                The client to wrap, e.g. `GeminiLLMAPIManager`.
+            logger: logging.Logger
+                The logger instance used for logging.
+            timeout_s: float
+                Deadline of a call, including rate limiting, retries and hedges.
+                For streams it bounds the wait for each chunk.
+            max_retries: int
+                Retries of a failed call while the deadline allows.
+            backoff_base_s, backoff_max_s: float
+                First and largest retry delay; the delay doubles per retry, with jitter.
+            rate_limit_per_s: Optional[float]
+                Average LLM requests per second (hedges included). None disables the limiter.
+            rate_limit_burst: Optional[float]
+                Requests allowed in a burst. Defaults to one second's worth.
+            hedge: bool
+                Send a duplicate request when a call is slower than the recent `hedge_quantile`.
+            hedge_min_samples: int
+                Successful calls to observe before hedging starts.
+            latency_window: int
+                Number of recent call latencies the hedge delay is computed from.
+            breaker_failure_threshold: int
+                Consecutive failed attempts that open the circuit. Only transport
+                errors, timeouts and 5xx responses count.
+            breaker_reset_s: float
+                How long the circuit stays open before a trial call.
+            max_workers: int
+                Threads running blocking client calls, hedges included.
+        """
+        self.llm_api_manager = llm_api_manager
+        self.logger = logger
+        self.timeout_s = timeout_s
+        self.max_retries = max_retries
+        self.backoff_base_s = backoff_base_s
+        self.backoff_max_s = backoff_max_s
+        self.rate_limiter = TokenBucket(rate_limit_per_s, rate_limit_burst) if rate_limit_per_s else None
+        self.hedge = hedge
+        self.hedge_quantile = hedge_quantile
+        self.hedge_min_samples = hedge_min_samples
+        self.circuit_breaker = CircuitBreaker(breaker_failure_threshold, breaker_reset_s)
+        self._latencies: deque = deque(maxlen=latency_window)
+        self._stats = {"calls": 0, "failures": 0, "retries": 0, "hedges": 0, "hedge_wins": 0, "timeouts": 0, "rejected": 0}
+        self._stats_lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="llm-call")
+
+    def _count(self, name: str) -> None:
+        with self._stats_lock:
+            self._stats[name] += 1
+
+    def _hedge_delay(self) -> Optional[float]:
+        """
+        Returns the recent `hedge_quantile` call latency, or None while hedging is off.
+        """
+        if not self.hedge:
+            return None
+        with self._stats_lock:
+            latencies = sorted(self._latencies)
+        if len(latencies) < self.hedge_min_samples:
+            return None
+        return latencies[min(int(len(latencies) * self.hedge_quantile), len(latencies) - 1)]
+
+    def _backoff(self, attempt: int) -> float:
+        return min(self.backoff_max_s, self.backoff_base_s * 2 ** attempt) * random.uniform(0.5, 1.0)
+
+    def _start(self) -> float:
+        """
+        Checks the circuit breaker and returns the deadline of a new call.
+        """
+        if not self.circuit_breaker.allow():
+            self._count("rejected")
+            raise CircuitOpenError("LLM circuit breaker is open")
+        self._count("calls")
+        return time.monotonic() + self.timeout_s
+
+    def _acquire(self, deadline: float) -> None:
+        while self.rate_limiter is not None:
+            wait_s = self.rate_limiter.reserve()
+            if not wait_s:
+                return
+            if time.monotonic() + wait_s > deadline:
+                raise LLMTimeoutError("LLM rate limit leaves no time before the deadline")
+            time.sleep(wait_s)
+
+    async def _acquire_async(self, deadline: float) -> None:
+        while self.rate_limiter is not None:
+            wait_s = self.rate_limiter.reserve()
+            if not wait_s:
+                return
+            if time.monotonic() + wait_s > deadline:
+                raise LLMTimeoutError("LLM rate limit leaves no time before the deadline")
+            await asyncio.sleep(wait_s)
+
+    def _may_hedge(self) -> bool:
+        # Hedges never wait for the rate limiter: without a free token, keep waiting on the first request
+        return self.rate_limiter is None or not self.rate_limiter.reserve()
+
+    def _retry_delay(self, error: BaseException, attempt: int, deadline: float) -> Optional[float]:
+        """
+        Records a failed attempt and returns the delay before the next one, or None to give up.
+        """
+        if is_service_failure(error):
+            self.circuit_breaker.record_failure()
+        else:
+            self.circuit_breaker.record_neutral()
+        if isinstance(error, LLMTimeoutError):
+            self._count("timeouts")
+        delay = self._backoff(attempt)
+        if attempt >= self.max_retries or not is_retryable(error) or time.monotonic() + delay >= deadline:
+            self._count("failures")
+            return None
+        self._count("retries")
+        self.logger.warning(f"LLM call failed ({error}); retrying in {delay:.2f}s.")
+        return delay
+
+    def _succeeded(self, started: Optional[float] = None) -> None:
+        """
+        Records a successful call, and its latency in the hedge window unless `started` is None.
+        """
+        self.circuit_breaker.record_success()
+        if started is not None:
+            with self._stats_lock:
+                self._latencies.append(time.monotonic() - started)
+
+    def _attempt(self, func: Callable, args: tuple, deadline: float) -> Any:
+        """
+        Runs one attempt on the executor, hedging it once it is slower than usual.
+        """
+        started = time.monotonic()
+        futures = [self._executor.submit(run_with_context(func, *args))]
+        hedge_delay = self._hedge_delay()
+        if hedge_delay is not None:
+            done, _ = wait(futures, timeout=min(hedge_delay, max(deadline - time.monotonic(), 0)))
+            if not done and time.monotonic() < deadline and self._may_hedge():
+                self._count("hedges")
+                futures.append(self._executor.submit(run_with_context(func, *args)))
+        pending = set(futures)
+        error: Optional[BaseException] = None
+        while pending:
+            done, pending = wait(pending, timeout=max(deadline - time.monotonic(), 0), return_when=FIRST_COMPLETED)
+            if not done:
+                break
+            for future in done:
+                if future.exception() is None:
+                    if future is not futures[0]:
+                        self._count("hedge_wins")
+                    for other in pending:
+                        other.cancel()
+                    self._succeeded(started)
+                    return future.result()
+                error = future.exception()
+        if error is not None and not pending:
+            raise error
+        raise LLMTimeoutError(f"LLM call exceeded its {self.timeout_s}s deadline")
+
+    async def _attempt_async(self, func: Callable, args: tuple, deadline: float) -> Any:
+        """
+        Async variant of `_attempt`; losing requests are cancelled.
+        """
+        started = time.monotonic()
+        tasks = [asyncio.ensure_future(func(*args))]
+        hedge_delay = self._hedge_delay()
+        try:
+            if hedge_delay is not None:
+                done, _ = await asyncio.wait(tasks, timeout=min(hedge_delay, max(deadline - time.monotonic(), 0)))
+                if not done and time.monotonic() < deadline and self._may_hedge():
+                    self._count("hedges")
+                    tasks.append(asyncio.ensure_future(func(*args)))
+            pending = set(tasks)
+            error: Optional[BaseException] = None
+            while pending:
+                done, pending = await asyncio.wait(
+                    pending, timeout=max(deadline - time.monotonic(), 0), return_when=asyncio.FIRST_COMPLETED
+                )
+                if not done:
+                    break
+                for task in done:
+                    if task.exception() is None:
+                        if task is not tasks[0]:
+                            self._count("hedge_wins")
+                        self._succeeded(started)
+                        return task.result()
+                    error = task.exception()
+            if error is not None and not pending:
+                raise error
+            raise LLMTimeoutError(f"LLM call exceeded its {self.timeout_s}s deadline")
+        finally:
+            for task in tasks:
+                task.cancel()
+
+    def _call(self, func: Callable, *args) -> Any:
+        deadline = self._start()
+        attempt = 0
+        try:
+            while True:
+                try:
+                    self._acquire(deadline)
+                    return self._attempt(func, args, deadline)
+                except Exception as e:
+                    delay = self._retry_delay(e, attempt, deadline)
+                    if delay is None:
+                        raise LLMUnavailableError(f"LLM call failed after {attempt + 1} attempts: {e}") from e
+                time.sleep(delay)
+                attempt += 1
+        except BaseException as e:
+            if not isinstance(e, Exception):
+                # Interrupted without an outcome: do not leave a half-open trial running forever
+                self.circuit_breaker.record_neutral()
+            raise
+
+    async def _call_async(self, func: Callable, *args) -> Any:
+        deadline = self._start()
+        attempt = 0
+        try:
+            while True:
+                try:
+                    await self._acquire_async(deadline)
+                    return await self._attempt_async(func, args, deadline)
+                except Exception as e:
+                    delay = self._retry_delay(e, attempt, deadline)
+                    if delay is None:
+                        raise LLMUnavailableError(f"LLM call failed after {attempt + 1} attempts: {e}") from e
+                await asyncio.sleep(delay)
+                attempt += 1
+        except BaseException as e:
+            if not isinstance(e, Exception):
+                # Cancelled (e.g. a losing hedge) without an outcome: release a half-open trial
+                self.circuit_breaker.record_neutral()
+            raise
+
+    def warm_up(self) -> None:
+        warm_up = getattr(self.llm_api_manager, "warm_up", None)
+        if warm_up is not None:
+            warm_up()
+
+    def validate(self) -> bool:
+        return self.llm_api_manager.validate()
+
+    def send_message(self, message: Dict[str, str]) -> Dict[str, Any]:
+        return self._call(self.llm_api_manager.send_message, message)
+
+    def send_messages(self, messages: List[Dict[str, str]]) -> Dict[str, Any]:
+        return self._call(self.llm_api_manager.send_messages, messages)
+
+    def send_prompt(self, prompt: str) -> str:
+        """
+        Sends a prompt with the deadline, rate limit, retry, hedging and circuit breaker policies.
+
+        Args:
+            prompt: The text prompt to send.
+        Returns:
+            The text output of the wrapped client.
+        Raises:
+            LLMUnavailableError: no answer within the deadline and retry budget, or the circuit is open.
+        """
+        return self._call(self.llm_api_manager.send_prompt, prompt)
+
+    async def send_prompt_async(self, prompt: str) -> str:
+        """
+        Async variant of `send_prompt`.
+        """
+        return await self._call_async(self.llm_api_manager.send_prompt_async, prompt)
+
+    def _stream_attempt(self, prompt: str) -> Iterator[str]:
+        """
+        Streams on a worker thread, so a stalled stream can be abandoned after
+        `timeout_s` without a chunk. The worker reads at most
+        `STREAM_BUFFER_CHUNKS` ahead and stops once the consumer does.
+        """
+        chunks: queue.Queue = queue.Queue(maxsize=STREAM_BUFFER_CHUNKS)
+        stop = threading.Event()
+        done = object()
+        upstream: List[Iterator[str]] = []
+
+        def put(item) -> bool:
+            # Gives up once the consumer has stopped, so a full queue never blocks the worker for good
+            while not stop.is_set():
+                try:
+                    chunks.put(item, timeout=0.1)
+                    return True
+                except queue.Full:
+                    continue
+            return False
+
+        def produce():
+            try:
+                upstream.append(iter(self.llm_api_manager.stream_prompt(prompt)))
+                for chunk in upstream[0]:
+                    if not put(chunk):
+                        return
+                put(done)
+            except BaseException as e:
+                put(e)
+            finally:
+                if upstream:
+                    _close(upstream[0])
+
+        self._executor.submit(run_with_context(produce))
+        try:
+            while True:
+                try:
+                    item = chunks.get(timeout=self.timeout_s)
+                except queue.Empty:
+                    raise LLMTimeoutError(f"LLM stream sent nothing for {self.timeout_s}s")
+                if item is done:
+                    return
+                if isinstance(item, BaseException):
+                    raise item
+                yield item
+        finally:
+            stop.set()
+            if upstream:
+                _close(upstream[0])
+
+    def stream_prompt(self, prompt: str) -> Iterator[str]:
+        """
+        Streams a prompt's response. Failures before the first chunk are
+        retried like `send_prompt`; a stream that fails midway is not restarted,
+        since its chunks were already delivered.
+
+        Args:
+            prompt: The text prompt to send.
+        Yields:
+            Text fragments of the response, in order.
+        Raises:
+            LLMUnavailableError: the stream could not be started, or stalled.
+        """
+        deadline = self._start()
+        attempt = 0
+        while True:
+            try:
+                self._acquire(deadline)
+                chunks = self._stream_attempt(prompt)
+                first = next(chunks, None)
+                break
+            except Exception as e:
+                delay = self._retry_delay(e, attempt, deadline)
+                if delay is None:
+                    raise LLMUnavailableError(f"LLM stream failed after {attempt + 1} attempts: {e}") from e
+            time.sleep(delay)
+            attempt += 1
+        # Time to first chunk is not comparable with whole-call latencies, so it stays out of the hedge window
+        self._succeeded()
+        if first is None:
+            return
+        try:
+            yield first
+            yield from chunks
+        except Exception as e:
+            if is_service_failure(e):
+                self.circuit_breaker.record_failure()
+            self._count("failures")
+            raise LLMUnavailableError(f"LLM stream failed midway: {e}") from e
+        finally:
+            chunks.close()
+
+    def stats(self) -> Dict[str, object]:
+        """
+        Returns call counters, the current hedge delay and the circuit breaker
+        state, plus the wrapped client's own stats (e.g. per-provider routing) if it has any.
+        """
+        hedge_delay = self._hedge_delay()
+        with self._stats_lock:
+            stats = dict(self._stats)
+        stats["hedge_delay_ms"] = hedge_delay * 1000 if hedge_delay is not None else None
+        stats["circuit"] = self.circuit_breaker.state
+        inner_stats = getattr(self.llm_api_manager, "stats", None)
+        if inner_stats is not None:
+            stats["providers"] = inner_stats()
+        return stats
@@ -0,0 +1,346 @@
+import json
+import os
+import re
+import shutil
+import tempfile
+import threading
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+
+from schemas.general_schemas import TextEmbedder
+
+
+# Sentence transformers shared by every embedder using the same model, so
+# per-collection databases do not each load their own copy.
+_MODELS: Dict[str, object] = {}
+_MODELS_LOCK = threading.Lock()
+
+
+def _load_model(model_name: str):
+    with _MODELS_LOCK:
+        if model_name not in _MODELS:
+            from sentence_transformers import SentenceTransformer
+            _MODELS[model_name] = SentenceTransformer(model_name)
+        return _MODELS[model_name]
+
+
+# Supported backends, see `build_text_embedder`.
+EMBEDDING_BACKENDS = ("sentence_transformers", "onnx", "onnx_int8")
+
+
+class SentenceTransformerEmbedder(TextEmbedder):
+    """
+    Embeds texts with a sentence transformer running on PyTorch.
+    """
+
+    def __init__(self, model_name: str, dim: Optional[int] = None, batch_size: int = 64) -> None:
+        """
+        Args:
+            model_name: str
+                The name of the sentence transformer model to use.
+            dim: Optional[int]
+                Embedding dimension of the model. When given, the model is
+                loaded on first use instead of now.
+            batch_size: int
+                Number of texts run through the model at a time.
+        """
+        self.model_name = model_name
+        self.name = model_name
+        self.batch_size = batch_size
+        self._dim = dim
+        self._model = None
+        if dim is None:
+            self._dim = self.model.get_sentence_embedding_dimension()
+
+    @property
+    def model(self):
+        """
+        The sentence transformer, loaded on first use.
+        """
+        if self._model is None:
+            model = _load_model(self.model_name)
+            model_dim = model.get_sentence_embedding_dimension()
+            if self._dim is not None and model_dim != self._dim:
+                raise ValueError(f"Model '{self.model_name}' has dimension {model_dim}, expected {self._dim}")
+            self._model = model
+        return self._model
+
+    @property
+    def dim(self) -> int:
+        return self._dim
+
+    @property
+    def tokenizer(self):
+        return self.model.tokenizer
+
+    def embed(self, texts: List[str]) -> np.ndarray:
+        embeddings = self.model.encode(texts, batch_size=self.batch_size, convert_to_numpy=True)
+        return np.ascontiguousarray(embeddings, dtype=np.float32)
+
+
+def _tmp_path(model_dir: str, name: str) -> str:
+    """
+    Returns a new empty file next to `model_dir/name`, unique to the caller, so
+    processes exporting the same model at once never write to the same file.
+    """
+    fd, path = tempfile.mkstemp(prefix=name + ".", suffix=".tmp", dir=model_dir)
+    os.close(fd)
+    return path
+
+
+def _publish(tmp_path: str, path: str) -> None:
+    try:
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.remove(tmp_path)
+        raise
+
+
+def export_onnx(model_name: str, model_dir: str, opset_version: int = 14) -> None:
+    """
+    Exports a sentence transformer's encoder to `model_dir/model.onnx`, with
+    its tokenizer and pooling settings. Needs PyTorch and
+    sentence-transformers; loading the export afterwards needs neither.
+
+    Args:
+        model_name: str - the sentence transformer model name
+        model_dir: str - output directory
+        opset_version: int - ONNX opset of the exported graph
+    """
+    import torch
+
+    model = _load_model(model_name)
+    transformer, pooling = model[0], model[1]
+    encoder = transformer.auto_model.eval()
+    tokenizer = transformer.tokenizer
+    inputs = tokenizer(["export"], return_tensors="pt")
+    input_names = [name for name in ("input_ids", "attention_mask", "token_type_ids") if name in inputs]
+    dynamic_axes = {name: {0: "batch", 1: "sequence"} for name in input_names + ["last_hidden_state"]}
+
+    os.makedirs(model_dir, exist_ok=True)
+    tmp_path = _tmp_path(model_dir, "model.onnx")
+    try:
+        with torch.no_grad():
+            torch.onnx.export(
+                encoder,
+                ({name: inputs[name] for name in input_names},),
+                tmp_path,
+                input_names=input_names,
+                output_names=["last_hidden_state"],
+                dynamic_axes=dynamic_axes,
+                opset_version=opset_version,
+                do_constant_folding=True
+            )
+    except BaseException:
+        os.remove(tmp_path)
+        raise
+    # Each file is replaced atomically, so a concurrent export never leaves a torn one
+    tokenizer_tmp = tempfile.mkdtemp(prefix="tokenizer.", suffix=".tmp", dir=model_dir)
+    try:
+        tokenizer.save_pretrained(tokenizer_tmp)
+        tokenizer_dir = os.path.join(model_dir, "tokenizer")
+        os.makedirs(tokenizer_dir, exist_ok=True)
+        for name in os.listdir(tokenizer_tmp):
+            os.replace(os.path.join(tokenizer_tmp, name), os.path.join(tokenizer_dir, name))
+    finally:
+        shutil.rmtree(tokenizer_tmp, ignore_errors=True)
+    config = {
+        "model_name": model_name,
+        "dim": model.get_sentence_embedding_dimension(),
+        "pooling": pooling.get_pooling_mode_str(),
+        "max_seq_length": transformer.max_seq_length,
+        "input_names": input_names,
+    }
+    config_tmp = _tmp_path(model_dir, "config.json")
+    with open(config_tmp, "w", encoding="utf-8") as f:
+        json.dump(config, f, indent=2)
+    _publish(config_tmp, os.path.join(model_dir, "config.json"))
+    # The model file goes last: its presence marks a complete export
+    _publish(tmp_path, os.path.join(model_dir, "model.onnx"))
+
+
+def quantize_onnx(model_dir: str) -> None:
+    """
+    Writes `model.int8.onnx`, an int8 dynamically quantized copy of
+    `model_dir/model.onnx`: weights are stored as int8 and activations are
+    quantized on the fly, which speeds up the matrix multiplications on CPU.
+    """
+    from onnxruntime.quantization import QuantType, quantize_dynamic
+
+    tmp_path = _tmp_path(model_dir, "model.int8.onnx")
+    try:
+        quantize_dynamic(os.path.join(model_dir, "model.onnx"), tmp_path, weight_type=QuantType.QInt8)
+    except BaseException:
+        os.remove(tmp_path)
+        raise
+    _publish(tmp_path, os.path.join(model_dir, "model.int8.onnx"))
+
+
+def _pool(hidden: np.ndarray, attention_mask: np.ndarray, mode: str) -> np.ndarray:
+    """
+    Pools token embeddings of shape (batch, sequence, dim) into sentence embeddings, ignoring padding.
+    """
+    if mode == "cls":
+        return hidden[:, 0]
+    mask = attention_mask[:, :, None].astype(np.float32)
+    if mode == "max":
+        return np.where(mask > 0, hidden, -1e9).max(axis=1)
+    if mode == "mean":
+        return (hidden * mask).sum(axis=1) / np.maximum(mask.sum(axis=1), 1e-9)
+    raise ValueError(f"Unsupported pooling mode: {mode}")
+
+
+class ONNXEmbedder(TextEmbedder):
+    """
+    Embeds texts with an ONNX Runtime export of a sentence transformer.
+
+    The export (and, with `quantize`, its int8 dynamically quantized variant)
+    is created under `model_dir` on first use and reused afterwards, so
+    PyTorch is only needed once. Texts are sorted by length before batching
+    to keep padding, and wasted compute, to a minimum.
+    """
+
+    def __init__(
+        self,
+        model_name: str,
+        model_dir: str = "onnx_models",
+        quantize: bool = False,
+        dim: Optional[int] = None,
+        batch_size: int = 64,
+        max_seq_length: Optional[int] = None,
+        intra_op_threads: Optional[int] = None,
+        providers: Sequence[str] = ("CPUExecutionProvider",)
+    ) -> None:
+        """
+        Args:
+            model_name: str
+                The name of the sentence transformer model to export.
+            model_dir: str
+                Root directory of the exports; each model gets a subdirectory.
+            quantize: bool
+                Run the int8 dynamically quantized variant.
+            dim: Optional[int]
+                Embedding dimension of the model. When given, the export is
+                loaded on first use instead of now.
+            batch_size: int
+                Number of texts run through the model at a time.
+            max_seq_length: Optional[int]
+                Tokens per text before truncation; defaults to the model's.
+            intra_op_threads: Optional[int]
+                ONNX Runtime threads per call; None lets it use all cores.
+            providers: Sequence[str]
+                ONNX Runtime execution providers, in order of preference.
+        """
+        self.model_name = model_name
+        self.name = f"{model_name}@{'onnx_int8' if quantize else 'onnx'}"
+        self.model_dir = os.path.join(model_dir, re.sub(r"[^A-Za-z0-9_.-]", "_", model_name))
+        self.quantize = quantize
+        self.batch_size = batch_size
+        self.max_seq_length = max_seq_length
+        self.intra_op_threads = intra_op_threads
+        self.providers = list(providers)
+        self._dim = dim
+        self._session = None
+        self._tokenizer = None
+        self._config = None
+        self._load_lock = threading.Lock()
+        # Fast tokenizers are not safe to call from several threads at once
+        self._tokenizer_lock = threading.Lock()
+        if dim is None:
+            self._load()
+
+    @property
+    def model_path(self) -> str:
+        return os.path.join(self.model_dir, "model.int8.onnx" if self.quantize else "model.onnx")
+
+    def _load(self) -> None:
+        with self._load_lock:
+            if self._session is not None:
+                return
+            import onnxruntime as ort
+            from transformers import AutoTokenizer
+
+            if not os.path.exists(os.path.join(self.model_dir, "model.onnx")):
+                export_onnx(self.model_name, self.model_dir)
+            if self.quantize and not os.path.exists(self.model_path):
+                quantize_onnx(self.model_dir)
+            with open(os.path.join(self.model_dir, "config.json"), "r", encoding="utf-8") as f:
+                config = json.load(f)
+            if config["model_name"] != self.model_name:
+                raise ValueError(f"ONNX export at {self.model_dir} is of '{config['model_name']}', not '{self.model_name}'")
+            if self._dim is not None and config["dim"] != self._dim:
+                raise ValueError(f"Model '{self.model_name}' has dimension {config['dim']}, expected {self._dim}")
+            options = ort.SessionOptions()
+            options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+            if self.intra_op_threads is not None:
+                options.intra_op_num_threads = self.intra_op_threads
+            self._tokenizer = AutoTokenizer.from_pretrained(os.path.join(self.model_dir, "tokenizer"))
+            self._config = config
+            self._dim = config["dim"]
+            self._session = ort.InferenceSession(self.model_path, sess_options=options, providers=self.providers)
+
+    @property
+    def dim(self) -> int:
+        return self._dim
+
+    @property
+    def tokenizer(self):
+        self._load()
+        return self._tokenizer
+
+    def embed(self, texts: List[str]) -> np.ndarray:
+        self._load()
+        embeddings = np.empty((len(texts), self._dim), dtype=np.float32)
+        order = sorted(range(len(texts)), key=lambda i: len(texts[i]))
+        max_length = self.max_seq_length or self._config["max_seq_length"]
+        for start in range(0, len(order), self.batch_size):
+            batch = order[start:start + self.batch_size]
+            with self._tokenizer_lock:
+                inputs = self._tokenizer(
+                    [texts[i] for i in batch],
+                    padding=True,
+                    truncation=True,
+                    max_length=max_length,
+                    return_tensors="np"
+                )
+            feed = {name: inputs[name].astype(np.int64) for name in self._config["input_names"]}
+            hidden = self._session.run(["last_hidden_state"], feed)[0]
+            embeddings[batch] = _pool(hidden, inputs["attention_mask"], self._config["pooling"])
+        return embeddings
+
+
+def build_text_embedder(
+    backend: str,
+    model_name: str,
+    dim: Optional[int] = None,
+    batch_size: int = 64,
+    onnx_model_dir: str = "onnx_models",
+    onnx_threads: Optional[int] = None
+) -> TextEmbedder:
+    """
+    Builds a text embedder for one of the supported backends.
+
+    Args:
+        backend: str - one of "sentence_transformers", "onnx", "onnx_int8"
+        model_name: str - the sentence transformer model name
+        dim: Optional[int] - embedding dimension; when given, the model is loaded on first use
+        batch_size: int - texts run through the model at a time
+        onnx_model_dir: str - directory of the ONNX exports
+        onnx_threads: Optional[int] - ONNX Runtime threads per call
+
+    Returns:
+        The embedder
+    """
+    if backend == "sentence_transformers":
+        return SentenceTransformerEmbedder(model_name, dim=dim, batch_size=batch_size)
+    if backend in ("onnx", "onnx_int8"):
+        return ONNXEmbedder(
+            model_name,
+            model_dir=onnx_model_dir,
+            quantize=backend == "onnx_int8",
+            dim=dim,
+            batch_size=batch_size,
+            intra_op_threads=onnx_threads
+        )
+    raise ValueError(f"Unsupported embedding backend: {backend}. Choose one of {', '.join(EMBEDDING_BACKENDS)}")
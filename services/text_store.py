@@ -0,0 +1,129 @@
+import json
+import os
+from typing import Any, Callable, Iterable, Iterator, List, Optional
+
+import numpy as np
+
+
+def _encode_json(value: Any) -> str:
+    return json.dumps(value, ensure_ascii=False, separators=(",", ":"))
+
+
+class TextStore:
+    """
+    Append-able sequence of strings backed by a memory-mapped UTF-8 blob.
+
+    On disk a store is two files: `<name>.bin`, the concatenated UTF-8 records,
+    and `<name>.idx`, n + 1 little-endian uint64 offsets into the blob. Loaded
+    records are decoded on access, so opening a store costs two mmaps rather
+    than decoding every record; records appended afterwards live in a list
+    until the store is written again.
+
+    An optional codec stores non-string records, e.g. `TextStore.json()` for
+    metadata dicts.
+    """
+
+    def __init__(
+        self,
+        records: Optional[Iterable[Any]] = None,
+        encode: Callable[[Any], str] = str,
+        decode: Callable[[str], Any] = str
+    ) -> None:
+        self._encode = encode
+        self._decode = decode
+        self._blob: Optional[np.ndarray] = None
+        self._offsets: Optional[np.ndarray] = None
+        self._tail: List[Any] = list(records) if records is not None else []
+        # Running size of the tail records, updated incrementally by memory_bytes
+        self._tail_bytes = 0
+        self._tail_counted = 0
+
+    @classmethod
+    def json(cls, records: Optional[Iterable[Any]] = None) -> "TextStore":
+        """
+        Returns a store of JSON-serializable records (None included).
+        """
+        return cls(records, encode=_encode_json, decode=json.loads)
+
+    @property
+    def _n_mapped(self) -> int:
+        return 0 if self._offsets is None else len(self._offsets) - 1
+
+    def __len__(self) -> int:
+        return self._n_mapped + len(self._tail)
+
+    def __getitem__(self, i: int) -> Any:
+        if i < 0:
+            i += len(self)
+        if i < 0 or i >= len(self):
+            raise IndexError("TextStore index out of range")
+        n_mapped = self._n_mapped
+        if i >= n_mapped:
+            return self._tail[i - n_mapped]
+        start, end = int(self._offsets[i]), int(self._offsets[i + 1])
+        return self._decode(self._blob[start:end].tobytes().decode("utf-8"))
+
+    def __iter__(self) -> Iterator[Any]:
+        for i in range(len(self)):
+            yield self[i]
+
+    def memory_bytes(self) -> int:
+        """
+        Approximate heap size of the records appended since the store was opened.
+        """
+        for record in self._tail[self._tail_counted:]:
+            self._tail_bytes += len(self._encode(record))
+        self._tail_counted = len(self._tail)
+        return self._tail_bytes
+
+    def append(self, record: Any) -> None:
+        self._tail.append(record)
+
+    def extend(self, records: Iterable[Any]) -> None:
+        self._tail.extend(records)
+
+    def write(self, path: str) -> None:
+        """
+        Writes the store to `<path>.bin` and `<path>.idx`, streaming record by
+        record, and fsyncs both files.
+        """
+        offsets = np.empty(len(self) + 1, dtype="<u8")
+        offsets[0] = 0
+        with open(path + ".bin", "wb") as f:
+            position = 0
+            for i, record in enumerate(self):
+                data = self._encode(record).encode("utf-8")
+                f.write(data)
+                position += len(data)
+                offsets[i + 1] = position
+            f.flush()
+            os.fsync(f.fileno())
+        with open(path + ".idx", "wb") as f:
+            f.write(offsets.tobytes())
+            f.flush()
+            os.fsync(f.fileno())
+
+    @classmethod
+    def open(
+        cls,
+        path: str,
+        encode: Callable[[Any], str] = str,
+        decode: Callable[[str], Any] = str
+    ) -> "TextStore":
+        """
+        Memory-maps a store written by `write`.
+        """
+        store = cls(encode=encode, decode=decode)
+        store._offsets = np.memmap(path + ".idx", dtype="<u8", mode="r")
+        if os.path.getsize(path + ".bin"):
+            store._blob = np.memmap(path + ".bin", dtype=np.uint8, mode="r")
+        else:
+            store._blob = np.empty(0, dtype=np.uint8)
+        return store
+
+    @classmethod
+    def open_json(cls, path: str) -> "TextStore":
+        """
+        Memory-maps a JSON record store written by `write`.
+        """
+        return cls.open(path, encode=_encode_json, decode=json.loads)
@@ -0,0 +1,93 @@
+import os
+from typing import Optional
+
+import numpy as np
+
+
+class VectorStore:
+    """
+    Append-able float32 matrix of exact embeddings, backed by a memory-mapped file.
+
+    On disk a store is a single `<name>.f32` file of row-major little-endian
+    float32 rows. Loaded rows are read from the mapping on access, so they
+    live in the OS page cache rather than on the heap; rows appended
+    afterwards go into a growable in-memory block until the store is written
+    again.
+
+    Appends never move rows a reader can already see: a full block is copied
+    into a larger one that is then published with a single reference swap,
+    so `take` needs no lock as long as it only asks for rows that existed
+    when its snapshot was taken.
+    """
+
+    def __init__(self, dim: int) -> None:
+        self.dim = dim
+        self._mapped: Optional[np.ndarray] = None
+        self._tail = np.empty((0, dim), dtype=np.float32)
+        self._n_tail = 0
+
+    @property
+    def _n_mapped(self) -> int:
+        return 0 if self._mapped is None else len(self._mapped)
+
+    def __len__(self) -> int:
+        return self._n_mapped + self._n_tail
+
+    def memory_bytes(self) -> int:
+        """
+        Heap size of the rows appended since the store was opened.
+        """
+        return self._tail.nbytes
+
+    def extend(self, vectors: np.ndarray) -> None:
+        vectors = np.ascontiguousarray(vectors, dtype=np.float32).reshape(-1, self.dim)
+        n_tail = self._n_tail
+        needed = n_tail + len(vectors)
+        tail = self._tail
+        if needed > len(tail):
+            grown = np.empty((max(needed, 2 * len(tail), 1024), self.dim), dtype=np.float32)
+            grown[:n_tail] = tail[:n_tail]
+            tail = grown
+        tail[n_tail:needed] = vectors
+        self._tail = tail
+        self._n_tail = needed
+
+    def take(self, ids: np.ndarray) -> np.ndarray:
+        """
+        Returns the rows `ids` as a (len(ids), dim) float32 array.
+        """
+        ids = np.asarray(ids, dtype=np.int64)
+        n_mapped = self._n_mapped
+        tail = self._tail
+        if not n_mapped:
+            return tail[ids]
+        rows = np.empty((len(ids), self.dim), dtype=np.float32)
+        mapped = ids < n_mapped
+        rows[mapped] = self._mapped[ids[mapped]]
+        rows[~mapped] = tail[ids[~mapped] - n_mapped]
+        return rows
+
+    def write(self, path: str, block_rows: int = 65536) -> None:
+        """
+        Writes the store to `<path>.f32`, streaming in blocks, and fsyncs the file.
+        """
+        with open(path + ".f32", "wb") as f:
+            for start in range(0, self._n_mapped, block_rows):
+                f.write(np.ascontiguousarray(self._mapped[start:start + block_rows], dtype="<f4").tobytes())
+            f.write(self._tail[:self._n_tail].astype("<f4", copy=False).tobytes())
+            f.flush()
+            os.fsync(f.fileno())
+
+    @staticmethod
+    def exists(path: str) -> bool:
+        return os.path.exists(path + ".f32")
+
+    @classmethod
+    def open(cls, path: str, dim: int) -> "VectorStore":
+        """
+        Memory-maps a store written by `write`.
+        """
+        store = cls(dim)
+        if os.path.getsize(path + ".f32"):
+            store._mapped = np.memmap(path + ".f32", dtype="<f4", mode="r").reshape(-1, dim)
+        return store
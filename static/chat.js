@@ -43,11 +43,13 @@ document.addEventListener('DOMContentLoaded', function() {
                 });
                 const result = await response.json();
 
-                if (response.ok) {
-                    addMessageToChat('bot', `Document "${file.name}" loaded successfully!`);
-                } else {
+                if (!response.ok) {
                     throw new Error(result.message || 'Failed to load document');
                 }
+                if (result.job_id) {
+                    await waitForIngestionJob(result.job_id);
+                }
+                addMessageToChat('bot', `Document "${file.name}" loaded successfully!`);
             } catch (error) {
                 console.error('Error uploading file:', error);
                 addMessageToChat('bot', `Error: ${error.message}`);
@@ -59,6 +61,22 @@ document.addEventListener('DOMContentLoaded', function() {
         }
     });
 
+    async function waitForIngestionJob(jobId) {
+        // Uploads are ingested in the background; poll until the job finishes
+        while (true) {
+            await new Promise(resolve => setTimeout(resolve, 1000));
+            const response = await fetch(`/ingest_jobs/${jobId}`);
+            const job = await response.json();
+            if (!response.ok) {
+                throw new Error(job.message || 'Failed to get loading status');
+            }
+            if (job.status === 'done') return job;
+            if (job.status === 'failed') {
+                throw new Error(job.error || 'Failed to load document');
+            }
+        }
+    }
+
     async function handleSendMessage() {
         const message = chatInput.value.trim();
         if (!message) return;
@@ -66,29 +84,132 @@ document.addEventListener('DOMContentLoaded', function() {
         addMessageToChat('user', message);
         chatInput.value = '';
 
+        let typingIndicator = addTypingIndicator();
+        let faqMessage = null;
+        const removeTypingIndicator = () => {
+            if (typingIndicator) {
+                chatContainer.removeChild(typingIndicator);
+                typingIndicator = null;
+            }
+        };
+
         try {
-            const typingIndicator = addTypingIndicator();
-            const response = await fetch('/ask', {
+            const response = await fetch('/ask_stream', {
                 method: 'POST',
                 headers: { 'Content-Type': 'application/json' },
                 body: JSON.stringify({ message })
             });
-            chatContainer.removeChild(typingIndicator);
 
-            if (!response.ok) {
+            if (!response.ok || !response.body) {
                 throw new Error('Network response was not ok');
             }
 
-            const data = await response.json();
-            addMessageToChat('bot', data.response || 'Sorry, I encountered an error processing your request.');
+            // Server-sent events over a POST body: parse "event:"/"data:" blocks by hand
+            const reader = response.body.getReader();
+            const decoder = new TextDecoder();
+            let buffer = '';
+            let finished = false;
+
+            while (!finished) {
+                const { value, done } = await reader.read();
+                if (done) break;
+                buffer += decoder.decode(value, { stream: true });
+
+                let boundary;
+                while ((boundary = buffer.indexOf('\n\n')) !== -1) {
+                    const rawEvent = buffer.slice(0, boundary);
+                    buffer = buffer.slice(boundary + 2);
+
+                    let eventName = 'message';
+                    let data = '';
+                    rawEvent.split('\n').forEach(line => {
+                        if (line.startsWith('event:')) eventName = line.slice(6).trim();
+                        else if (line.startsWith('data:')) data += line.slice(5).trim();
+                    });
+                    const payload = data ? JSON.parse(data) : null;
+
+                    if (eventName === 'answer') {
+                        removeTypingIndicator();
+                        if (!faqMessage) faqMessage = addFaqMessage();
+                        faqMessage.itemsContainer.appendChild(createFaqItem(payload));
+                        faqMessage.messageContainer.scrollIntoView({ behavior: 'smooth' });
+                    } else if (eventName === 'message' || eventName === 'error') {
+                        removeTypingIndicator();
+                        addMessageToChat('bot', payload || 'Sorry, I encountered an error processing your request.');
+                    } else if (eventName === 'done') {
+                        finished = true;
+                    }
+                }
+            }
+            removeTypingIndicator();
         } catch (error) {
             console.error('Error:', error);
-            const typingIndicator = document.querySelector('.typing-indicator');
-            if (typingIndicator) chatContainer.removeChild(typingIndicator);
+            removeTypingIndicator();
             addMessageToChat('bot', 'Sorry, I encountered an error. Please try again.');
         }
     }
 
+    function createFaqItem(faq) {
+        const faqItem = document.createElement('div');
+        faqItem.className = 'faq-item text-white bg-[#363636] p-3 rounded-xl';
+
+        const formattedAnswer = String(faq.answer)
+            .replace(/\n\s*\n/g, '<br><br>')
+            .replace(/\n/g, ' ');
+
+        faqItem.innerHTML = `
+            <div class="faq-question flex justify-between items-center cursor-pointer">
+                <span class="truncate">${faq.question}</span>
+                <svg class="faq-chevron" width="16" height="16" viewBox="0 0 24 24" fill="none" stroke="currentColor" stroke-width="2" stroke-linecap="round" stroke-linejoin="round">
+                    <polyline points="6 9 12 15 18 9"></polyline>
+                </svg>
+            </div>
+            <div class="faq-answer text-white" style="display: none;">
+                <span>${formattedAnswer}</span>
+            </div>
+        `;
+
+        const questionEl = faqItem.querySelector('.faq-question');
+        const answerEl   = faqItem.querySelector('.faq-answer');
+        const chevronEl  = faqItem.querySelector('.faq-chevron');
+
+        questionEl.addEventListener('click', () => {
+            const isOpen = faqItem.classList.toggle('active');
+            answerEl.style.display = isOpen ? 'block' : 'none';
+            chevronEl.classList.toggle('rotated', isOpen);
+        });
+
+        return faqItem;
+    }
+
+    function addFaqMessage() {
+        const messageContainer = document.createElement('div');
+        messageContainer.className = 'flex items-end gap-3 p-4';
+
+        const leftCol = document.createElement('div');
+        leftCol.className = "bg-center bg-no-repeat aspect-square bg-cover rounded-full w-10 h-10 flex-shrink-0";
+        leftCol.style.backgroundImage = "url('https://lh3.googleusercontent.com/aida-public/AB6AXuB6fqyw15tcMHhUy2uW9F4SBl4yvd65dTaJovlV0Hxp7UpczLZnmJMoAMnF_PVWzcfyTZO3sOiqJqKtOO87Sw1uDnVaLF3na-2F1ZIhvkiHjw2pTKaigvu3Ahwmhh_adSScQ3DW1hIOxGSZDmfkSiZJYLWcOImsnI6JWWmaBgn22ZFIMfLHVR326XS1GOADCEk4XyqcgO7CFBH_UGsyjhByJMufIx9UBLqqsbABpmdIXqp5oysB05kA-2OnDv_qrqvt_k_bccmEMjIW')";
+
+        const faqContainer = document.createElement('div');
+        faqContainer.className = "flex-1 min-w-0";
+
+        const label = document.createElement('p');
+        label.className = "text-[#adadad] text-[13px] font-normal mb-1";
+        label.textContent = "Support";
+
+        const itemsContainer = document.createElement('div');
+        itemsContainer.className = "flex flex-col gap-2";
+
+        faqContainer.appendChild(label);
+        faqContainer.appendChild(itemsContainer);
+        messageContainer.appendChild(leftCol);
+        messageContainer.appendChild(faqContainer);
+
+        chatContainer.insertBefore(messageContainer, document.querySelector('.flex.items-center.px-4.py-3'));
+        messageContainer.scrollIntoView({ behavior: 'smooth' });
+        return { messageContainer, itemsContainer };
+    }
+
     function addMessageToChat(sender, message) {
         const messageContainer = document.createElement('div');
         messageContainer.className = `flex items-end gap-3 p-4 ${sender === 'user' ? 'justify-end' : ''}`;
@@ -107,58 +228,10 @@ document.addEventListener('DOMContentLoaded', function() {
             }
 
             if (faqList) {
-                const leftCol = document.createElement('div');
-                leftCol.className = "bg-center bg-no-repeat aspect-square bg-cover rounded-full w-10 h-10 flex-shrink-0";
-                leftCol.style.backgroundImage = "url('https://lh3.googleusercontent.com/aida-public/AB6AXuB6fqyw15tcMHhUy2uW9F4SBl4yvd65dTaJovlV0Hxp7UpczLZnmJMoAMnF_PVWzcfyTZO3sOiqJqKtOO87Sw1uDnVaLF3na-2F1ZIhvkiHjw2pTKaigvu3Ahwmhh_adSScQ3DW1hIOxGSZDmfkSiZJYLWcOImsnI6JWWmaBgn22ZFIMfLHVR326XS1GOADCEk4XyqcgO7CFBH_UGsyjhByJMufIx9UBLqqsbABpmdIXqp5oysB05kA-2OnDv_qrqvt_k_bccmEMjIW')";
-                
-                const faqContainer = document.createElement('div');
-                faqContainer.className = "flex-1 min-w-0";
-
-                const label = document.createElement('p');
-                label.className = "text-[#adadad] text-[13px] font-normal mb-1";
-                label.textContent = "Support";
-
-                const faqItemsContainer = document.createElement('div');
-                faqItemsContainer.className = "flex flex-col gap-2";
-
-                faqList.forEach(faq => {
-                    const faqItem = document.createElement('div');
-                    faqItem.className = 'faq-item text-white bg-[#363636] p-3 rounded-xl';
-
-                    const formattedAnswer = faq.answer
-                        .replace(/\n\s*\n/g, '<br><br>')
-                        .replace(/\n/g, ' ');
-
-                    faqItem.innerHTML = `
-                        <div class="faq-question flex justify-between items-center cursor-pointer">
-                            <span class="truncate">${faq.question}</span>
-                            <svg class="faq-chevron" width="16" height="16" viewBox="0 0 24 24" fill="none" stroke="currentColor" stroke-width="2" stroke-linecap="round" stroke-linejoin="round">
-                                <polyline points="6 9 12 15 18 9"></polyline>
-                            </svg>
-                        </div>
-                        <div class="faq-answer text-white" style="display: none;">
-                            <span>${formattedAnswer}</span>
-                        </div>
-                    `;
-
-                    const questionEl = faqItem.querySelector('.faq-question');
-                    const answerEl   = faqItem.querySelector('.faq-answer');
-                    const chevronEl  = faqItem.querySelector('.faq-chevron');
-
-                    questionEl.addEventListener('click', () => {
-                        const isOpen = faqItem.classList.toggle('active');
-                        answerEl.style.display = isOpen ? 'block' : 'none';
-                        chevronEl.classList.toggle('rotated', isOpen);
-                    });
-
-                    faqItemsContainer.appendChild(faqItem);
-                });
+                const faqMessage = addFaqMessage();
+                faqList.forEach(faq => faqMessage.itemsContainer.appendChild(createFaqItem(faq)));
                 // Removed auto-expand logic; all answers are hidden by default.
-
-                faqContainer.appendChild(label);
-                faqContainer.appendChild(faqItemsContainer);
-                messageContainer.appendChild(leftCol);
-                messageContainer.appendChild(faqContainer);
+                return;
             } else {
                 // regular bot text
                 messageContainer.innerHTML = `
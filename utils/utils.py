@@ -1,5 +1,7 @@
-
-
+import hashlib
+import queue
+import threading
+from typing import Iterable, Iterator, List, Optional, Tuple
 
 
 def chunk_text(text: str, n_char: int, overlap: int = 0):
@@ -31,23 +33,161 @@ def chunk_text(text: str, n_char: int, overlap: int = 0):
 
 
 
-def filter_json(json_str:str) -> str:
+def iter_page_chunks(
+    segments: Iterable[Tuple[Optional[int], str]],
+    n_char: int,
+    overlap: int = 0
+) -> Iterator[Tuple[str, dict]]:
+    """
+    Streaming variant of chunk_text: splits (page number, text) segments into the
+    same overlapping chunks chunk_text would produce for the concatenated text,
+    while only buffering about one chunk, and yields each chunk together with
+    the pages it was cut from.
+    Args:
+        segments (Iterable[Tuple[Optional[int], str]]): Consecutive (page number, text) pieces; page numbers may be None.
+        n_char (int): The length of each chunk.
+        overlap (int, optional): The number of characters each chunk should overlap with the previous chunk. Defaults to 0.
+    Yields:
+        Tuple[str, dict]: Each chunk and its metadata {"page_start": int | None, "page_end": int | None}.
+    Raises:
+        ValueError: If overlap is greater than or equal to n_char.
+    """
+
+    if overlap >= n_char:
+        raise ValueError("Overlap must be less than n_char")
+
+    step = n_char - overlap
+    buffer = ""
+    # (offset in buffer, page number) for each segment still in the buffer
+    spans = []
+
+    def chunk_metadata(start, end):
+        pages = []
+        for i, (offset, page) in enumerate(spans):
+            span_end = spans[i + 1][0] if i + 1 < len(spans) else len(buffer)
+            if page is not None and offset < end and span_end > start:
+                pages.append(page)
+        return {"page_start": min(pages) if pages else None, "page_end": max(pages) if pages else None}
+
+    def trim(start):
+        kept = []
+        for i, (offset, page) in enumerate(spans):
+            span_end = spans[i + 1][0] if i + 1 < len(spans) else len(buffer)
+            if span_end > start:
+                kept.append((max(offset - start, 0), page))
+        return buffer[start:], kept
+
+    for page, segment in segments:
+        if not segment:
+            continue
+        spans.append((len(buffer), page))
+        buffer += segment
+        start = 0
+        while len(buffer) - start >= n_char:
+            yield buffer[start:start + n_char], chunk_metadata(start, start + n_char)
+            start += step
+        buffer, spans = trim(start)
+    start = 0
+    while start < len(buffer):
+        yield buffer[start:start + n_char], chunk_metadata(start, start + n_char)
+        start += step
+
+
+
+def batched(items: Iterable, batch_size: int) -> Iterator[List]:
+    """
+    Groups an iterable into lists of at most batch_size items.
+    Args:
+        items (Iterable): The items to group.
+        batch_size (int): Maximum size of each batch.
+    Yields:
+        List: Consecutive batches; the last one may be shorter.
+    """
+    batch = []
+    for item in items:
+        batch.append(item)
+        if len(batch) >= batch_size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+
+def prefetch(items: Iterable, max_buffered: int = 8) -> Iterator:
+    """
+    Iterates over items on a background thread, keeping at most max_buffered
+    items ready, so producing the next item overlaps with consuming the current one.
+    Exceptions raised by the producer are re-raised in the consumer.
+    Args:
+        items (Iterable): The items to produce, e.g. extracted pages.
+        max_buffered (int, optional): Bound on items waiting to be consumed. Defaults to 8.
+    Yields:
+        The items, in order.
+    """
+    buffer = queue.Queue(maxsize=max_buffered)
+    sentinel = object()
+    stop = threading.Event()
+    iterator = iter(items)
+
+    def put(entry) -> bool:
+        # Gives up once the consumer has stopped, so a full buffer never blocks the producer for good
+        while not stop.is_set():
+            try:
+                buffer.put(entry, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def produce():
+        try:
+            for item in iterator:
+                if not put((item, None)):
+                    return
+            put((sentinel, None))
+        except Exception as e:
+            put((sentinel, e))
+
+    producer = threading.Thread(target=produce, daemon=True)
+    producer.start()
+    try:
+        while True:
+            item, error = buffer.get()
+            if item is sentinel:
+                if error is not None:
+                    raise error
+                return
+            yield item
+    finally:
+        stop.set()
+        producer.join()
+        # Releases what the source holds open, e.g. PDF file handles
+        close = getattr(iterator, "close", None)
+        if close is not None:
+            close()
+
+
+
+def normalize_chunk(text: str) -> str:
     """
-    Filters a JSON string to ensure it is valid and properly formatted.
+    Normalizes a chunk for content hashing: collapses runs of whitespace so
+    re-extracted text with different line wrapping hashes the same.
     Args:
-        json_str (str): The input JSON string.
+        text (str): The chunk text.
     Returns:
-        str: A filtered JSON string with unnecessary characters removed.
+        str: The normalized text.
     """
-    # Remove any non-JSON characters
-    json_extra_chars = ['```', '```json', 'json']
-    for char in json_extra_chars:
-        json_str = json_str.replace(char, '')
-    
-    json_str = json_str.replace('(', '{')
-    json_str = json_str.replace(')', '}')
+    return " ".join(text.split())
 
-    filtered_json = ''.join(c for c in json_str if c.isprintable() or c.isspace())
-    
-    
-    return filtered_json.strip()
+
+
+def content_hash(text: str) -> bytes:
+    """
+    Returns a 16-byte hash of the normalized chunk text.
+    Args:
+        text (str): The chunk text.
+    Returns:
+        bytes: The BLAKE2b digest of the normalized UTF-8 text.
+    """
+    return hashlib.blake2b(normalize_chunk(text).encode("utf-8"), digest_size=16).digest()